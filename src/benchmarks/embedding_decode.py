@@ -0,0 +1,119 @@
+"""
+Benchmark: embedding response -> Milvus field data, list path vs. NumPy path.
+
+"lists" reproduces the old flow: the SDK decodes each vector into a list of
+Python floats, the embedder wraps them in a tensor (torch if installed) and
+the insert turns them back into lists. "numpy" decodes the base64 payloads
+straight into one float32 array and converts it with a single tolist() at
+the insert. "ndarray" hands the array to pymilvus as is, which is slower:
+pymilvus walks it element by element.
+
+Each mode runs in a fresh subprocess so peak RSS is not shared:
+
+    python -m src.benchmarks.embedding_decode --batches 50 --batch-size 256
+"""
+import argparse
+import base64
+import json
+import resource
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+from typing import List
+
+import numpy as np
+from pymilvus import DataType
+from pymilvus.client.entity_helper import entity_to_field_data
+
+from src.shared.llm.openai_embedder import _decode_embeddings
+
+
+def build_response(batch_size: int, dim: int, rng: np.random.Generator) -> List[SimpleNamespace]:
+    vectors = rng.standard_normal((batch_size, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return [SimpleNamespace(embedding=base64.b64encode(v.tobytes()).decode("ascii")) for v in vectors]
+
+
+def lists_path(data: List[SimpleNamespace]):
+    # What the SDK does without an explicit encoding_format
+    embeddings = [np.frombuffer(base64.b64decode(item.embedding), dtype="float32").tolist() for item in data]
+    try:
+        import torch
+        tensor = torch.tensor(embeddings)
+        return [embedding.tolist() for embedding in tensor]
+    except ImportError:
+        return [list(embedding) for embedding in embeddings]
+
+
+def numpy_path(data: List[SimpleNamespace]):
+    return _decode_embeddings(data).tolist()
+
+
+def ndarray_path(data: List[SimpleNamespace]):
+    return _decode_embeddings(data)
+
+
+PATHS = {"lists": lists_path, "numpy": numpy_path, "ndarray": ndarray_path}
+
+
+def run_mode(mode: str, batches: int, batch_size: int, dim: int) -> dict:
+    rng = np.random.default_rng(42)
+    responses = [build_response(batch_size, dim, rng) for _ in range(batches)]
+    decode = PATHS[mode]
+    field_info = {"name": "embedding", "params": {"dim": dim}}
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    decode_cpu = 0.0
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for data in responses:
+        decode_start = time.process_time()
+        vectors = decode(data)
+        decode_cpu += time.process_time() - decode_start
+        entity_to_field_data(
+            {"type": DataType.FLOAT_VECTOR, "name": "embedding", "values": vectors}, field_info, len(data))
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return {
+        "mode": mode,
+        "decode_cpu_ms_per_batch": round(1000 * decode_cpu / batches, 2),
+        "cpu_ms_per_batch": round(1000 * cpu / batches, 2),
+        "wall_ms_per_batch": round(1000 * wall / batches, 2),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(rss_after / 1024, 1),
+        "rss_growth_mb": round((rss_after - rss_before) / 1024, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batches", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--mode", choices=list(PATHS),
+                        help="Run a single mode in this process and print JSON")
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.batches, args.batch_size, args.dim)))
+        return
+
+    print(f"batches: {args.batches}, batch size: {args.batch_size}, dim: {args.dim}")
+    for mode in PATHS:
+        output = subprocess.run(
+            [sys.executable, "-m", "src.benchmarks.embedding_decode", "--mode", mode,
+             "--batches", str(args.batches), "--batch-size", str(args.batch_size), "--dim", str(args.dim)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:<7} decode {result['decode_cpu_ms_per_batch']:7.2f} ms/batch   "
+              f"decode+pack cpu {result['cpu_ms_per_batch']:7.2f} ms/batch   "
+              f"wall {result['wall_ms_per_batch']:8.2f} ms/batch   "
+              f"peak RSS {result['peak_rss_mb']:7.1f} MB (+{result['rss_growth_mb']} MB while decoding)")
+
+
+if __name__ == "__main__":
+    main()
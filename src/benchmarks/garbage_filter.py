@@ -0,0 +1,152 @@
+"""
+Micro-benchmark: Aho–Corasick garbage stripping vs. the str.replace loop.
+
+Part of the ad signatures are listed as overlapping phrases (see
+build_garbage_list), so outputs are also checked against a plain
+leftmost-longest reference. The str.replace loop can
+legitimately differ from it on overlaps: its result depends on list order.
+
+Run from the repository root:
+
+    python -m src.benchmarks.garbage_filter --phrases 3000 --texts 2000
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+from typing import List, Set, Tuple
+
+from src.pkg.garbage_filter import GarbagePhraseMatcher
+
+
+WORDS = [
+    "новости", "канал", "сегодня", "город", "погода", "фото", "видео", "люди",
+    "вокзал", "поезд", "электричка", "расписание", "станция", "москва", "утро",
+    "вечер", "дорога", "ремонт", "пассажиры", "билет", "вагон", "платформа",
+]
+
+AD_TEMPLATES = [
+    "Подписывайтесь на @{handle}",
+    "Реклама. ООО «{company}», ИНН {inn}",
+    "👉 Переходи по ссылке t.me/{handle} и забирай бонус",
+    "Erid: {erid}",
+    "Промокод {code} на скидку {discount}% в {company}",
+    "#реклама @{handle}",
+]
+
+
+def build_garbage_list(size: int, rng: random.Random, overlap: float = 0.3) -> Tuple[List[str], List[str]]:
+    """
+    Garbage phrases and the ad signatures that appear in posts.
+
+    A share of the signatures is not listed whole but as three overlapping
+    phrases: a head, a span that straddles the head's end and a tail that
+    ends where the span does. Removing the head must still find the tail.
+    """
+    phrases: Set[str] = set()
+    signatures: List[str] = []
+    while len(phrases) < size:
+        template = rng.choice(AD_TEMPLATES)
+        signature = template.format(
+            handle=f"channel_{rng.randrange(10**6)}",
+            company=f"Компания {rng.randrange(10**4)}",
+            inn=rng.randrange(10**9, 10**10),
+            erid=f"{rng.randrange(16**10):010x}",
+            code=f"SALE{rng.randrange(10**4)}",
+            discount=rng.randrange(5, 60),
+        )
+        signatures.append(signature)
+        words = signature.split(" ")
+        if len(words) > 2 and rng.random() < overlap:
+            span_start = rng.randrange(1, len(words) - 1)
+            tail_start = rng.randrange(span_start + 1, len(words))
+            phrases.update((" ".join(words[:tail_start]),
+                            " ".join(words[span_start:]),
+                            " ".join(words[tail_start:])))
+        else:
+            phrases.add(signature)
+    return list(phrases), signatures
+
+
+def build_texts(count: int, signatures: List[str], rng: random.Random) -> List[str]:
+    texts = []
+    for _ in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randrange(20, 120))]
+        # Roughly a third of posts carry one or two ad signatures
+        if rng.random() < 0.33:
+            for _ in range(rng.randrange(1, 3)):
+                words.insert(rng.randrange(len(words) + 1),
+                             rng.choice(signatures))
+        texts.append(" ".join(words))
+    return texts
+
+
+def strip_with_loop(text: str, garbage_list: List[str]) -> str:
+    for garbage in garbage_list:
+        text = text.replace(garbage, '')
+    return text.strip()
+
+
+def strip_leftmost_longest(text: str, phrases_by_first_char: dict) -> str:
+    """Reference: at each position remove the longest phrase starting there."""
+    pieces = []
+    position = 0
+    while position < len(text):
+        for phrase in phrases_by_first_char.get(text[position], ()):
+            if text.startswith(phrase, position):
+                position += len(phrase)
+                break
+        else:
+            pieces.append(text[position])
+            position += 1
+    return "".join(pieces).strip()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--phrases", type=int, default=3000)
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--overlap", type=float, default=0.3,
+                        help="Share of signatures listed as overlapping phrases")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    garbage_list, signatures = build_garbage_list(args.phrases, rng, args.overlap)
+    texts = build_texts(args.texts, signatures, rng)
+    avg_len = sum(len(t) for t in texts) / len(texts)
+
+    start = time.perf_counter()
+    matcher = GarbagePhraseMatcher(garbage_list)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    loop_result = [strip_with_loop(t, garbage_list) for t in texts]
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matcher_result = [matcher.remove(t).strip() for t in texts]
+    matcher_time = time.perf_counter() - start
+
+    phrases_by_first_char = defaultdict(list)
+    for phrase in sorted(garbage_list, key=len, reverse=True):
+        phrases_by_first_char[phrase[0]].append(phrase)
+    reference_result = [strip_leftmost_longest(t, phrases_by_first_char) for t in texts]
+
+    mismatches = sum(1 for a, b in zip(loop_result, matcher_result) if a != b)
+    wrong = sum(1 for a, b in zip(reference_result, matcher_result) if a != b)
+
+    print(f"phrases: {len(garbage_list)}, texts: {len(texts)}, "
+          f"avg text length: {avg_len:.0f} chars")
+    print(f"automaton build:   {build_time * 1000:9.1f} ms (once per garbage.json)")
+    print(f"str.replace loop:  {loop_time * 1000:9.1f} ms "
+          f"({loop_time / len(texts) * 1e6:.1f} us/text)")
+    print(f"Aho–Corasick:      {matcher_time * 1000:9.1f} ms "
+          f"({matcher_time / len(texts) * 1e6:.1f} us/text)")
+    print(f"speedup:           {loop_time / matcher_time:9.1f}x")
+    print(f"differing outputs: {mismatches} vs. loop (order-dependent on overlaps), "
+          f"{wrong} vs. leftmost-longest reference")
+
+
+if __name__ == "__main__":
+    main()
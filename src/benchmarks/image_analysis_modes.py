@@ -0,0 +1,92 @@
+"""
+Compare token usage and latency of the separate and combined vision modes.
+
+Describe the same export twice (once per analysis_mode, into two experiments
+or one after another) and point this script at the experiment databases:
+
+    python -m src.benchmarks.image_analysis_modes --db path/to/dataset.db [...]
+
+Per image, "calls time" is the sum of all call durations and "wall time" the
+longest one, which is what the image costs when prompts run concurrently.
+Images copied from the vision cache (analysis_mode "cached") made no calls
+and are left out; describe with use_cache=false for a clean comparison.
+"""
+import argparse
+import json
+import sqlite3
+from collections import defaultdict
+from statistics import mean
+from typing import Dict, List, Optional
+
+
+TOKEN_KEYS = ("prompt_tokens", "completion_tokens", "total_tokens")
+
+
+def _tokens(usage: Optional[str], key: str) -> int:
+    if not usage:
+        return 0
+    try:
+        return int(json.loads(usage).get(key) or 0)
+    except (json.JSONDecodeError, AttributeError, TypeError, ValueError):
+        return 0
+
+
+def collect(db_paths: List[str]) -> Dict[str, List[dict]]:
+    rows_by_mode: Dict[str, List[dict]] = defaultdict(list)
+    for db_path in db_paths:
+        with sqlite3.connect(f"file:{db_path}?mode=ro", uri=True) as db:
+            db.row_factory = sqlite3.Row
+            rows = db.execute("""
+                SELECT COALESCE(analysis_mode, 'separate') AS analysis_mode,
+                       description_usage, tag_usage, structured_description_usage,
+                       description_time, tag_time, structured_description_time
+                FROM media_datas
+                WHERE description IS NOT NULL AND COALESCE(analysis_mode, '') != 'cached'
+            """).fetchall()
+        for row in rows:
+            usages = (row["description_usage"], row["tag_usage"],
+                      row["structured_description_usage"])
+            times = [t or 0.0 for t in (row["description_time"], row["tag_time"],
+                                        row["structured_description_time"])]
+            rows_by_mode[row["analysis_mode"]].append({
+                **{key: sum(_tokens(u, key) for u in usages) for key in TOKEN_KEYS},
+                "calls": sum(1 for u in usages if u),
+                "calls_time": sum(times),
+                "wall_time": max(times),
+            })
+    return rows_by_mode
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", nargs="+", required=True,
+                        help="Experiment dataset.db files to read")
+    args = parser.parse_args()
+
+    rows_by_mode = collect(args.db)
+    if not rows_by_mode:
+        print("No described images found.")
+        return
+
+    print(f"{'mode':<10}{'images':>8}{'calls/img':>11}{'prompt tok':>12}"
+          f"{'compl tok':>11}{'total tok':>11}{'calls s':>9}{'wall s':>8}")
+    for mode, rows in sorted(rows_by_mode.items()):
+        print(f"{mode:<10}{len(rows):>8}"
+              f"{mean(r['calls'] for r in rows):>11.2f}"
+              f"{mean(r['prompt_tokens'] for r in rows):>12.0f}"
+              f"{mean(r['completion_tokens'] for r in rows):>11.0f}"
+              f"{mean(r['total_tokens'] for r in rows):>11.0f}"
+              f"{mean(r['calls_time'] for r in rows):>9.2f}"
+              f"{mean(r['wall_time'] for r in rows):>8.2f}")
+
+    combined = rows_by_mode.get("combined")
+    if combined:
+        # Tag / structured description fallbacks fill their own usage slots;
+        # a description fallback is merged into the combined call's slot
+        fallbacks = sum(1 for r in combined if r["calls"] > 1)
+        print(f"combined images with per-field fallback: {fallbacks} "
+              f"({100 * fallbacks / len(combined):.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Queue-page latency of the media-description job on an experiment dataset.
+
+Builds a synthetic dataset.db per size (one image per post, half of them
+already described, posts spread over 10 exports) and walks the work queue
+of one export through MediaDescriptionsRepository, 100 images per page,
+writing each result back with update_media_data from `--workers`
+concurrent tasks, as the job does. Profiles:
+
+    defaults/pk-only    aiosqlite defaults, rollback journal, primary keys
+                        only, one connection per call (the original code)
+    defaults/indexed    same with the schema's secondary indexes
+    tuned/per-call      connection settings of src.shared.db.sqlite, one
+                        connection per call
+    tuned/long-lived    src.shared.db.sqlite.get_database: pooled readers,
+                        one writer committing coalesced batches
+
+    python -m src.benchmarks.sqlite_queue_page --rows 100000 1000000
+
+Datasets are created under STORAGE_FOLDER and kept for reruns; pass
+--cleanup to remove them.
+"""
+import argparse
+import asyncio
+import shutil
+import sqlite3
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Dict, List
+
+from src.shared.db import sqlite
+from src.modules.experiments.utils import get_experiment_directory_path, get_experiment_sqlite_path
+from src.modules.media_descriptions.repository import MediaDescriptionsRepository
+from src.modules.media_descriptions.schemas import MediaDataUpdate
+from src.modules.parsers.repository import ParsersRepository
+from src.utils import LatencyRecorder
+
+
+EXPORTS = [uuid.uuid5(uuid.NAMESPACE_URL, f"bench-export-{i}") for i in range(10)]
+SECONDARY_INDEXES = ["ux_posts_from_id_post_id", "ux_medias_post_id_name", "ux_media_datas_media_id"]
+
+
+def experiment_id_for(rows: int) -> uuid.UUID:
+    return uuid.uuid5(uuid.NAMESPACE_URL, f"bench-sqlite-queue-{rows}")
+
+
+async def build_dataset(rows: int) -> uuid.UUID:
+    experiment_id = experiment_id_for(rows)
+    db_path = get_experiment_sqlite_path(experiment_id)
+    if db_path.exists():
+        return experiment_id
+
+    await ParsersRepository.create_tables(experiment_id)
+    start = time.perf_counter()
+    db = sqlite3.connect(db_path)
+    for index in SECONDARY_INDEXES:
+        db.execute(f"DROP INDEX IF EXISTS {index}")
+    batch = 50_000
+    for offset in range(0, rows, batch):
+        posts, medias, media_datas = [], [], []
+        for i in range(offset, min(offset + batch, rows)):
+            post_id, media_id = str(uuid.uuid4()), str(uuid.uuid4())
+            posts.append((post_id, i, f"post {i}", True, str(EXPORTS[i % len(EXPORTS)])))
+            medias.append((media_id, f"photo_{i}.jpg", "image/jpeg", post_id))
+            media_datas.append((str(uuid.uuid4()), f"description {i}" if i % 2 else None, media_id))
+        db.executemany("INSERT INTO posts (id, post_id, post_text, has_media, from_id) VALUES (?, ?, ?, ?, ?)", posts)
+        db.executemany("INSERT INTO medias (id, name, mime_type, post_id) VALUES (?, ?, ?, ?)", medias)
+        db.executemany("INSERT INTO media_datas (id, description, media_id) VALUES (?, ?, ?)", media_datas)
+    db.commit()
+    db.close()
+    print(f"built {rows} rows in {time.perf_counter() - start:.1f}s: {db_path}")
+    return experiment_id
+
+
+def prepare(experiment_id: uuid.UUID, indexed: bool) -> None:
+    db = sqlite3.connect(get_experiment_sqlite_path(experiment_id))
+    db.execute("PRAGMA journal_mode=DELETE")
+    if indexed:
+        db.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_posts_from_id_post_id ON posts (from_id, post_id)")
+        db.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_medias_post_id_name ON medias (post_id, name)")
+        db.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_media_datas_media_id ON media_datas (media_id)")
+    else:
+        for index in SECONDARY_INDEXES:
+            db.execute(f"DROP INDEX IF EXISTS {index}")
+    db.execute("ANALYZE")
+    db.commit()
+    db.close()
+
+
+def _connect_default(path: str, read_only: bool, check_same_thread: bool = True) -> sqlite3.Connection:
+    return sqlite3.connect(path, check_same_thread=check_same_thread)
+
+
+class PerCallDatabase:
+    """Opens, uses and closes a connection for every call, like the code before get_database."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    async def execute(self, query, params=()) -> int:
+        async with sqlite.connect(self.path) as db:
+            cursor = await db.execute(query, params)
+            await db.commit()
+            return cursor.rowcount
+
+    @asynccontextmanager
+    async def read(self):
+        async with sqlite.connect(self.path) as db:
+            yield db
+
+
+async def walk_queue(experiment_id: uuid.UUID, pages: int, workers: int) -> Dict[str, Dict[str, float]]:
+    latency = LatencyRecorder()
+    export_id = EXPORTS[0]
+    after_id = None
+    written: List[str] = []
+    errors = 0
+    slots = asyncio.Semaphore(workers)
+
+    async def update(item) -> None:
+        nonlocal errors
+        async with slots:
+            start = time.perf_counter()
+            try:
+                await MediaDescriptionsRepository.update_media_data(experiment_id, MediaDataUpdate(
+                    media_id=item.media_id, media_data_id=item.media_data_id,
+                    description="benchmark", tag="benchmark", structured_description="{}",
+                    desc_usage=None, tag_usage=None, struct_desc_usage=None,
+                    desc_time=0.0, tag_time=0.0, struct_desc_time=0.0))
+            except sqlite3.OperationalError:
+                # "database is locked" under concurrent per-call writers
+                errors += 1
+                return
+            latency.record("update", time.perf_counter() - start)
+            written.append(str(item.media_data_id))
+
+    start_walk = time.perf_counter()
+    for _ in range(pages):
+        start = time.perf_counter()
+        items = await MediaDescriptionsRepository.get_media_for_processing_by_export_id(
+            experiment_id, export_id, 100, after_id)
+        latency.record("page", time.perf_counter() - start)
+        if not items:
+            break
+        await asyncio.gather(*(update(item) for item in items))
+        after_id = items[-1].media_id
+    elapsed = time.perf_counter() - start_walk
+    await sqlite.close_databases()
+
+    # Put the queue back for the next profile
+    db = sqlite3.connect(get_experiment_sqlite_path(experiment_id))
+    db.executemany("UPDATE media_datas SET description = NULL WHERE id = ?", [(i,) for i in written])
+    db.commit()
+    db.close()
+    summary = latency.summary()
+    summary["walk"] = {"updates_per_second": len(written) / elapsed, "errors": errors}
+    return summary
+
+
+async def run(rows_list: List[int], pages: int, workers: int, cleanup: bool) -> None:
+    tuned_connect, shared_get_database = sqlite._connect_sync, sqlite.get_database
+
+    async def per_call_database(path):
+        return PerCallDatabase(str(path))
+
+    profiles = [
+        ("defaults/pk-only", False, _connect_default, per_call_database),
+        ("defaults/indexed", True, _connect_default, per_call_database),
+        ("tuned/per-call", True, tuned_connect, per_call_database),
+        ("tuned/long-lived", True, tuned_connect, shared_get_database),
+    ]
+    for rows in rows_list:
+        experiment_id = await build_dataset(rows)
+        print(f"\n{rows} posts, {pages} pages of 100 images from one of {len(EXPORTS)} exports, {workers} workers")
+        for name, indexed, connect_sync, get_database in profiles:
+            prepare(experiment_id, indexed)
+            # The repositories resolve these at call time
+            sqlite._connect_sync, sqlite.get_database = connect_sync, get_database
+            try:
+                summary = await walk_queue(experiment_id, pages, workers)
+            finally:
+                sqlite._connect_sync, sqlite.get_database = tuned_connect, shared_get_database
+            page, update, walk = summary["page"], summary.get("update", {}), summary["walk"]
+            print(f"{name:<18} page p50 {page['p50'] * 1000:8.2f} ms  p95 {page['p95'] * 1000:8.2f} ms   "
+                  f"update p50 {update.get('p50', 0) * 1000:7.2f} ms  p95 {update.get('p95', 0) * 1000:7.2f} ms   "
+                  f"{walk['updates_per_second']:7.0f} updates/s  {walk['errors']} locked")
+        if cleanup:
+            shutil.rmtree(get_experiment_directory_path(experiment_id))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent update_media_data calls")
+    parser.add_argument("--cleanup", action="store_true", help="Delete the generated datasets afterwards")
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.pages, args.workers, args.cleanup))
+
+
+if __name__ == "__main__":
+    main()
@@ -46,15 +46,65 @@ DB_HOST = get_env_var("DB_HOST")
 DB_PORT = get_env_var("DB_PORT")
 DB_NAME = get_env_var("DB_NAME")
 
+# Process-wide connection pool, see src/shared/db/postgres.py
+DB_POOL_MIN_SIZE = int(get_env_var("DB_POOL_MIN_SIZE", unsafe=True) or 2)
+DB_POOL_MAX_SIZE = int(get_env_var("DB_POOL_MAX_SIZE", unsafe=True) or 10)
+DB_POOL_TIMEOUT = float(get_env_var("DB_POOL_TIMEOUT", unsafe=True) or 30)
+DB_POOL_MAX_IDLE = float(get_env_var("DB_POOL_MAX_IDLE", unsafe=True) or 300)
+DB_POOL_MAX_LIFETIME = float(
+    get_env_var("DB_POOL_MAX_LIFETIME", unsafe=True) or 3600)
+DB_POOL_HEALTH_CHECK = (get_env_var("DB_POOL_HEALTH_CHECK", unsafe=True)
+                        or "true").lower() in ("1", "true", "yes")
+
 MILVUS_HOST = get_env_var("MILVUS_HOST")
 MILVUS_PORT = get_env_var("MILVUS_PORT")
 MILVUS_ADDRESS = f"http://{MILVUS_HOST}:{MILVUS_PORT}"
+# Seconds between liveness probes of the shared Milvus connection
+MILVUS_HEALTH_CHECK_INTERVAL = float(
+    get_env_var("MILVUS_HEALTH_CHECK_INTERVAL", unsafe=True) or 30)
 
 LLM_API_HOST = get_env_var("LLM_API_HOST")
 LLM_API_PORT = get_env_var("LLM_API_PORT")
 LLM_API_URL = f"http://{LLM_API_HOST}:{LLM_API_PORT}/v1"
+# Per-request timeout and retries of transient errors (timeouts, 429, 5xx)
+LLM_REQUEST_TIMEOUT = float(
+    get_env_var("LLM_REQUEST_TIMEOUT", unsafe=True) or 120)
+LLM_MAX_RETRIES = int(
+    get_env_var("LLM_MAX_RETRIES", unsafe=True) or 5)
+# Circuit breaker: after this many consecutive transient failures calls are
+# paused for LLM_BREAKER_RESET_TIMEOUT seconds, then one probe is let through.
+# Callers give up after waiting LLM_BREAKER_MAX_WAIT seconds in total.
+LLM_BREAKER_FAILURE_THRESHOLD = int(
+    get_env_var("LLM_BREAKER_FAILURE_THRESHOLD", unsafe=True) or 5)
+LLM_BREAKER_RESET_TIMEOUT = float(
+    get_env_var("LLM_BREAKER_RESET_TIMEOUT", unsafe=True) or 30)
+LLM_BREAKER_MAX_WAIT = float(
+    get_env_var("LLM_BREAKER_MAX_WAIT", unsafe=True) or 900)
 
 TELEGRAM_BOT_API = get_env_var("TELEGRAM_BOT_API")
 TELEGRAM_CHAT_IDS = get_env_var("TELEGRAM_CHAT_IDS")
 
 STORAGE_FOLDER = get_env_var("STORAGE_FOLDER")
+
+# Embedding cache under STORAGE_FOLDER, see src/shared/llm/embedding_cache.py
+EMBEDDING_CACHE_MAX_MB = int(
+    get_env_var("EMBEDDING_CACHE_MAX_MB", unsafe=True) or 2048)
+EMBEDDING_CACHE_DTYPE = get_env_var(
+    "EMBEDDING_CACHE_DTYPE", unsafe=True) or "float16"
+# Vision results keyed by perceptual image hash, see src/shared/llm/vision_cache.py
+VISION_CACHE_MAX_MB = int(
+    get_env_var("VISION_CACHE_MAX_MB", unsafe=True) or 512)
+# Experiment SQLite databases: memory-mapped I/O and page cache per connection
+SQLITE_MMAP_SIZE_MB = int(
+    get_env_var("SQLITE_MMAP_SIZE_MB", unsafe=True) or 256)
+SQLITE_CACHE_SIZE_MB = int(
+    get_env_var("SQLITE_CACHE_SIZE_MB", unsafe=True) or 64)
+# Long-lived connections: closed after this many idle seconds, and the least
+# recently used databases are closed beyond SQLITE_MAX_OPEN_DATABASES
+SQLITE_IDLE_TTL = float(
+    get_env_var("SQLITE_IDLE_TTL", unsafe=True) or 300)
+SQLITE_MAX_OPEN_DATABASES = int(
+    get_env_var("SQLITE_MAX_OPEN_DATABASES", unsafe=True) or 16)
+# In-memory LRU of search query embeddings
+QUERY_EMBEDDING_CACHE_SIZE = int(
+    get_env_var("QUERY_EMBEDDING_CACHE_SIZE", unsafe=True) or 1024)
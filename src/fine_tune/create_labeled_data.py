@@ -1,4 +1,5 @@
 from config import STORAGE_FOLDER
+from pkg.garbage_filter import GarbagePhraseMatcher, load_garbage_filter
 
 import os
 import json
@@ -31,22 +32,17 @@ def create_labeled_data(
     GARBAGE_FILE = os.path.join(PROJECT_DIR, 'garbage.json')
     LABELED_FILE = os.path.join(PROJECT_DIR, 'labeled_data.json')
 
-    garbage_ids = []
-    garbage_list = []
-    if os.path.exists(GARBAGE_FILE):
-        with open(GARBAGE_FILE, 'r', encoding='utf-8') as f:
-            try:
-                garbage_data = json.load(f)
-                garbage_ids = garbage_data.get('garbage_ids', [])
-                garbage_list = garbage_data.get('garbage_list', [])
-            except json.JSONDecodeError:
-                print(
-                    f"Warning: Could not decode garbage file at {GARBAGE_FILE}")
+    garbage_ids_set = set()
+    garbage_matcher = GarbagePhraseMatcher([])
+    try:
+        garbage_ids_set, garbage_matcher = load_garbage_filter(GARBAGE_FILE)
+    except json.JSONDecodeError:
+        print(
+            f"Warning: Could not decode garbage file at {GARBAGE_FILE}")
 
     try:
         plain_tg_data = stream_plain_tg_data(RAW_DATA_FILE)
         result: List[Dict[str, Any]] = []
-        garbage_ids_set = set(garbage_ids)
 
         for item in plain_tg_data:
             if item.get('type') == 'message':
@@ -55,11 +51,7 @@ def create_labeled_data(
                                for entity in text_entities)
 
                 if text:
-                    clean_text = text
-                    for garbage in garbage_list:
-                        clean_text = clean_text.replace(garbage, '')
-
-                    clean_text = clean_text.strip()
+                    clean_text = garbage_matcher.remove(text).strip()
 
                     if clean_text:
                         message_id = item.get('id')
@@ -0,0 +1,17 @@
+# Vector field of the post_embeddings_* collections
+EMBEDDING_FIELD = "embedding"
+
+# Build parameters per index type. IVF_PQ needs the dimension to be
+# divisible by m (1024 / 16 for the current embedding model).
+DEFAULT_INDEX_PARAMS = {
+    "HNSW": {"M": 16, "efConstruction": 200},
+    "IVF_FLAT": {"nlist": 1024},
+    "IVF_PQ": {"nlist": 1024, "m": 16, "nbits": 8},
+}
+
+# Search parameters per index type; raise ef / nprobe for recall, lower for latency
+DEFAULT_SEARCH_PARAMS = {
+    "HNSW": {"ef": 64},
+    "IVF_FLAT": {"nprobe": 16},
+    "IVF_PQ": {"nprobe": 32},
+}
@@ -1,3 +1,4 @@
+from typing import Any, Dict, Literal, Optional
 from pydantic import BaseModel, Field
 
 
@@ -9,3 +10,18 @@ class CreateCollectionPayload(BaseModel):
 
 class DeleteCollectionPayload(BaseModel):
     collection_name: str
+
+
+class CollectionNamePayload(BaseModel):
+    collection_name: str
+
+
+class CreateIndexPayload(BaseModel):
+    collection_name: str
+    index_type: Literal["HNSW", "IVF_FLAT", "IVF_PQ"] = "HNSW"
+    metric_type: Literal["IP", "COSINE", "L2"] = Field(
+        "IP", description="IP equals cosine for the normalized embeddings we store")
+    params: Optional[Dict[str, Any]] = Field(
+        None, description="Index build params; defaults per index type when omitted")
+    load: bool = Field(
+        True, description="Load the collection into memory after building")
@@ -1,78 +1,130 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
 from pymilvus import (
-    db,
-    connections,
     utility,
     Collection,
     CollectionSchema,
     FieldSchema,
     DataType,
 )
-from src.config import MILVUS_HOST, MILVUS_PORT
+from src.shared.db.milvus import get_alias, get_collection, forget_collection
+from src.modules.db_milvus.common import EMBEDDING_FIELD
 
 
 class MilvusRepository:
-    @staticmethod
-    def _connect():
-        if "milvus_ops" not in connections.list_connections():
-            connections.connect(alias="milvus_ops",
-                                host=MILVUS_HOST, port=MILVUS_PORT)
-        # Ensure we are using the default database
-        db.using_database("default", using="milvus_ops")
-
-    @staticmethod
-    def _disconnect():
-        if "milvus_ops" in connections.list_connections():
-            connections.disconnect(alias="milvus_ops")
+    """Blocking pymilvus calls over the shared connection; run via asyncio.to_thread from async code."""
 
     @classmethod
     def get_all_collections(cls) -> list[str]:
-        cls._connect()
-        try:
-            collections = utility.list_collections(using="milvus_ops")
-        finally:
-            cls._disconnect()
-        return collections
+        return utility.list_collections(using=get_alias())
 
     @classmethod
     def create_collection(cls, collection_name: str, dim: int) -> None:
-        cls._connect()
-        try:
-            # Define a default schema
-            fields = [
-                FieldSchema(name="pk", dtype=DataType.INT64,
-                            is_primary=True, auto_id=True),
-                FieldSchema(name="psql_id", dtype=DataType.VARCHAR, max_length=64,
-                            description="UUID of the corresponding entry in PostgreSQL"),
-                FieldSchema(name="embedding",
-                            dtype=DataType.FLOAT_VECTOR, dim=dim)
-            ]
-            schema = CollectionSchema(
-                fields,
-                description=f"Collection {collection_name}"
-            )
-            Collection(
-                name=collection_name,
-                schema=schema,
-                using="milvus_ops"
-            )
-        finally:
-            cls._disconnect()
+        """
+        Create the collection unless it exists. An existing collection keeps
+        its schema: pymilvus refuses to open it with a different one, e.g.
+        collections built before the date/has_media fields were added.
+        """
+        if cls.has_collection(collection_name):
+            return
+        # Define a default schema
+        fields = [
+            FieldSchema(name="pk", dtype=DataType.INT64,
+                        is_primary=True, auto_id=True),
+            FieldSchema(name="psql_id", dtype=DataType.VARCHAR, max_length=64,
+                        description="UUID of the corresponding entry in PostgreSQL"),
+            FieldSchema(name="embedding",
+                        dtype=DataType.FLOAT_VECTOR, dim=dim),
+            # Scalar copies of post columns for filtered search
+            FieldSchema(name="date", dtype=DataType.INT64,
+                        description="Post date as unix seconds, 0 if unknown"),
+            FieldSchema(name="has_media", dtype=DataType.BOOL,
+                        description="Whether the post has media attached"),
+        ]
+        schema = CollectionSchema(
+            fields,
+            description=f"Collection {collection_name}"
+        )
+        Collection(
+            name=collection_name,
+            schema=schema,
+            using=get_alias()
+        )
+        forget_collection(collection_name)
+
+    @classmethod
+    def get_collection(cls, collection_name: str) -> Collection:
+        return get_collection(collection_name)
 
     @classmethod
     def delete_collection(cls, collection_name: str) -> None:
-        cls._connect()
-        try:
-            utility.drop_collection(
-                collection_name=collection_name, using="milvus_ops")
-        finally:
-            cls._disconnect()
+        utility.drop_collection(
+            collection_name=collection_name, using=get_alias())
+        forget_collection(collection_name)
 
     @classmethod
     def has_collection(cls, collection_name: str) -> bool:
-        cls._connect()
+        return utility.has_collection(
+            collection_name=collection_name, using=get_alias())
+
+    @classmethod
+    def create_index(cls, collection_name: str, field_name: str, index_params: Dict[str, Any]) -> None:
+        """Replace the index on `field_name`. The collection is left released."""
+        collection = get_collection(collection_name)
+        # Milvus refuses to drop or build indexes on a loaded collection
+        collection.release()
+        if collection.has_index():
+            collection.drop_index()
+        collection.create_index(field_name=field_name, index_params=index_params)
+
+    @classmethod
+    def get_indexes(cls, collection_name: str) -> List[Dict[str, Any]]:
+        return [index.to_dict() for index in get_collection(collection_name).indexes]
+
+    @classmethod
+    def load_collection(cls, collection_name: str) -> None:
+        get_collection(collection_name).load()
+
+    @classmethod
+    def release_collection(cls, collection_name: str) -> None:
+        get_collection(collection_name).release()
+
+    @classmethod
+    def get_load_state(cls, collection_name: str) -> str:
+        return utility.load_state(collection_name, using=get_alias()).name
+
+    @classmethod
+    def get_field_names(cls, collection_name: str) -> List[str]:
+        return [field.name for field in get_collection(collection_name).schema.fields]
+
+    @classmethod
+    def search(cls, collection_name: str, vectors: List[List[float]], search_params: Dict[str, Any], limit: int, expr: Optional[str] = None) -> List[List[Tuple[str, float]]]:
+        """ANN search; returns (psql_id, score) pairs per query vector, best first."""
+        results = get_collection(collection_name).search(
+            data=vectors,
+            anns_field=EMBEDDING_FIELD,
+            param=search_params,
+            limit=limit,
+            expr=expr,
+            output_fields=["psql_id"],
+        )
+        return [[(hit.entity.get("psql_id"), hit.distance) for hit in hits] for hits in results]
+
+    @classmethod
+    def count_entities(cls, collection_name: str) -> int:
+        """Row count of sealed segments; an upper bound when rows were deleted."""
+        return get_collection(collection_name).num_entities
+
+    @classmethod
+    def iter_vectors(cls, collection_name: str, batch_size: int = 4096) -> Iterator[Tuple[List[str], List[List[float]]]]:
+        """Every (psql_id, embedding) row of a loaded collection, in batches."""
+        iterator = get_collection(collection_name).query_iterator(
+            batch_size=batch_size, output_fields=["psql_id", EMBEDDING_FIELD])
         try:
-            result = utility.has_collection(
-                collection_name=collection_name, using="milvus_ops")
+            while True:
+                rows = iterator.next()
+                if not rows:
+                    break
+                yield [row["psql_id"] for row in rows], [row[EMBEDDING_FIELD] for row in rows]
         finally:
-            cls._disconnect()
-        return result
+            iterator.close()
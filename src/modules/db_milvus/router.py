@@ -1,12 +1,23 @@
-from fastapi import APIRouter, Body
+from typing import Annotated, Any, Dict
+
+from fastapi import APIRouter, Body, Path
 
 from src.schemas import ApiResponse, PlainDataResponse
 from src.modules.db_milvus.services import (
     create_new_collection,
     delete_collection,
     get_collection_list,
+    create_index,
+    get_index_info,
+    load_collection,
+    release_collection,
+)
+from src.modules.db_milvus.dto import (
+    CreateCollectionPayload,
+    DeleteCollectionPayload,
+    CollectionNamePayload,
+    CreateIndexPayload,
 )
-from src.modules.db_milvus.dto import CreateCollectionPayload, DeleteCollectionPayload
 
 router = APIRouter(
     prefix="/db_milvus",
@@ -43,3 +54,51 @@ def delete_collection_handler(
         return ApiResponse(data=PlainDataResponse(message=f"Collection '{payload.collection_name}' deleted successfully."))
     except Exception as e:
         return ApiResponse(data=PlainDataResponse(error=str(e)))
+
+
+@router.post("/create_index", description="Build (or rebuild) the vector index of a collection: HNSW, IVF_FLAT or IVF_PQ")
+def create_index_handler(
+    payload: CreateIndexPayload = Body(...)
+) -> ApiResponse[Dict[str, Any] | PlainDataResponse]:
+    try:
+        index_info = create_index(payload)
+        return ApiResponse(data=index_info)
+    except Exception as e:
+        return ApiResponse(data=PlainDataResponse(error=str(e)))
+
+
+@router.get("/index/{collection_name}", description="Get index definitions and load state of a collection")
+def get_index_info_handler(
+    collection_name: Annotated[str, Path(
+        title="Collection Name",
+        description="Name of the Milvus collection",
+        examples=["post_embeddings_..."],
+    )]
+) -> ApiResponse[Dict[str, Any] | PlainDataResponse]:
+    try:
+        index_info = get_index_info(collection_name)
+        return ApiResponse(data=index_info)
+    except Exception as e:
+        return ApiResponse(data=PlainDataResponse(error=str(e)))
+
+
+@router.post("/load_collection", description="Load a collection into memory so it can be searched")
+def load_collection_handler(
+    payload: CollectionNamePayload = Body(...)
+) -> ApiResponse[PlainDataResponse]:
+    try:
+        load_collection(payload.collection_name)
+        return ApiResponse(data=PlainDataResponse(message=f"Collection '{payload.collection_name}' loaded."))
+    except Exception as e:
+        return ApiResponse(data=PlainDataResponse(error=str(e)))
+
+
+@router.post("/release_collection", description="Release a collection from memory")
+def release_collection_handler(
+    payload: CollectionNamePayload = Body(...)
+) -> ApiResponse[PlainDataResponse]:
+    try:
+        release_collection(payload.collection_name)
+        return ApiResponse(data=PlainDataResponse(message=f"Collection '{payload.collection_name}' released."))
+    except Exception as e:
+        return ApiResponse(data=PlainDataResponse(error=str(e)))
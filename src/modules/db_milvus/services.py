@@ -1,6 +1,15 @@
+from typing import Any, Dict, List, Optional
+
+from src.modules.db_milvus.common import EMBEDDING_FIELD, DEFAULT_INDEX_PARAMS, DEFAULT_SEARCH_PARAMS
+from src.modules.db_milvus.dto import CreateIndexPayload
 from src.modules.db_milvus.repository import MilvusRepository
 
 
+# Per collection search setup (search params and field names), resolved
+# once per process; dropped whenever the index or load state changes
+_search_setup_cache: Dict[str, Dict[str, Any]] = {}
+
+
 def get_collection_list() -> list[str]:
     return MilvusRepository.get_all_collections()
 
@@ -21,3 +30,100 @@ def delete_collection(collection_name: str) -> None:
         raise ValueError(f"Collection '{collection_name}' does not exist.")
 
     MilvusRepository.delete_collection(collection_name)
+    _search_setup_cache.pop(collection_name, None)
+
+
+def _ensure_collection(collection_name: str) -> None:
+    if not collection_name:
+        raise ValueError("Collection name is required")
+    if not MilvusRepository.has_collection(collection_name):
+        raise ValueError(f"Collection '{collection_name}' does not exist.")
+
+
+def create_index(payload: CreateIndexPayload) -> Dict[str, Any]:
+    _ensure_collection(payload.collection_name)
+
+    index_params = {
+        "index_type": payload.index_type,
+        "metric_type": payload.metric_type,
+        "params": payload.params or DEFAULT_INDEX_PARAMS[payload.index_type],
+    }
+    _search_setup_cache.pop(payload.collection_name, None)
+    MilvusRepository.create_index(
+        payload.collection_name, EMBEDDING_FIELD, index_params)
+
+    if payload.load:
+        MilvusRepository.load_collection(payload.collection_name)
+
+    return get_index_info(payload.collection_name)
+
+
+def get_index_info(collection_name: str) -> Dict[str, Any]:
+    _ensure_collection(collection_name)
+
+    indexes = MilvusRepository.get_indexes(collection_name)
+    return {
+        "collection_name": collection_name,
+        "load_state": MilvusRepository.get_load_state(collection_name),
+        "indexes": indexes,
+        "search_params": get_search_params(indexes),
+    }
+
+
+def get_search_params(indexes: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Default search params for the collection's vector index, None if it has none."""
+    for index in indexes:
+        index_param = index.get("index_param", {})
+        if index.get("field") == EMBEDDING_FIELD:
+            return {
+                "metric_type": index_param.get("metric_type", "IP"),
+                "params": DEFAULT_SEARCH_PARAMS.get(index_param.get("index_type"), {}),
+            }
+    # Milvus can neither load nor search a vector field without an index
+    return None
+
+
+def _require_index(collection_name: str) -> Dict[str, Any]:
+    """Search params of the collection's vector index; raises if it has none."""
+    search_params = get_search_params(MilvusRepository.get_indexes(collection_name))
+    if search_params is None:
+        raise ValueError(
+            f"Collection '{collection_name}' has no vector index; build one with create_index first.")
+    return search_params
+
+
+def load_collection(collection_name: str) -> None:
+    _ensure_collection(collection_name)
+    _require_index(collection_name)
+    MilvusRepository.load_collection(collection_name)
+
+
+def release_collection(collection_name: str) -> None:
+    _ensure_collection(collection_name)
+    _search_setup_cache.pop(collection_name, None)
+    MilvusRepository.release_collection(collection_name)
+
+
+def build_default_index(collection_name: str, index_type: str = "HNSW", params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """IP index over the embedding field, then load; used after embedding jobs."""
+    return create_index(CreateIndexPayload(
+        collection_name=collection_name, index_type=index_type, params=params))
+
+
+def get_search_setup(collection_name: str) -> Dict[str, Any]:
+    """
+    Search params and field names of a collection, loading it if needed.
+
+    Cached so a query costs a single Milvus round trip.
+    """
+    setup = _search_setup_cache.get(collection_name)
+    if setup is None:
+        _ensure_collection(collection_name)
+        search_params = _require_index(collection_name)
+        MilvusRepository.load_collection(collection_name)
+        setup = {
+            "search_params": search_params,
+            "fields": set(MilvusRepository.get_field_names(collection_name)),
+        }
+        _search_setup_cache[collection_name] = setup
+    return setup
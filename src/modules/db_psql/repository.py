@@ -1,105 +1,62 @@
-from src.config import (
-    DB_USER,
-    DB_PASSWORD,
-    DB_HOST,
-    DB_PORT,
-)
-
-import psycopg
+from src.config import DB_NAME
+
 from psycopg import sql
 
+from src.shared.db.postgres import get_admin_connection, get_database_connection, close_app_pool
+
 
 class DatabasesRepository:
     @classmethod
     async def get_all(cls) -> list[str]:
-        aconn = await psycopg.AsyncConnection.connect(
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname="postgres",
-            autocommit=True
-        )
-        acur = aconn.cursor()
-
-        await acur.execute(sql.SQL("""
-            SELECT datname FROM pg_database
-            """))
-        result = await acur.fetchall()
-
-        await acur.close()
-        await aconn.close()
+        async with get_admin_connection() as aconn:
+            async with aconn.cursor() as acur:
+                await acur.execute(sql.SQL("""
+                    SELECT datname FROM pg_database
+                    """))
+                result = await acur.fetchall()
 
         return [row[0] for row in result]
 
     @classmethod
     async def add_one(cls, dbname: str) -> None:
-        aconn = await psycopg.AsyncConnection.connect(
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname="postgres",
-            autocommit=True
-        )
-        acur = aconn.cursor()
-
-        await acur.execute(sql.SQL("""
-            CREATE DATABASE {dbname}
-            """).format(
-            dbname=sql.Identifier(dbname)
-        ))
-        await aconn.commit()
-
-        await acur.close()
-        await aconn.close()
+        async with get_admin_connection() as aconn:
+            async with aconn.cursor() as acur:
+                await acur.execute(sql.SQL("""
+                    CREATE DATABASE {dbname}
+                    """).format(
+                    dbname=sql.Identifier(dbname)
+                ))
 
     @classmethod
     async def delete(cls, dbname: str) -> None:
-        aconn = await psycopg.AsyncConnection.connect(
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname="postgres",
-            autocommit=True
-        )
-        acur = aconn.cursor()
-
-        await acur.execute(sql.SQL("""
-            DROP DATABASE IF EXISTS {dbname}
-            """).format(
-            dbname=sql.Identifier(dbname)
-        ))
-        await aconn.commit()
-
-        await acur.close()
-        await aconn.close()
+        if dbname == DB_NAME:
+            # Idle pooled sessions would block the drop
+            await close_app_pool()
+
+        async with get_admin_connection() as aconn:
+            async with aconn.cursor() as acur:
+                await acur.execute(sql.SQL("""
+                    DROP DATABASE IF EXISTS {dbname}
+                    """).format(
+                    dbname=sql.Identifier(dbname)
+                ))
 
     @classmethod
     async def recreate_public_schema(cls, dbname: str) -> None:
-        async with await psycopg.AsyncConnection.connect(
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=dbname,
-        ) as aconn:
+        async with get_database_connection(dbname) as aconn:
             async with aconn.cursor() as acur:
                 await acur.execute(sql.SQL("""
                     DROP SCHEMA public CASCADE;
                     CREATE SCHEMA public;
                     """))
 
+        if dbname == DB_NAME:
+            # Pooled sessions may hold prepared statements for dropped tables
+            await close_app_pool()
+
     @classmethod
     async def create_tables(cls, dbname: str) -> None:
-        async with await psycopg.AsyncConnection.connect(
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=dbname,
-        ) as aconn:
+        async with get_database_connection(dbname) as aconn:
             async with aconn.cursor() as acur:
                 await acur.execute(sql.SQL("""
                     CREATE TABLE IF NOT EXISTS tg_exports (
@@ -166,18 +123,36 @@ class DatabasesRepository:
                     )
                     """))
 
+                # Keyset pagination of an export's posts and media lookups per post
+                await acur.execute(sql.SQL("""
+                    CREATE INDEX IF NOT EXISTS ix_posts_from_id_id ON posts (from_id, id)
+                    """))
+
+                await acur.execute(sql.SQL("""
+                    CREATE INDEX IF NOT EXISTS ix_medias_post_id ON medias (post_id)
+                    """))
+
+                await acur.execute(sql.SQL("""
+                    CREATE INDEX IF NOT EXISTS ix_media_datas_media_id ON media_datas (media_id)
+                    """))
+
                 await acur.execute(sql.SQL("""
                     CREATE TABLE IF NOT EXISTS jobs (
                         id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
 
                         status VARCHAR(50) NOT NULL DEFAULT 'pending',
                         metadata TEXT,
+                        progress JSONB,
 
                         created_at TIMESTAMPTZ DEFAULT (NOW() AT TIME ZONE 'UTC'),
                         updated_at TIMESTAMPTZ
                     )
                     """))
 
+                await acur.execute(sql.SQL("""
+                    ALTER TABLE jobs ADD COLUMN IF NOT EXISTS progress JSONB
+                    """))
+
                 await acur.execute(sql.SQL("""
                     CREATE TABLE IF NOT EXISTS experiments (
                         id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
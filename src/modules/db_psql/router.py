@@ -10,7 +10,8 @@ from src.modules.db_psql.services import (
     get_database_list,
     create_tables,
     recreate_public_schema,
-    setup_database
+    setup_database,
+    get_connection_pool_stats
 )
 
 
@@ -29,6 +30,15 @@ async def get_database_list_handler() -> ApiResponse[list[str] | PlainDataRespon
         return ApiResponse(data=PlainDataResponse(error=str(e)))
 
 
+@router.get("/pool_stats", description="Get connection pool statistics: size, in-use, waiting requests, connect latency")
+async def get_pool_stats_handler() -> ApiResponse[dict | PlainDataResponse]:
+    try:
+        stats = await get_connection_pool_stats()
+        return ApiResponse(data=stats)
+    except Exception as e:
+        return ApiResponse(data=PlainDataResponse(error=str(e)))
+
+
 @router.post("/create_new_database/{dbname}", description="Initialize new database inside psql container with given name")
 async def create_new_database_handler(
     dbname: Annotated[str, Path(
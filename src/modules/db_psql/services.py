@@ -1,5 +1,6 @@
 from src.modules.db_psql.common import DB_EXCEPRIONS_LIST
 from src.modules.db_psql.repository import DatabasesRepository
+from src.shared.db.postgres import get_pool_stats
 
 
 async def get_database_list() -> list[str]:
@@ -61,3 +62,7 @@ async def setup_database(dbname: str) -> None:
 
     # Create tables
     await create_tables(dbname)
+
+
+async def get_connection_pool_stats() -> dict:
+    return get_pool_stats()
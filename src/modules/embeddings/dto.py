@@ -1,6 +1,52 @@
-from pydantic import BaseModel
+from typing import Any, Dict, List, Literal, Optional
+from datetime import datetime
+from pydantic import BaseModel, Field
 from uuid import UUID
 
 
 class GeneratePostEmbeddingsPayload(BaseModel):
     model_name: str = "text-embedding-intfloat-multilingual-e5-large-instruct"
+    concurrency: int = Field(
+        4, ge=1, le=64, description="Embedding requests kept in flight")
+    batch_size: int = Field(
+        32, ge=1, description="Initial batch size; adapted to observed latency while the job runs")
+    max_batch_size: int = Field(
+        256, ge=1, description="Upper bound for the adaptive batch size")
+    use_cache: bool = Field(
+        True, description="Reuse embeddings of unchanged texts from the local embedding cache")
+    milvus_insert_rows: int = Field(
+        8192, ge=1, description="Rows buffered before one Milvus insert")
+    milvus_flush_interval: Optional[float] = Field(
+        None, gt=0, description="Seconds between Milvus flushes; by default the collection is flushed once at the end")
+    index_type: Optional[Literal["HNSW", "IVF_FLAT", "IVF_PQ"]] = Field(
+        "HNSW", description="Vector index built (IP metric) and loaded when the job finishes; null to skip")
+    recreate_collection: bool = Field(
+        False, description="Drop and rebuild the collection first, e.g. to add the date/has_media filter fields to a collection built before they existed")
+    post_ids: Optional[List[UUID]] = Field(
+        None, description="Embed only these posts, e.g. the failed_post_ids of an earlier job")
+
+
+class SearchPostsPayload(BaseModel):
+    query: str = Field(..., min_length=1)
+    model_name: str = "text-embedding-intfloat-multilingual-e5-large-instruct"
+    top_k: int = Field(10, ge=1, le=100)
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    has_media: Optional[bool] = None
+    search_params: Optional[Dict[str, Any]] = Field(
+        None, description="Override index search params, e.g. {\"ef\": 128} for HNSW or {\"nprobe\": 32} for IVF")
+
+
+class ExactSearchPayload(BaseModel):
+    query: str = Field(..., min_length=1)
+    model_name: str = "text-embedding-intfloat-multilingual-e5-large-instruct"
+    top_k: int = Field(10, ge=1, le=100)
+
+
+class MeasureRecallPayload(BaseModel):
+    num_queries: int = Field(
+        100, ge=1, le=10000, description="Stored vectors sampled as queries")
+    top_k: int = Field(10, ge=1, le=100)
+    search_params: Optional[Dict[str, Any]] = Field(
+        None, description="Index search params to evaluate, e.g. {\"ef\": 64}; defaults to the collection's")
+    seed: int = 0
@@ -0,0 +1,162 @@
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+
+EMBEDDINGS_FILE = "embeddings.npy"
+IDS_FILE = "ids.npy"
+META_FILE = "meta.json"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Rows scaled to unit length; zero rows stay zero."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class ExactIndexWriter:
+    """
+    Writes an exact-search index directory: an (n, dim) float32 matrix and a
+    psql_id sidecar, both .npy files written through memory maps.
+
+    `capacity` is an upper bound on the row count (e.g. Milvus num_entities);
+    the real count is stored in meta.json. Files are written to a temporary
+    directory that replaces `directory` on `commit()`, so readers never see a
+    partial index. For COSINE, rows are stored L2-normalized so a plain
+    inner product ranks them by cosine similarity.
+    """
+
+    def __init__(self, directory: Union[str, Path], capacity: int, dim: int, metric_type: str = "IP", id_length: int = 64, **meta):
+        self.directory = Path(directory)
+        self.tmp_directory = self.directory.with_name(self.directory.name + ".tmp")
+        shutil.rmtree(self.tmp_directory, ignore_errors=True)
+        self.tmp_directory.mkdir(parents=True)
+
+        self.metric_type = metric_type
+        self.meta = meta
+        self.count = 0
+        self._embeddings = np.lib.format.open_memmap(
+            self.tmp_directory / EMBEDDINGS_FILE, mode="w+", dtype=np.float32, shape=(max(capacity, 1), dim))
+        self._ids = np.lib.format.open_memmap(
+            self.tmp_directory / IDS_FILE, mode="w+", dtype=f"S{id_length}", shape=(max(capacity, 1),))
+
+    def add(self, ids: List[str], vectors: Union[np.ndarray, List[List[float]]]) -> None:
+        end = self.count + len(ids)
+        if end > len(self._ids):
+            raise ValueError(f"Index capacity of {len(self._ids)} rows exceeded")
+        if self.metric_type == "COSINE":
+            vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        self._embeddings[self.count:end] = vectors
+        self._ids[self.count:end] = [i.encode("ascii") for i in ids]
+        self.count = end
+
+    def commit(self) -> None:
+        self._embeddings.flush()
+        self._ids.flush()
+        del self._embeddings, self._ids
+        with open(self.tmp_directory / META_FILE, "w") as f:
+            json.dump({**self.meta, "count": self.count, "metric_type": self.metric_type,
+                       "normalized": self.metric_type == "COSINE"}, f)
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.replace(self.tmp_directory, self.directory)
+
+    def abort(self) -> None:
+        del self._embeddings, self._ids
+        shutil.rmtree(self.tmp_directory, ignore_errors=True)
+
+
+class ExactSearchIndex:
+    """
+    Brute-force top-k search over a memory-mapped embedding matrix.
+
+    Rows are scanned `block_rows` at a time: one matrix product per block,
+    `argpartition` to keep the block's best k per query, then a merge with
+    the running top k. Memory stays at O(queries x block_rows) whatever the
+    matrix size, and results equal a Milvus FLAT search with the same metric
+    (IP and COSINE: larger is better; L2: squared distance, smaller is
+    better). COSINE queries are normalized like the stored rows.
+    """
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+        with open(self.directory / META_FILE) as f:
+            self.meta = json.load(f)
+        self.metric_type = self.meta["metric_type"]
+        if self.metric_type == "COSINE" and not self.meta.get("normalized"):
+            raise ValueError("This COSINE index was exported with unnormalized vectors; export it again.")
+        count = self.meta["count"]
+        self.embeddings = np.load(self.directory / EMBEDDINGS_FILE, mmap_mode="r")[:count]
+        self.ids = np.load(self.directory / IDS_FILE, mmap_mode="r")[:count]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dim(self) -> int:
+        return self.embeddings.shape[1]
+
+    def search_ids(self, queries: np.ndarray, k: int, block_rows: int = 65536) -> Tuple[np.ndarray, np.ndarray]:
+        """Row indices and scores of the top k per query, best first; both (q, k)."""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if self.metric_type == "COSINE":
+            queries = _normalize(queries)
+        k = min(k, len(self))
+        if k == 0:
+            return np.zeros((len(queries), 0), dtype=np.int64), np.zeros((len(queries), 0), dtype=np.float32)
+        # Larger is better internally; L2 is ranked by -(|x|^2 - 2 q.x)
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), k), dtype=np.int64)
+
+        for start in range(0, len(self), block_rows):
+            block = self.embeddings[start:start + block_rows]
+            scores = queries @ block.T
+            if self.metric_type == "L2":
+                scores = 2 * scores - np.einsum("ij,ij->i", block, block)
+            if scores.shape[1] > k:
+                top = np.argpartition(scores, -k, axis=1)[:, -k:]
+                scores = np.take_along_axis(scores, top, axis=1)
+            else:
+                top = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+
+            merged_scores = np.concatenate([best_scores, scores], axis=1)
+            merged_rows = np.concatenate([best_rows, top + start], axis=1)
+            keep = np.argpartition(merged_scores, -k, axis=1)[:, -k:]
+            best_scores = np.take_along_axis(merged_scores, keep, axis=1)
+            best_rows = np.take_along_axis(merged_rows, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        if self.metric_type == "L2":
+            best_scores = np.einsum("ij,ij->i", queries, queries)[:, None] - best_scores
+        return best_rows, best_scores
+
+    def search(self, queries: np.ndarray, k: int, block_rows: int = 65536) -> List[List[Tuple[str, float]]]:
+        """(psql_id, score) pairs per query, best first, like MilvusRepository.search."""
+        rows, scores = self.search_ids(queries, k, block_rows)
+        return [
+            [(self.ids[row].decode("ascii"), float(score)) for row, score in zip(query_rows, query_scores)]
+            for query_rows, query_scores in zip(rows, scores)
+        ]
+
+
+def recall_at_k(approximate: List[List[Tuple[str, float]]], exact: List[List[Tuple[str, float]]], k: int) -> float:
+    """Mean share of the exact top k ids found by the approximate search."""
+    if not exact:
+        return 0.0
+    hits = 0
+    for approx_hits, exact_hits in zip(approximate, exact):
+        expected = {psql_id for psql_id, _ in exact_hits[:k]}
+        hits += len(expected & {psql_id for psql_id, _ in approx_hits[:k]}) / max(1, len(expected))
+    return hits / len(exact)
+
+
+def open_index(directory: Union[str, Path]) -> Optional[ExactSearchIndex]:
+    """The index in `directory`, or None if it was never exported."""
+    if not (Path(directory) / META_FILE).exists():
+        return None
+    return ExactSearchIndex(directory)
@@ -1,42 +1,145 @@
-from typing import List
+import json
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
 from uuid import UUID
-from src.config import DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME
-import psycopg
+import aiosqlite
 from psycopg import sql
 from psycopg.rows import dict_row
 
-from src.modules.embeddings.schemas import PostForEmbedding, PostMediaForEmbedding
+from src.shared.db.postgres import get_connection
+from src.shared.db import sqlite
+from src.modules.experiments.utils import get_experiment_sqlite_path
+
+from src.modules.embeddings.schemas import PostForEmbedding
+
+
+# Image descriptions of post p, in media name order, as a text[]
+MEDIA_DESCRIPTIONS_SUBQUERY = sql.SQL("""
+    SELECT COALESCE(
+        array_agg(md.description ORDER BY m.name)
+            FILTER (WHERE md.description IS NOT NULL),
+        '{}'
+    ) as media_descriptions
+    FROM medias m
+    JOIN media_datas md ON m.id = md.media_id
+    WHERE m.post_id = p.id AND m.mime_type LIKE 'image/%%'
+""")
 
 
 class PostEmbeddingsRepository:
     @classmethod
-    async def get_posts_for_embedding_by_export_id(cls, export_id: UUID, limit: int, offset: int) -> List[PostForEmbedding]:
-        async with await psycopg.AsyncConnection.connect(
-            user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT, dbname=DB_NAME
-        ) as aconn:
+    async def get_posts_for_embedding_by_export_id(cls, export_id: UUID, limit: int, after_id: Optional[UUID] = None) -> List[PostForEmbedding]:
+        """
+        Page through the posts of an export in id order, each with the
+        descriptions of its images aggregated in the same query.
+
+        Keyset pagination: pass the post_id of the last item of the previous
+        page as `after_id`. Served by the (from_id, id) index, so every page
+        is an index seek regardless of how far the job has progressed. The
+        lateral aggregate runs only for the posts of the page, via the
+        medias(post_id) and media_datas(media_id) indexes.
+        """
+        async with get_connection() as aconn:
             async with aconn.cursor(row_factory=dict_row) as acur:
                 await acur.execute(sql.SQL("""
-                    SELECT p.id as post_id, p.post_text, te.photos_path
+                    SELECT p.id as post_id, p.post_text, te.photos_path, p.date,
+                           COALESCE(p.has_media, FALSE) as has_media, d.media_descriptions
                     FROM posts p
                     JOIN tg_exports te ON p.from_id = te.id
-                    WHERE te.id = %s
+                    CROSS JOIN LATERAL ({media_descriptions}) d
+                    WHERE p.from_id = %s AND p.id > %s
                     ORDER BY p.id
-                    LIMIT %s OFFSET %s
-                """), (export_id, limit, offset))
+                    LIMIT %s
+                """).format(media_descriptions=MEDIA_DESCRIPTIONS_SUBQUERY), (export_id, after_id or UUID(int=0), limit))
                 result = await acur.fetchall()
                 return [PostForEmbedding(**row) for row in result]
 
     @classmethod
-    async def get_media_for_post(cls, post_id: UUID) -> List[PostMediaForEmbedding]:
-        async with await psycopg.AsyncConnection.connect(
-            user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT, dbname=DB_NAME
-        ) as aconn:
+    async def get_posts_by_ids(cls, post_ids: List[UUID]) -> List[dict]:
+        """Posts with their image descriptions for a set of ids, in one query."""
+        if not post_ids:
+            return []
+        async with get_connection() as aconn:
             async with aconn.cursor(row_factory=dict_row) as acur:
                 await acur.execute(sql.SQL("""
-                    SELECT m.id as media_id, m.name as media_name, md.description
-                    FROM medias m
-                    LEFT JOIN media_datas md ON m.id = md.media_id
-                    WHERE m.post_id = %s AND m.mime_type LIKE 'image/%%'
-                """), (post_id,))
-                result = await acur.fetchall()
-                return [PostMediaForEmbedding(**row) for row in result]
+                    SELECT p.id as post_id, p.post_text, p.date,
+                           COALESCE(p.has_media, FALSE) as has_media, d.media_descriptions
+                    FROM posts p
+                    CROSS JOIN LATERAL ({media_descriptions}) d
+                    WHERE p.id = ANY(%s)
+                """).format(media_descriptions=MEDIA_DESCRIPTIONS_SUBQUERY), (post_ids,))
+                return await acur.fetchall()
+
+
+# Image descriptions of post p in the experiment dataset, in media name order,
+# as a JSON array. Datasets not yet migrated may still hold failures as
+# "Error: ..." text; those are skipped.
+SQLITE_MEDIA_DESCRIPTIONS_SUBQUERY = """
+    SELECT json_group_array(description) FROM (
+        SELECT md.description
+        FROM medias m
+        JOIN media_datas md ON m.id = md.media_id
+        WHERE m.post_id = p.id AND m.mime_type LIKE 'image/%'
+            AND md.description IS NOT NULL AND md.description NOT LIKE 'Error:%'
+        ORDER BY m.name
+    )
+"""
+
+
+def _experiment_post_row(row: tuple) -> dict:
+    return {
+        "post_id": UUID(row[0]),
+        "post_text": row[1],
+        "date": datetime.fromisoformat(row[2]) if row[2] else None,
+        "has_media": bool(row[3]),
+        "media_descriptions": json.loads(row[4]) if row[4] else [],
+    }
+
+
+class ExperimentPostEmbeddingsRepository:
+    """Posts to embed, read from the experiment's SQLite dataset written by the parser and the media-description job."""
+
+    @classmethod
+    def _connect_read_only(cls, experiment_id: UUID) -> aiosqlite.Connection:
+        # The embedding job never writes the dataset. The parser switches the
+        # file to WAL, so this reader does not block writers.
+        return sqlite.connect(get_experiment_sqlite_path(experiment_id), read_only=True)
+
+    @classmethod
+    async def iter_posts_for_embedding(cls, experiment_id: UUID, export_id: Optional[UUID] = None, batch_size: int = 500) -> AsyncIterator[List[PostForEmbedding]]:
+        """
+        Stream posts with their image descriptions in batches.
+
+        One query and one cursor for the whole dataset, read with fetchmany;
+        with export_id only posts of that export are returned.
+        """
+        async with cls._connect_read_only(experiment_id) as db:
+            async with db.execute(
+                f"""
+                SELECT p.id, p.post_text, p.date, p.has_media, ({SQLITE_MEDIA_DESCRIPTIONS_SUBQUERY})
+                FROM posts p
+                WHERE ? IS NULL OR p.from_id = ?
+                """,
+                (str(export_id) if export_id else None,) * 2,
+            ) as cursor:
+                while True:
+                    rows = await cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield [PostForEmbedding(**_experiment_post_row(row)) for row in rows]
+
+    @classmethod
+    async def get_posts_by_ids(cls, experiment_id: UUID, post_ids: List[UUID]) -> List[dict]:
+        if not post_ids:
+            return []
+        database = await sqlite.get_database(get_experiment_sqlite_path(experiment_id))
+        async with database.read() as db:
+            cursor = await db.execute(
+                f"""
+                SELECT p.id, p.post_text, p.date, p.has_media, ({SQLITE_MEDIA_DESCRIPTIONS_SUBQUERY})
+                FROM posts p
+                WHERE p.id IN ({", ".join("?" * len(post_ids))})
+                """,
+                [str(post_id) for post_id in post_ids],
+            )
+            return [_experiment_post_row(row) for row in await cursor.fetchall()]
@@ -2,8 +2,22 @@ from typing import Annotated
 from uuid import UUID
 from fastapi import APIRouter, Body, BackgroundTasks, Path
 
-from src.modules.embeddings.dto import GeneratePostEmbeddingsPayload
-from src.modules.embeddings.services import start_post_embedding_generation_by_export
+from src.modules.embeddings.dto import (
+    GeneratePostEmbeddingsPayload,
+    SearchPostsPayload,
+    ExactSearchPayload,
+    MeasureRecallPayload,
+)
+from src.modules.embeddings.schemas import PostSearchResult
+from src.modules.embeddings.services import (
+    start_post_embedding_generation_by_export,
+    start_post_embedding_generation_by_experiment,
+    search_posts,
+    get_search_latency,
+    start_exact_index_export,
+    search_exact,
+    measure_recall,
+)
 from src.schemas import PlainDataResponse, ApiResponse
 
 
@@ -32,3 +46,96 @@ async def generate_embeddings_by_export_handler(
         )
     except Exception as e:
         return ApiResponse(data=PlainDataResponse(error=str(e)))
+
+
+@router.post(
+    "/generate_embeddings/by_experiment/{experiment_id}",
+    description="Start background job to embed the posts of an experiment's SQLite dataset, including image descriptions, into the experiment's Milvus collection",
+)
+async def generate_embeddings_by_experiment_handler(
+    background_tasks: BackgroundTasks,
+    experiment_id: Annotated[UUID, Path(description="ID of the experiment")],
+    payload: Annotated[GeneratePostEmbeddingsPayload, Body()],
+) -> ApiResponse[PlainDataResponse]:
+    try:
+        await start_post_embedding_generation_by_experiment(
+            experiment_id, payload, background_tasks
+        )
+        return ApiResponse(
+            data=PlainDataResponse(
+                message="No errors at start, processing started.")
+        )
+    except Exception as e:
+        return ApiResponse(data=PlainDataResponse(error=str(e)))
+
+
+@router.post(
+    "/search/by_tg_export/{tg_export_id}",
+    description="Semantic search over the post embeddings of a tg_export, with optional date range and has_media filters",
+)
+async def search_posts_handler(
+    tg_export_id: Annotated[UUID, Path(description="ID of the tg_export")],
+    payload: Annotated[SearchPostsPayload, Body()],
+) -> ApiResponse[PostSearchResult | PlainDataResponse]:
+    try:
+        result = await search_posts(tg_export_id, payload)
+        return ApiResponse(data=result)
+    except Exception as e:
+        return ApiResponse(data=PlainDataResponse(error=str(e)))
+
+
+@router.get("/search/latency", description="Search latency percentiles per stage (embed, search, hydrate, total)")
+async def get_search_latency_handler() -> ApiResponse[dict | PlainDataResponse]:
+    try:
+        stats = await get_search_latency()
+        return ApiResponse(data=stats)
+    except Exception as e:
+        return ApiResponse(data=PlainDataResponse(error=str(e)))
+
+
+@router.post(
+    "/exact/export/by_experiment/{experiment_id}",
+    description="Start background job to copy the experiment's Milvus collection into a local exact-search index",
+)
+async def export_exact_index_handler(
+    background_tasks: BackgroundTasks,
+    experiment_id: Annotated[UUID, Path(description="ID of the experiment")],
+) -> ApiResponse[PlainDataResponse]:
+    try:
+        await start_exact_index_export(experiment_id, background_tasks)
+        return ApiResponse(
+            data=PlainDataResponse(
+                message="No errors at start, processing started.")
+        )
+    except Exception as e:
+        return ApiResponse(data=PlainDataResponse(error=str(e)))
+
+
+@router.post(
+    "/exact/search/by_experiment/{experiment_id}",
+    description="Exact top-k search over the experiment's local index, without Milvus",
+)
+async def search_exact_handler(
+    experiment_id: Annotated[UUID, Path(description="ID of the experiment")],
+    payload: Annotated[ExactSearchPayload, Body()],
+) -> ApiResponse[PostSearchResult | PlainDataResponse]:
+    try:
+        result = await search_exact(experiment_id, payload)
+        return ApiResponse(data=result)
+    except Exception as e:
+        return ApiResponse(data=PlainDataResponse(error=str(e)))
+
+
+@router.post(
+    "/exact/recall/by_experiment/{experiment_id}",
+    description="Recall@k of the Milvus index and search params against the exact index",
+)
+async def measure_recall_handler(
+    experiment_id: Annotated[UUID, Path(description="ID of the experiment")],
+    payload: Annotated[MeasureRecallPayload, Body()],
+) -> ApiResponse[dict | PlainDataResponse]:
+    try:
+        result = await measure_recall(experiment_id, payload)
+        return ApiResponse(data=result)
+    except Exception as e:
+        return ApiResponse(data=PlainDataResponse(error=str(e)))
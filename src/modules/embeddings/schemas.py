@@ -1,4 +1,5 @@
-from typing import Optional, List
+from typing import Optional, List, Dict
+from datetime import datetime
 from pydantic import BaseModel
 from uuid import UUID
 
@@ -6,10 +7,24 @@ from uuid import UUID
 class PostForEmbedding(BaseModel):
     post_id: UUID
     post_text: Optional[str] = None
-    photos_path: str
+    photos_path: Optional[str] = None
+    date: Optional[datetime] = None
+    has_media: bool = False
+    # Descriptions of the post's images, in media name order
+    media_descriptions: List[str] = []
 
 
-class PostMediaForEmbedding(BaseModel):
-    media_id: UUID
-    media_name: str
-    description: Optional[str] = None
+class PostSearchHit(BaseModel):
+    post_id: UUID
+    score: float
+    post_text: Optional[str] = None
+    date: Optional[datetime] = None
+    has_media: bool = False
+    media_descriptions: List[str] = []
+
+
+class PostSearchResult(BaseModel):
+    hits: List[PostSearchHit]
+    # Milliseconds spent in each stage: embed, search, hydrate, total
+    timings_ms: Dict[str, float]
+    query_embedding_cached: bool
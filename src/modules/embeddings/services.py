@@ -1,165 +1,237 @@
 from uuid import UUID
-from typing import List
-import torch
+from typing import AsyncIterator, List, NamedTuple, Optional, Tuple
+import time
+import asyncio
+import numpy as np
+from pathlib import Path
+from contextlib import AsyncExitStack
 from fastapi import BackgroundTasks
-from pymilvus import Collection
 
-from src.modules.embeddings.dto import GeneratePostEmbeddingsPayload
-from src.modules.embeddings.repository import PostEmbeddingsRepository
-from src.modules.embeddings.schemas import PostForEmbedding, PostMediaForEmbedding
-from src.modules.jobs.services import add_job, update_job_status
+from src.modules.embeddings.dto import (
+    GeneratePostEmbeddingsPayload,
+    SearchPostsPayload,
+    ExactSearchPayload,
+    MeasureRecallPayload,
+)
+from src.modules.embeddings.exact_search import ExactIndexWriter, ExactSearchIndex, open_index, recall_at_k
+from src.modules.embeddings.repository import PostEmbeddingsRepository, ExperimentPostEmbeddingsRepository
+from src.modules.embeddings.schemas import PostForEmbedding, PostSearchHit, PostSearchResult
+from src.modules.experiments.services import get_experiment
+from src.modules.experiments.utils import get_experiment_directory_path
+from src.modules.jobs.services import add_job, update_job_status, update_job_progress
 from src.modules.jobs.schemas import JobStatus, AddJob, UpdateJobStatus
 from src.modules.db_milvus.repository import MilvusRepository
+from src.modules.db_milvus.services import build_default_index, delete_collection, get_search_setup
+from src.shared.db.milvus import BufferedMilvusWriter
 from src.shared.llm.openai_embedder import OpenAIEmbedder
+from src.shared.llm.embedding_cache import EmbeddingCache
+from src.config import QUERY_EMBEDDING_CACHE_SIZE
+from src.utils import LatencyRecorder, LRUCache
 
 
-async def create_embedding_collection(collection_name: str):
+async def create_embedding_collection(collection_name: str, recreate: bool = False):
     # Create Milvus collection for post embeddings (assuming 1024-dimensional embeddings)
-    MilvusRepository.create_collection(collection_name, 1024)
+    if recreate and await asyncio.to_thread(MilvusRepository.has_collection, collection_name):
+        await asyncio.to_thread(delete_collection, collection_name)
+    await asyncio.to_thread(MilvusRepository.create_collection, collection_name, 1024)
 
 
-async def store_embeddings_in_milvus(collection_name: str, psql_ids: List[UUID], embeddings: torch.Tensor):
-    # Connect to Milvus
-    MilvusRepository._connect()
-    try:
-        # Get the collection
-        collection = Collection(
-            name=collection_name,
-            using="milvus_ops"
-        )
+def build_post_text(post_item: PostForEmbedding) -> str:
+    """Combine post text with the descriptions of its images."""
+    parts = []
+    if post_item.post_text:
+        parts.append(post_item.post_text)
+    parts.extend(post_item.media_descriptions)
+    return " ".join(parts).strip()
 
-        # Insert the embeddings in batch
-        collection.insert([
-            [str(psql_id) for psql_id in psql_ids],  # psql_ids as varchar
-            # embeddings as float vectors
-            [embedding.tolist() for embedding in embeddings]
-        ])
 
-        # Flush to make sure data is persisted
-        collection.flush()
-    finally:
-        MilvusRepository._disconnect()
+class PostKey(NamedTuple):
+    """Post id plus the scalar fields stored next to its vector in Milvus."""
+    post_id: UUID
+    date: int
+    has_media: bool
 
 
-async def process_post_items(post_items: List[PostForEmbedding], embedder: OpenAIEmbedder, collection_name: str):
-    try:
-        # Prepare data for batch processing
-        texts_to_embed = []
-        valid_post_items = []
+def collection_name_for_export(export_id: UUID) -> str:
+    return f"post_embeddings_{str(export_id).replace('-', '_')}"
 
-        # Process each post to get combined text
-        for post_item in post_items:
-            # Get media for this post
-            media_items = await PostEmbeddingsRepository.get_media_for_post(post_item.post_id)
 
-            # Combine post text with media descriptions
-            combined_text = ""
+async def iter_post_texts(export_id: UUID, page_size: int = 100) -> AsyncIterator[Tuple[PostKey, str]]:
+    """Yield (post key, text to embed) for every post of an export that has text."""
+    last_post_id = None
+    while True:
+        posts_to_process = await PostEmbeddingsRepository.get_posts_for_embedding_by_export_id(
+            export_id, page_size, last_post_id
+        )
 
-            # Add post text if available
-            if post_item.post_text:
-                combined_text += post_item.post_text + " "
+        for post_item in posts_to_process:
+            combined_text = build_post_text(post_item)
+            # Only process if we have text to embed
+            if combined_text:
+                date = int(post_item.date.timestamp()) if post_item.date else 0
+                yield PostKey(post_item.post_id, date, post_item.has_media), combined_text
 
-            # Add descriptions from media
-            for media_item in media_items:
-                if media_item.description:
-                    combined_text += media_item.description + " "
+        if len(posts_to_process) < page_size:
+            break
 
-            # Only process if we have text to embed
-            if combined_text.strip():
-                texts_to_embed.append(combined_text.strip())
-                valid_post_items.append(post_item)
-
-        # If we have texts to embed
-        if texts_to_embed:
-            print(
-                f"Received request to embed multiple: {len(texts_to_embed)} items")
-            # Generate embeddings in batch
-            embeddings = embedder.get_embedding(texts_to_embed)
-
-            # Store embeddings in Milvus in batch
-            psql_ids = [post_item.post_id for post_item in valid_post_items]
-            await store_embeddings_in_milvus(collection_name, psql_ids, embeddings)
-    except Exception as e:
-        print(f"Warning: Error processing batch of posts: {e}")
-        # Process individually as fallback
-        for post_item in post_items:
-            try:
-                await process_single_post_item(post_item, embedder, collection_name)
-            except Exception as single_e:
-                print(
-                    f"Warning: Error processing post {post_item.post_id}: {single_e}")
-
-
-async def process_single_post_item(post_item: PostForEmbedding, embedder: OpenAIEmbedder, collection_name: str):
-    """Process a single post item for embedding"""
-    try:
-        # Get media for this post
-        media_items = await PostEmbeddingsRepository.get_media_for_post(post_item.post_id)
+        last_post_id = posts_to_process[-1].post_id
 
-        # Combine post text with media descriptions
-        combined_text = ""
 
-        # Add post text if available
-        if post_item.post_text:
-            combined_text += post_item.post_text + " "
+async def iter_experiment_post_texts(experiment_id: UUID, export_id: Optional[UUID] = None) -> AsyncIterator[Tuple[PostKey, str]]:
+    """Like iter_post_texts, streamed from the experiment's SQLite dataset."""
+    async for posts in ExperimentPostEmbeddingsRepository.iter_posts_for_embedding(experiment_id, export_id):
+        for post_item in posts:
+            combined_text = build_post_text(post_item)
+            if combined_text:
+                date = int(post_item.date.timestamp()) if post_item.date else 0
+                yield PostKey(post_item.post_id, date, post_item.has_media), combined_text
 
-        # Add descriptions from media
-        for media_item in media_items:
-            if media_item.description:
-                combined_text += media_item.description + " "
 
-        # If we have text to embed
-        if combined_text.strip():
-            # Generate embedding
-            embedding = embedder.get_embedding([combined_text.strip()])
+async def only_posts(post_texts: AsyncIterator[Tuple[PostKey, str]], post_ids: set) -> AsyncIterator[Tuple[PostKey, str]]:
+    async for key, text in post_texts:
+        if key.post_id in post_ids:
+            yield key, text
 
-            # Store in Milvus
-            await store_embeddings_in_milvus(collection_name, [post_item.post_id], embedding)
-    except Exception as e:
-        print(f"Warning: Error processing post {post_item.post_id}: {e}")
 
+def failed_post_ids(embedder: OpenAIEmbedder) -> dict:
+    """Progress entry listing posts to pass as post_ids to a re-run."""
+    return {"failed_post_ids": [str(key.post_id) for key in embedder.failed_keys]}
 
-async def background_process_by_export(export_id: UUID, model_name: str, job_id: UUID, collection_name: str):
+
+async def background_process_by_export(
+    export_id: UUID,
+    model_name: str,
+    job_id: UUID,
+    collection_name: str,
+    concurrency: int = 4,
+    batch_size: int = 32,
+    max_batch_size: int = 256,
+    use_cache: bool = True,
+    milvus_insert_rows: int = 8192,
+    milvus_flush_interval: Optional[float] = None,
+    index_type: Optional[str] = "HNSW",
+    experiment_id: Optional[UUID] = None,
+    post_ids: Optional[List[UUID]] = None,
+    recreate_collection: bool = False,
+):
+    """
+    Embed the posts of an export: from Postgres, or from the experiment's
+    dataset if experiment_id is given. With post_ids, only those posts.
+    An existing collection is appended to (keeping its schema) unless
+    recreate_collection is set.
+
+    Posts that could not be embedded are listed in the job progress as
+    failed_post_ids. If the LLM server stays down the job fails; rows
+    embedded so far are kept.
+    """
     # Update job status to in progress
     if job_id:
         await update_job_status(job_id, UpdateJobStatus(status=JobStatus.IN_PROGRESS))
 
     # Initialize embedder
-    embedder = OpenAIEmbedder(model_name=model_name)
-
-    # Create Milvus collection
-    await create_embedding_collection(collection_name)
-
-    # Process posts in batches
-    page_size = 100  # Process 100 posts at a time
-    embedding_batch_size = 32  # Process embeddings in batches of 32
-    page = 0
-
-    while True:
-        posts_to_process = await PostEmbeddingsRepository.get_posts_for_embedding_by_export_id(
-            export_id, page_size, page * page_size
-        )
-
-        if not posts_to_process:
-            break
-
-        # Process posts in embedding batches
-        for i in range(0, len(posts_to_process), embedding_batch_size):
-            batch = posts_to_process[i:i + embedding_batch_size]
-            await process_post_items(batch, embedder, collection_name)
+    embedder = OpenAIEmbedder(
+        model_name=model_name,
+        concurrency=concurrency,
+        batch_size=batch_size,
+        max_batch_size=max_batch_size,
+    )
 
-        if len(posts_to_process) < page_size:
-            break
+    counters = {"posts_embedded": 0, "batches_embedded": 0, "rows_inserted": 0}
+    start_time = time.perf_counter()
+
+    def progress_snapshot() -> dict:
+        elapsed = time.perf_counter() - start_time
+        return {
+            **counters,
+            "concurrency": concurrency,
+            "batch_size": embedder.batch_size.size,
+            "cache_hits": embedder.cache_hits,
+            "posts_failed": len(embedder.failed_keys),
+            "elapsed_seconds": round(elapsed, 3),
+            "posts_per_second": round(counters["posts_embedded"] / elapsed, 1) if elapsed > 0 else None,
+        }
 
-        page += 1
+    try:
+        # Create Milvus collection
+        await create_embedding_collection(collection_name, recreate_collection)
+
+        async with AsyncExitStack() as stack:
+            if use_cache:
+                embedder.cache = await stack.enter_async_context(EmbeddingCache())
+            writer = await stack.enter_async_context(BufferedMilvusWriter(
+                collection_name, max_rows=milvus_insert_rows, flush_interval=milvus_flush_interval))
+
+            # Requests run concurrently; Milvus inserts are batched and sealed once at the end
+            post_texts = (
+                iter_experiment_post_texts(experiment_id, export_id) if experiment_id
+                else iter_post_texts(export_id)
+            )
+            if post_ids is not None:
+                post_texts = only_posts(post_texts, set(post_ids))
+            async for post_keys, embeddings in embedder.embed_iter(post_texts):
+                await writer.add(
+                    [str(key.post_id) for key in post_keys],
+                    embeddings,
+                    date=[key.date for key in post_keys],
+                    has_media=[key.has_media for key in post_keys],
+                )
+                counters["posts_embedded"] += len(post_keys)
+                counters["batches_embedded"] += 1
+                counters["rows_inserted"] = writer.rows_inserted
+                if job_id and counters["batches_embedded"] % 10 == 0:
+                    await update_job_progress(job_id, progress_snapshot())
+
+        counters["rows_inserted"] = writer.rows_inserted
+
+        if index_type:
+            # Index and load once all rows are sealed, so search is ready when the job completes
+            await asyncio.to_thread(build_default_index, collection_name, index_type)
+            counters["index_type"] = index_type
+    except Exception as e:
+        print(f"Warning: Embedding job {job_id} failed: {e}")
+        if job_id:
+            await update_job_progress(job_id, {**progress_snapshot(), **failed_post_ids(embedder), "error": str(e)})
+            await update_job_status(job_id, UpdateJobStatus(status=JobStatus.FAILED))
+        return
 
     # Update job status to completed
     if job_id:
+        await update_job_progress(job_id, {**progress_snapshot(), **failed_post_ids(embedder)})
         await update_job_status(job_id, UpdateJobStatus(status=JobStatus.COMPLETED))
 
     print(f"Finished background processing for export: {export_id}")
 
 
+async def start_post_embedding_generation_by_experiment(
+    experiment_id: UUID,
+    payload: GeneratePostEmbeddingsPayload,
+    background_tasks: BackgroundTasks
+):
+    experiment = await get_experiment(experiment_id)
+
+    job_metadata = f"Generate embeddings for posts in experiment {experiment_id}"
+    job = await add_job(AddJob(status=JobStatus.PENDING, metadata=job_metadata))
+
+    # Vectors go to the experiment's own collection
+    background_tasks.add_task(
+        background_process_by_export,
+        experiment.tg_export_id,
+        payload.model_name,
+        job.id,
+        experiment.milvus_collection_name,
+        payload.concurrency,
+        payload.batch_size,
+        payload.max_batch_size,
+        payload.use_cache,
+        payload.milvus_insert_rows,
+        payload.milvus_flush_interval,
+        payload.index_type,
+        experiment_id,
+        payload.post_ids,
+        payload.recreate_collection,
+    )
+
+
 async def start_post_embedding_generation_by_export(
     export_id: UUID,
     payload: GeneratePostEmbeddingsPayload,
@@ -170,12 +242,285 @@ async def start_post_embedding_generation_by_export(
     job = await add_job(AddJob(status=JobStatus.PENDING, metadata=job_metadata))
 
     # Create a unique collection name based on export_id
-    collection_name = f"post_embeddings_{str(export_id).replace('-', '_')}"
+    collection_name = collection_name_for_export(export_id)
 
     background_tasks.add_task(
         background_process_by_export,
         export_id,
         payload.model_name,
         job.id,
-        collection_name
+        collection_name,
+        payload.concurrency,
+        payload.batch_size,
+        payload.max_batch_size,
+        payload.use_cache,
+        payload.milvus_insert_rows,
+        payload.milvus_flush_interval,
+        payload.index_type,
+        None,
+        payload.post_ids,
+        payload.recreate_collection,
+    )
+
+
+# Query path state, shared by all search requests of the process
+_query_embedders: dict = {}
+_query_embedding_cache: LRUCache = LRUCache(maxsize=QUERY_EMBEDDING_CACHE_SIZE)
+search_latency = LatencyRecorder(max_samples=1000)
+
+
+async def embed_query(model_name: str, query: str) -> Tuple[List[float], bool]:
+    """Embed a search query, served from an in-process LRU when seen before."""
+    key = (model_name, " ".join(query.split()))
+    cached = _query_embedding_cache.get(key)
+    if cached is not None:
+        return cached, True
+
+    embedder = _query_embedders.get(model_name)
+    if embedder is None:
+        # One client per model keeps its HTTP connection pool warm
+        # A search request fails fast instead of waiting for the LLM server to recover
+        embedder = _query_embedders[model_name] = OpenAIEmbedder(
+            model_name=model_name, max_retries=2, max_breaker_wait=0)
+    vector = (await embedder.get_query_embedding(query))[0].tolist()
+    _query_embedding_cache.put(key, vector)
+    return vector, False
+
+
+def build_filter_expr(payload: SearchPostsPayload, fields: set) -> Optional[str]:
+    conditions = []
+    if payload.date_from or payload.date_to or payload.has_media is not None:
+        missing = {"date", "has_media"} - fields
+        if missing:
+            raise ValueError(
+                "This collection was built without filter fields; re-run the embedding job with "
+                "recreate_collection=true to rebuild it with them.")
+    if payload.date_from:
+        conditions.append(f"date >= {int(payload.date_from.timestamp())}")
+    if payload.date_to:
+        conditions.append(f"date <= {int(payload.date_to.timestamp())}")
+    if payload.has_media is not None:
+        conditions.append(f"has_media == {'true' if payload.has_media else 'false'}")
+    return " and ".join(conditions) or None
+
+
+async def hydrate_hits(scored_ids: List[Tuple[str, float]], experiment_id: Optional[UUID] = None) -> List[PostSearchHit]:
+    """
+    Posts for (psql_id, score) pairs in one query, keeping rank order.
+
+    Read from the experiment's dataset when experiment_id is given.
+    """
+    post_ids = [UUID(psql_id) for psql_id, _ in scored_ids]
+    if experiment_id:
+        rows = await ExperimentPostEmbeddingsRepository.get_posts_by_ids(experiment_id, post_ids)
+    else:
+        rows = await PostEmbeddingsRepository.get_posts_by_ids(post_ids)
+    rows_by_id = {row["post_id"]: row for row in rows}
+    return [
+        PostSearchHit(**rows_by_id[UUID(psql_id)], score=score)
+        for psql_id, score in scored_ids
+        if UUID(psql_id) in rows_by_id
+    ]
+
+
+async def search_posts(export_id: UUID, payload: SearchPostsPayload) -> PostSearchResult:
+    collection_name = collection_name_for_export(export_id)
+    start_time = time.perf_counter()
+
+    # Embed the query while the collection setup is resolved (cached after the first call)
+    (vector, cached), setup = await asyncio.gather(
+        embed_query(payload.model_name, payload.query),
+        asyncio.to_thread(get_search_setup, collection_name),
+    )
+    embedded_at = time.perf_counter()
+
+    search_params = dict(setup["search_params"])
+    if payload.search_params:
+        search_params["params"] = {**search_params["params"], **payload.search_params}
+    expr = build_filter_expr(payload, setup["fields"])
+
+    results = await asyncio.to_thread(
+        MilvusRepository.search, collection_name, [vector], search_params, payload.top_k, expr)
+    scored_ids = results[0] if results else []
+    searched_at = time.perf_counter()
+
+    hits = await hydrate_hits(scored_ids)
+    hydrated_at = time.perf_counter()
+
+    timings = {
+        "embed": embedded_at - start_time,
+        "search": searched_at - embedded_at,
+        "hydrate": hydrated_at - searched_at,
+        "total": hydrated_at - start_time,
+    }
+    for stage, seconds in timings.items():
+        search_latency.record(stage, seconds)
+
+    return PostSearchResult(
+        hits=hits,
+        timings_ms={stage: round(seconds * 1000, 2) for stage, seconds in timings.items()},
+        query_embedding_cached=cached,
     )
+
+
+async def get_search_latency() -> dict:
+    """p50/p95 per stage over the last 1000 searches, plus query cache counters."""
+    return {
+        "latency": search_latency.summary(),
+        "query_cache": {
+            "size": len(_query_embedding_cache),
+            "hits": _query_embedding_cache.hits,
+            "misses": _query_embedding_cache.misses,
+        },
+    }
+
+
+def get_exact_index_path(experiment_id: UUID) -> Path:
+    return get_experiment_directory_path(experiment_id) / "exact_search"
+
+
+def export_exact_index(collection_name: str, directory: Path, on_progress=None) -> int:
+    """
+    Copy every vector of a Milvus collection into an exact-search index.
+
+    Blocking; run through asyncio.to_thread. Returns the number of rows.
+    """
+    setup = get_search_setup(collection_name)
+    capacity = MilvusRepository.count_entities(collection_name)
+    writer = None
+    try:
+        for ids, vectors in MilvusRepository.iter_vectors(collection_name):
+            if writer is None:
+                writer = ExactIndexWriter(
+                    directory, capacity, len(vectors[0]),
+                    metric_type=setup["search_params"]["metric_type"], collection_name=collection_name)
+            writer.add(ids, vectors)
+            if on_progress:
+                on_progress(writer.count)
+        if writer is None:
+            raise ValueError(f"Collection '{collection_name}' is empty.")
+        writer.commit()
+    except Exception:
+        if writer is not None:
+            writer.abort()
+        raise
+    return writer.count
+
+
+async def background_export_exact_index(experiment_id: UUID, collection_name: str, job_id: UUID):
+    if job_id:
+        await update_job_status(job_id, UpdateJobStatus(status=JobStatus.IN_PROGRESS))
+
+    loop = asyncio.get_running_loop()
+    counters = {"rows_exported": 0}
+    reported = {"rows": 0}
+
+    def on_progress(rows: int) -> None:
+        counters["rows_exported"] = rows
+        # Runs in the export thread; progress writes go through the event loop
+        if job_id and rows - reported["rows"] >= 100_000:
+            reported["rows"] = rows
+            asyncio.run_coroutine_threadsafe(update_job_progress(job_id, dict(counters)), loop)
+
+    try:
+        directory = get_exact_index_path(experiment_id)
+        counters["rows_exported"] = await asyncio.to_thread(
+            export_exact_index, collection_name, directory, on_progress)
+    except Exception as e:
+        print(f"Warning: Exact index export {job_id} failed: {e}")
+        if job_id:
+            await update_job_progress(job_id, {**counters, "error": str(e)})
+            await update_job_status(job_id, UpdateJobStatus(status=JobStatus.FAILED))
+        return
+
+    if job_id:
+        await update_job_progress(job_id, counters)
+        await update_job_status(job_id, UpdateJobStatus(status=JobStatus.COMPLETED))
+
+    print(f"Finished exact index export for experiment: {experiment_id}")
+
+
+async def start_exact_index_export(experiment_id: UUID, background_tasks: BackgroundTasks):
+    experiment = await get_experiment(experiment_id)
+
+    job_metadata = f"Export exact search index of experiment {experiment_id}"
+    job = await add_job(AddJob(status=JobStatus.PENDING, metadata=job_metadata))
+
+    background_tasks.add_task(
+        background_export_exact_index,
+        experiment_id,
+        experiment.milvus_collection_name,
+        job.id,
+    )
+
+
+def _open_exact_index(experiment_id: UUID) -> ExactSearchIndex:
+    index = open_index(get_exact_index_path(experiment_id))
+    if index is None:
+        raise ValueError("No exact search index for this experiment; export it first.")
+    return index
+
+
+async def search_exact(experiment_id: UUID, payload: ExactSearchPayload) -> PostSearchResult:
+    """Same as search_posts, answered from the experiment's local exact index."""
+    start_time = time.perf_counter()
+    vector, cached = await embed_query(payload.model_name, payload.query)
+    embedded_at = time.perf_counter()
+
+    index = await asyncio.to_thread(_open_exact_index, experiment_id)
+    results = await asyncio.to_thread(index.search, np.asarray([vector], dtype=np.float32), payload.top_k)
+    searched_at = time.perf_counter()
+
+    hits = await hydrate_hits(results[0], experiment_id)
+    hydrated_at = time.perf_counter()
+
+    timings = {
+        "embed": embedded_at - start_time,
+        "search": searched_at - embedded_at,
+        "hydrate": hydrated_at - searched_at,
+        "total": hydrated_at - start_time,
+    }
+    return PostSearchResult(
+        hits=hits,
+        timings_ms={stage: round(seconds * 1000, 2) for stage, seconds in timings.items()},
+        query_embedding_cached=cached,
+    )
+
+
+def measure_recall_sync(experiment_id: UUID, collection_name: str, payload: MeasureRecallPayload) -> dict:
+    index = _open_exact_index(experiment_id)
+    rng = np.random.default_rng(payload.seed)
+    sample = rng.choice(len(index), size=min(payload.num_queries, len(index)), replace=False)
+    queries = np.asarray(index.embeddings[np.sort(sample)])
+
+    setup = get_search_setup(collection_name)
+    search_params = dict(setup["search_params"])
+    if payload.search_params:
+        search_params["params"] = {**search_params["params"], **payload.search_params}
+
+    start_time = time.perf_counter()
+    approximate = MilvusRepository.search(
+        collection_name, queries.tolist(), search_params, payload.top_k)
+    searched_at = time.perf_counter()
+    exact = index.search(queries, payload.top_k)
+    exact_at = time.perf_counter()
+
+    return {
+        "recall": round(recall_at_k(approximate, exact, payload.top_k), 4),
+        "top_k": payload.top_k,
+        "num_queries": len(queries),
+        "search_params": search_params,
+        "index_rows": len(index),
+        "milvus_ms_per_query": round((searched_at - start_time) * 1000 / len(queries), 3),
+        "exact_ms_per_query": round((exact_at - searched_at) * 1000 / len(queries), 3),
+    }
+
+
+async def measure_recall(experiment_id: UUID, payload: MeasureRecallPayload) -> dict:
+    """
+    Recall@k of the Milvus index against the exact index, using stored
+    vectors as queries. Use it to pick ef / nprobe for a collection.
+    """
+    experiment = await get_experiment(experiment_id)
+    return await asyncio.to_thread(
+        measure_recall_sync, experiment_id, experiment.milvus_collection_name, payload)
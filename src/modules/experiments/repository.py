@@ -1,18 +1,11 @@
 from typing import Optional, List
 from uuid import UUID
 
-from src.config import (
-    DB_USER,
-    DB_PASSWORD,
-    DB_HOST,
-    DB_PORT,
-    DB_NAME
-)
-
-import psycopg
 from psycopg import sql
 from psycopg.rows import class_row
 
+from src.shared.db.postgres import get_connection
+
 from src.modules.experiments.schemas import ExperimentModel
 from src.modules.experiments.dto import AddExperiment, UpdateExperiment
 from src.modules.experiments.utils import (
@@ -25,13 +18,7 @@ from src.modules.experiments.utils import (
 class ExperimentsRepository:
     @classmethod
     async def get_all(cls) -> list[ExperimentModel]:
-        async with await psycopg.AsyncConnection.connect(
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME,
-        ) as aconn:
+        async with get_connection() as aconn:
             async with aconn.cursor(row_factory=class_row(ExperimentModel)) as acur:
                 await acur.execute(sql.SQL("""
                     SELECT * FROM experiments
@@ -41,13 +28,7 @@ class ExperimentsRepository:
 
     @classmethod
     async def add_one(cls, payload: AddExperiment) -> Optional[ExperimentModel]:
-        async with await psycopg.AsyncConnection.connect(
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME,
-        ) as aconn:
+        async with get_connection() as aconn:
             async with aconn.cursor(row_factory=class_row(ExperimentModel)) as acur:
                 # First, insert the experiment to get the UUID
                 await acur.execute(sql.SQL("""
@@ -70,13 +51,7 @@ class ExperimentsRepository:
 
     @classmethod
     async def delete(cls, experiment_id: UUID) -> None:
-        async with await psycopg.AsyncConnection.connect(
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME,
-        ) as aconn:
+        async with get_connection() as aconn:
             async with aconn.cursor() as acur:
                 await acur.execute(sql.SQL("""
                       DELETE FROM experiments WHERE id = %s
@@ -92,13 +67,7 @@ class ExperimentsRepository:
 
     @classmethod
     async def update(cls, experiment_id: UUID, payload: UpdateExperiment) -> Optional[ExperimentModel]:
-        async with await psycopg.AsyncConnection.connect(
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME,
-        ) as aconn:
+        async with get_connection() as aconn:
             async with aconn.cursor(row_factory=class_row(ExperimentModel)) as acur:
                 await acur.execute(sql.SQL("""
                       UPDATE experiments
@@ -113,13 +82,7 @@ class ExperimentsRepository:
 
     @classmethod
     async def get_one_by_id(cls, experiment_id: UUID) -> Optional[ExperimentModel]:
-        async with await psycopg.AsyncConnection.connect(
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME,
-        ) as aconn:
+        async with get_connection() as aconn:
             async with aconn.cursor(row_factory=class_row(ExperimentModel)) as acur:
                 await acur.execute(sql.SQL("""
                     SELECT * FROM experiments
@@ -130,13 +93,7 @@ class ExperimentsRepository:
 
     @classmethod
     async def get_by_tg_export_id(cls, tg_export_id: UUID) -> List[ExperimentModel]:
-        async with await psycopg.AsyncConnection.connect(
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME,
-        ) as aconn:
+        async with get_connection() as aconn:
             async with aconn.cursor(row_factory=class_row(ExperimentModel)) as acur:
                 await acur.execute(sql.SQL("""
                     SELECT * FROM experiments
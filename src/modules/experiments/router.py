@@ -9,7 +9,8 @@ from src.modules.experiments.services import (
     update_experiment,
     delete_experiment,
     get_experiment,
-    get_experiments_by_tg_export
+    get_experiments_by_tg_export,
+    get_sqlite_database_stats
 )
 from src.modules.experiments.schemas import ExperimentModel
 from src.modules.experiments.dto import AddExperiment, UpdateExperiment
@@ -31,6 +32,15 @@ async def get_all_experiments_handler() -> ApiResponse[List[ExperimentModel] | P
         return ApiResponse(data=PlainDataResponse(error=str(e)))
 
 
+@router.get("/sqlite_stats", description="Get open experiment SQLite databases: idle time, queued writes, transactions and statements committed")
+async def get_sqlite_stats_handler() -> ApiResponse[List[dict] | PlainDataResponse]:
+    try:
+        stats = await get_sqlite_database_stats()
+        return ApiResponse(data=stats)
+    except Exception as e:
+        return ApiResponse(data=PlainDataResponse(error=str(e)))
+
+
 @router.post("/", description="Add a new experiment.")
 async def add_experiment_handler(
     payload: Annotated[AddExperiment, Body(
@@ -1,6 +1,7 @@
 from typing import List
 from uuid import UUID
 
+from src.shared.db import sqlite
 from src.modules.experiments.repository import ExperimentsRepository
 from src.modules.experiments.schemas import ExperimentModel
 from src.modules.experiments.dto import AddExperiment, UpdateExperiment
@@ -50,3 +51,7 @@ async def get_experiments_by_tg_export(tg_export_id: UUID) -> List[ExperimentMod
 async def get_experiment_sqlite_path(experiment_id: UUID) -> str:
     """Get the SQLite database path for an experiment."""
     return await ExperimentsRepository.get_sqlite_path(experiment_id)
+
+
+async def get_sqlite_database_stats() -> List[dict]:
+    return sqlite.get_database_stats()
@@ -1,8 +1,8 @@
 import os
-import aiosqlite
 from uuid import UUID
 from pathlib import Path
 from src.config import STORAGE_FOLDER
+from src.shared.db import sqlite
 
 
 def get_experiment_directory_path(experiment_id: UUID) -> Path:
@@ -33,7 +33,7 @@ async def create_experiment_directory_and_database(experiment_id: UUID) -> Path:
     sqlite_path = get_experiment_sqlite_path(experiment_id)
 
     # Initialize the database with basic schema if needed
-    async with aiosqlite.connect(sqlite_path) as db:
+    async with sqlite.connect(sqlite_path) as db:
         # You can add any initial schema here if needed
         # For now, we'll just create an empty database
         await db.commit()
@@ -48,6 +48,9 @@ async def cleanup_experiment_directory(experiment_id: UUID) -> None:
     Args:
         experiment_id: The UUID of the experiment
     """
+    # Long-lived connections would keep the deleted files open
+    await sqlite.close_database(get_experiment_sqlite_path(experiment_id))
+
     experiment_dir = get_experiment_directory_path(experiment_id)
     if experiment_dir.exists():
         import shutil
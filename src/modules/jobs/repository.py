@@ -1,17 +1,11 @@
-from typing import Optional
+from typing import Optional, Dict, Any
 from uuid import UUID
 
-from src.config import (
-    DB_USER,
-    DB_PASSWORD,
-    DB_HOST,
-    DB_PORT,
-    DB_NAME
-)
-
-import psycopg
 from psycopg import sql
 from psycopg.rows import class_row
+from psycopg.types.json import Jsonb
+
+from src.shared.db.postgres import get_connection
 
 from src.modules.jobs.schemas import JobModel
 from src.modules.jobs.schemas import AddJob, UpdateJobStatus
@@ -20,13 +14,7 @@ from src.modules.jobs.schemas import AddJob, UpdateJobStatus
 class JobsRepository:
     @classmethod
     async def get_all(cls) -> list[JobModel]:
-        async with await psycopg.AsyncConnection.connect(
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME,
-        ) as aconn:
+        async with get_connection() as aconn:
             async with aconn.cursor(row_factory=class_row(JobModel)) as acur:
                 await acur.execute(sql.SQL("""
                     SELECT * FROM jobs
@@ -37,13 +25,7 @@ class JobsRepository:
 
     @classmethod
     async def add_one(cls, payload: AddJob) -> Optional[JobModel]:
-        async with await psycopg.AsyncConnection.connect(
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME,
-        ) as aconn:
+        async with get_connection() as aconn:
             async with aconn.cursor(row_factory=class_row(JobModel)) as acur:
                 await acur.execute(sql.SQL("""
                       INSERT INTO jobs (status, metadata)
@@ -58,25 +40,13 @@ class JobsRepository:
 
     @classmethod
     async def delete(cls, job_id: UUID) -> None:
-        async with await psycopg.AsyncConnection.connect(
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME,
-        ) as aconn:
+        async with get_connection() as aconn:
             async with aconn.cursor() as acur:
                 await acur.execute(sql.SQL("DELETE FROM jobs WHERE id = %s"), (job_id,))
 
     @classmethod
     async def update_status(cls, job_id: UUID, payload: UpdateJobStatus) -> Optional[JobModel]:
-        async with await psycopg.AsyncConnection.connect(
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME,
-        ) as aconn:
+        async with get_connection() as aconn:
             async with aconn.cursor(row_factory=class_row(JobModel)) as acur:
                 await acur.execute(sql.SQL("""
                       UPDATE jobs
@@ -90,15 +60,27 @@ class JobsRepository:
                 updated_job = await acur.fetchone()
                 return updated_job
 
+    @classmethod
+    async def update_progress(cls, job_id: UUID, progress: Dict[str, Any]) -> Optional[JobModel]:
+        async with get_connection() as aconn:
+            async with aconn.cursor(row_factory=class_row(JobModel)) as acur:
+                # Merge new keys into the existing progress document
+                await acur.execute(sql.SQL("""
+                      UPDATE jobs
+                      SET progress = COALESCE(progress, '{}'::jsonb) || %s,
+                          updated_at = NOW() AT TIME ZONE 'UTC'
+                      WHERE id = %s
+                      RETURNING *
+                      """), (
+                    Jsonb(progress),
+                    job_id
+                ))
+                updated_job = await acur.fetchone()
+                return updated_job
+
     @classmethod
     async def get_one_by_id(cls, job_id: UUID) -> Optional[JobModel]:
-        async with await psycopg.AsyncConnection.connect(
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME,
-        ) as aconn:
+        async with get_connection() as aconn:
             async with aconn.cursor(row_factory=class_row(JobModel)) as acur:
                 await acur.execute(sql.SQL("SELECT * FROM jobs WHERE id = %s"), (job_id,))
                 job_item = await acur.fetchone()
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Optional, Dict, Any
 from pydantic import BaseModel, ConfigDict
 from datetime import datetime
 from uuid import UUID
@@ -17,6 +17,7 @@ class JobModel(BaseModel):
     id: UUID
     status: str
     metadata: Optional[str]
+    progress: Optional[Dict[str, Any]] = None
     created_at: datetime
     updated_at: Optional[datetime]
 
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Dict, Any
 from uuid import UUID
 
 from src.modules.jobs.repository import JobsRepository
@@ -33,6 +33,15 @@ async def update_job_status(job_id: UUID, payload: UpdateJobStatus) -> JobModel:
     return updated_job
 
 
+async def update_job_progress(job_id: UUID, progress: Dict[str, Any]) -> JobModel:
+    updated_job = await JobsRepository.update_progress(job_id, progress)
+
+    if not updated_job:
+        raise ValueError("Failed to update job progress")
+
+    return updated_job
+
+
 async def get_job(job_id: UUID) -> JobModel:
     job_item = await JobsRepository.get_one_by_id(job_id)
 
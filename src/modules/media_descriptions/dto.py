@@ -1,8 +1,23 @@
+from typing import Literal
 from uuid import UUID
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class GenerateImageDescriptionsPayload(BaseModel):
     tg_export_id: UUID
     experiment_id: UUID
     model_name: str = "google/gemma-3-4b"
+    concurrency: int = Field(
+        8, gt=0, description="Number of images described at the same time")
+    queue_size: int = Field(
+        32, gt=0, description="Maximum number of images waiting to be described")
+    max_image_side: int = Field(
+        896, gt=0, description="Longest image side in pixels sent to the vision model")
+    jpeg_quality: int = Field(
+        85, ge=1, le=95, description="JPEG quality of the image payload")
+    analysis_mode: Literal["separate", "combined"] = Field(
+        "separate", description="'combined' asks for description, tags and structured description in one call")
+    retry_failed: bool = Field(
+        True, description="Also process images whose previous attempt failed (media_datas.error is set)")
+    use_cache: bool = Field(
+        True, description="Reuse the analysis of a visually identical image described before with the same model and prompts")
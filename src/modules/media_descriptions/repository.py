@@ -3,9 +3,8 @@ import os
 from typing import List, Optional
 from uuid import UUID
 
-import aiosqlite
-
 from src.config import STORAGE_FOLDER
+from src.shared.db import sqlite
 from src.modules.media_descriptions.schemas import MediaForProcessing, MediaDataUpdate
 
 
@@ -15,47 +14,64 @@ class MediaDescriptionsRepository:
         return os.path.join(STORAGE_FOLDER, str(experiment_id), "dataset.db")
 
     @classmethod
-    async def get_media_for_processing_by_export_id(cls, experiment_id: UUID, export_id: UUID, limit: int, offset: int) -> List[MediaForProcessing]:
-        db_path = await cls._get_db_path(experiment_id)
-        async with aiosqlite.connect(db_path) as db:
+    async def _get_database(cls, experiment_id: UUID) -> sqlite.SQLiteDatabase:
+        # Long-lived connections shared by all workers of the job; updates
+        # from concurrent workers are committed together by one writer
+        return await sqlite.get_database(await cls._get_db_path(experiment_id))
+
+    @classmethod
+    async def get_media_for_processing_by_export_id(cls, experiment_id: UUID, export_id: UUID, limit: int, after_id: Optional[UUID] = None, retry_failed: bool = True) -> List[MediaForProcessing]:
+        """
+        Page through unprocessed images of an export in media id order.
+
+        Keyset pagination: pass the media_id of the last item of the previous
+        page as `after_id`. Rows leave the result set as they get described,
+        so an OFFSET would skip pending images. CROSS JOIN keeps medias as the
+        outer table, letting SQLite seek the primary key instead of sorting
+        the whole export on every page. Images whose last attempt failed are
+        included unless retry_failed is False.
+        """
+        database = await cls._get_database(experiment_id)
+        async with database.read() as db:
             cursor = await db.execute(
                 """
                 SELECT m.id as media_id, md.id as media_data_id, m.name as media_name
                 FROM medias m
-                JOIN posts p ON m.post_id = p.id
+                CROSS JOIN posts p ON m.post_id = p.id
                 LEFT JOIN media_datas md ON m.id = md.media_id
-                WHERE p.from_id = ? AND (m.mime_type LIKE 'image/%') AND (md.id IS NULL OR md.description IS NULL)
+                WHERE m.id > ? AND p.from_id = ? AND (m.mime_type LIKE 'image/%') AND (md.id IS NULL OR md.description IS NULL)
+                    AND (? OR md.error IS NULL)
                 ORDER BY m.id
-                LIMIT ? OFFSET ?
+                LIMIT ?
                 """,
-                (str(export_id), limit, offset),
+                (str(after_id or UUID(int=0)), str(export_id), retry_failed, limit),
             )
             rows = await cursor.fetchall()
             return [MediaForProcessing(media_id=UUID(r[0]), media_data_id=UUID(r[1]) if r[1] else UUID(int=0), media_name=r[2]) for r in rows]
 
     @classmethod
-    async def get_media_for_processing_by_post_id(cls, experiment_id: UUID, post_id: UUID, limit: int, offset: int) -> List[MediaForProcessing]:
-        db_path = await cls._get_db_path(experiment_id)
-        async with aiosqlite.connect(db_path) as db:
+    async def get_media_for_processing_by_post_id(cls, experiment_id: UUID, post_id: UUID, limit: int, after_id: Optional[UUID] = None) -> List[MediaForProcessing]:
+        database = await cls._get_database(experiment_id)
+        async with database.read() as db:
             cursor = await db.execute(
                 """
                 SELECT m.id as media_id, md.id as media_data_id, m.name as media_name
                 FROM medias m
                 JOIN posts p ON m.post_id = p.id
                 LEFT JOIN media_datas md ON m.id = md.media_id
-                WHERE p.id = ? AND (m.mime_type LIKE 'image/%') AND (md.id IS NULL OR md.description IS NULL)
+                WHERE p.id = ? AND m.id > ? AND (m.mime_type LIKE 'image/%') AND (md.id IS NULL OR md.description IS NULL)
                 ORDER BY m.id
-                LIMIT ? OFFSET ?
+                LIMIT ?
                 """,
-                (str(post_id), limit, offset),
+                (str(post_id), str(after_id or UUID(int=0)), limit),
             )
             rows = await cursor.fetchall()
             return [MediaForProcessing(media_id=UUID(r[0]), media_data_id=UUID(r[1]) if r[1] else UUID(int=0), media_name=r[2]) for r in rows]
 
     @classmethod
     async def get_media_for_processing_by_media_id(cls, experiment_id: UUID, media_id: UUID) -> Optional[MediaForProcessing]:
-        db_path = await cls._get_db_path(experiment_id)
-        async with aiosqlite.connect(db_path) as db:
+        database = await cls._get_database(experiment_id)
+        async with database.read() as db:
             cursor = await db.execute(
                 """
                 SELECT m.id as media_id, md.id as media_data_id, m.name as media_name
@@ -72,27 +88,38 @@ class MediaDescriptionsRepository:
 
     @classmethod
     async def update_media_data(cls, experiment_id: UUID, data: MediaDataUpdate) -> None:
-        db_path = await cls._get_db_path(experiment_id)
-        async with aiosqlite.connect(db_path) as db:
-            await db.execute(
-                """
-                UPDATE media_datas
-                SET media_id = ?, description = ?, tag = ?, structured_description = ?, description_usage = ?, tag_usage = ?, structured_description_usage = ?, description_time = ?, tag_time = ?, structured_description_time = ?
-                WHERE id = ?
-                """,
-                (
-                    str(data.media_id),
-                    data.description,
-                    data.tag,
-                    data.structured_description,
-                    json.dumps(data.desc_usage) if data.desc_usage else None,
-                    json.dumps(data.tag_usage) if data.tag_usage else None,
-                    json.dumps(
-                        data.struct_desc_usage) if data.struct_desc_usage else None,
-                    data.desc_time,
-                    data.tag_time,
-                    data.struct_desc_time,
-                    str(data.media_data_id),
-                ),
-            )
-            await db.commit()
+        database = await cls._get_database(experiment_id)
+        # Returns once the batch holding this update is committed
+        await database.execute(
+            """
+            UPDATE media_datas
+            SET media_id = ?, description = ?, tag = ?, structured_description = ?, description_usage = ?, tag_usage = ?, structured_description_usage = ?, description_time = ?, tag_time = ?, structured_description_time = ?, analysis_mode = ?, error = NULL
+            WHERE id = ?
+            """,
+            (
+                str(data.media_id),
+                data.description,
+                data.tag,
+                data.structured_description,
+                json.dumps(data.desc_usage) if data.desc_usage else None,
+                json.dumps(data.tag_usage) if data.tag_usage else None,
+                json.dumps(
+                    data.struct_desc_usage) if data.struct_desc_usage else None,
+                data.desc_time,
+                data.tag_time,
+                data.struct_desc_time,
+                data.analysis_mode,
+                str(data.media_data_id),
+            ),
+        )
+
+    @classmethod
+    async def record_error(cls, experiment_id: UUID, media_data_id: UUID, error: str) -> None:
+        """Store why an image failed; its description stays NULL so the next run picks it up again."""
+        database = await cls._get_database(experiment_id)
+        await database.execute(
+            """
+            UPDATE media_datas SET error = ? WHERE id = ?
+            """,
+            (error, str(media_data_id)),
+        )
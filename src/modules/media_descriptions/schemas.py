@@ -21,3 +21,4 @@ class MediaDataUpdate(BaseModel):
     desc_time: float
     tag_time: float
     struct_desc_time: float
+    analysis_mode: str = "separate"
@@ -1,76 +1,225 @@
 import os
+import time
+import asyncio
+from contextlib import AsyncExitStack
+from typing import Optional
 from uuid import UUID
-from PIL import Image
 from fastapi import BackgroundTasks
 
 from src.modules.media_descriptions.dto import GenerateImageDescriptionsPayload
 from src.modules.media_descriptions.repository import MediaDescriptionsRepository
 from src.modules.media_descriptions.schemas import MediaForProcessing, MediaDataUpdate
-from src.shared.llm.image_description import ImageDescription
-from src.modules.jobs.services import add_job, update_job_status
+from src.shared.llm.image_description import ImageDescription, PROMPT_VERSION
+from src.shared.llm.vision_cache import VisionCache
+from src.shared.llm.client import LLMUnavailableError
+from src.modules.jobs.services import add_job, update_job_status, update_job_progress
 from src.modules.jobs.schemas import JobStatus, AddJob, UpdateJobStatus
 from src.config import STORAGE_FOLDER
 from src.modules.tg_exports.repository import TgExportsRepository
+from src.modules.parsers.repository import ParsersRepository
+from src.utils.latency import LatencyRecorder
 
 
-async def process_media_item(image_base_path: str, media_item: MediaForProcessing, image_describer: ImageDescription, experiment_id: UUID):
+async def process_media_item(
+    image_base_path: str,
+    media_item: MediaForProcessing,
+    image_describer: ImageDescription,
+    experiment_id: UUID,
+    latency: Optional[LatencyRecorder] = None,
+    combined: bool = False,
+    cache: Optional[VisionCache] = None,
+) -> bool:
+    """
+    Describe one image with the three prompts (or one combined prompt).
+    Returns True on success.
+
+    With a cache, an image whose downscaled version has the same perceptual
+    hash as one analysed before (same model and prompts) is not sent to the
+    model; the stored fields are copied instead.
+    """
     image_path = os.path.join(image_base_path, media_item.media_name)
 
     if not os.path.exists(image_path):
         print(f"Warning: Image not found at {image_path}")
-        return
+        await MediaDescriptionsRepository.record_error(
+            experiment_id, media_item.media_data_id, f"Image not found: {media_item.media_name}")
+        return False
 
     try:
-        with Image.open(image_path) as img:
-            description, desc_usage, desc_time = image_describer.get_description(
-                img)
-            tag, tag_usage, tag_time = image_describer.get_tag(img)
-            structured_description, struct_desc_usage, struct_desc_time = image_describer.get_structured_description(
-                img)
-
-            update_data = MediaDataUpdate(
-                media_data_id=media_item.media_data_id,
-                media_id=media_item.media_id,
-                description=description,
-                tag=tag,
-                structured_description=structured_description,
-                desc_usage=desc_usage,
-                tag_usage=tag_usage,
-                struct_desc_usage=struct_desc_usage,
-                desc_time=desc_time,
-                tag_time=tag_time,
-                struct_desc_time=struct_desc_time
-            )
-            await MediaDescriptionsRepository.update_media_data(experiment_id, update_data)
+        # Decode, downscale and encode once; all prompts share the payload
+        base64_image, phash = await asyncio.to_thread(image_describer.prepare_image_and_hash, image_path)
+        prompt_version = f"{PROMPT_VERSION}:{'combined' if combined else 'separate'}"
+
+        cached = await cache.get(image_describer.model_name, prompt_version, phash) if cache else None
+        if cached:
+            # No calls were made: no usage, zero durations, and a mode of
+            # its own so mode comparisons only see real model calls
+            analysis = {
+                **cached,
+                "analysis_mode": "cached",
+                "desc_usage": None,
+                "tag_usage": None,
+                "struct_desc_usage": None,
+                "desc_time": 0.0,
+                "tag_time": 0.0,
+                "struct_desc_time": 0.0,
+            }
+        else:
+            analysis, timings = await image_describer.analyze(base64_image, combined=combined)
+
+            if latency:
+                # Prompts that did not run report 0.0 and would skew the percentiles
+                for prompt_type, duration in timings.items():
+                    if duration:
+                        latency.record(prompt_type, duration)
+
+        update_data = MediaDataUpdate(
+            media_data_id=media_item.media_data_id,
+            media_id=media_item.media_id,
+            **analysis
+        )
+        await MediaDescriptionsRepository.update_media_data(experiment_id, update_data)
+        if cache and not cached:
+            try:
+                await cache.put(image_describer.model_name, prompt_version, phash, analysis)
+            except Exception as e:
+                # The description is already saved; only the reuse is lost
+                print(f"Warning: Could not write vision cache: {e}")
+        return True
+    except LLMUnavailableError:
+        # The server is down, not this image: stop the job instead of failing the whole queue
+        raise
     except Exception as e:
         print(f"Warning: Error processing image {media_item.media_id}: {e}")
+        await MediaDescriptionsRepository.record_error(
+            experiment_id, media_item.media_data_id, f"{type(e).__name__}: {e}")
+        return False
 
 
-async def background_process_by_export(experiment_id: UUID, export_id: UUID, model_name: str, job_id: UUID):
+async def background_process_by_export(
+    experiment_id: UUID,
+    export_id: UUID,
+    model_name: str,
+    job_id: UUID,
+    concurrency: int = 8,
+    queue_size: int = 32,
+    max_image_side: int = 896,
+    jpeg_quality: int = 85,
+    analysis_mode: str = "separate",
+    retry_failed: bool = True,
+    use_cache: bool = True,
+):
     # Update job status to in progress if job_id is provided
     if job_id:
         await update_job_status(job_id, UpdateJobStatus(status=JobStatus.IN_PROGRESS))
 
-    image_describer = ImageDescription(model_name=model_name)
+    # Bring older experiment databases up to the current schema
+    await ParsersRepository.create_tables(experiment_id)
+
+    image_describer = ImageDescription(
+        model_name=model_name, max_side=max_image_side, jpeg_quality=jpeg_quality)
+    combined = analysis_mode == "combined"
     tg_export = await TgExportsRepository.get_one_by_id(export_id)
     if not tg_export:
         raise ValueError(f"Telegram export with ID {export_id} not found")
     image_base_path = os.path.join(
         STORAGE_FOLDER, tg_export.photos_path.lstrip('\\/'))
-    page_size = 10
-    page = 0
-    while True:
-        media_to_process = await MediaDescriptionsRepository.get_media_for_processing_by_export_id(experiment_id, export_id, page_size, page * page_size)
-        if not media_to_process:
-            break
-        for media_item in media_to_process:
-            await process_media_item(image_base_path, media_item, image_describer, experiment_id)
-        if len(media_to_process) < page_size:
-            break
-        page += 1
+
+    # Bounded queue: the producer can only run queue_size images ahead of the workers
+    queue: asyncio.Queue[Optional[MediaForProcessing]] = asyncio.Queue(
+        maxsize=queue_size)
+    latency = LatencyRecorder()
+    counters = {"images_processed": 0, "images_failed": 0}
+    start_time = time.perf_counter()
+    progress_every = max(concurrency, 10)
+    # Opened below, around the workers
+    cache: Optional[VisionCache] = None
+
+    def progress_snapshot() -> dict:
+        elapsed = time.perf_counter() - start_time
+        return {
+            **counters,
+            "concurrency": concurrency,
+            "analysis_mode": analysis_mode,
+            "elapsed_seconds": round(elapsed, 3),
+            "images_per_minute": round(60 * counters["images_processed"] / elapsed, 2) if elapsed > 0 else None,
+            "latency": latency.summary(),
+            "cache_hits": cache.hits if cache else 0,
+            "cache_hit_rate": cache.hit_rate if cache else None,
+            "llm_retries": image_describer.client.retries,
+            "llm_circuit": image_describer.client.breaker.state,
+        }
+
+    # Set when the LLM server stays down; workers then drain the queue without processing
+    unavailable: list = []
+
+    async def worker():
+        while True:
+            media_item = await queue.get()
+            try:
+                if media_item is None:
+                    return
+                if unavailable:
+                    continue
+                try:
+                    ok = await process_media_item(image_base_path, media_item, image_describer, experiment_id, latency, combined, cache)
+                except LLMUnavailableError as e:
+                    unavailable.append(e)
+                    continue
+                except Exception as e:
+                    # e.g. record_error failed. Every item must be consumed: once
+                    # all workers died, the producer would block on the full queue
+                    print(f"Warning: Error processing image {media_item.media_id}: {e}")
+                    ok = False
+                counters["images_processed" if ok else "images_failed"] += 1
+                done = counters["images_processed"] + counters["images_failed"]
+                if job_id and done % progress_every == 0:
+                    try:
+                        await update_job_progress(job_id, progress_snapshot())
+                    except Exception as e:
+                        print(f"Warning: Could not update progress of job {job_id}: {e}")
+            finally:
+                queue.task_done()
+
+    async with AsyncExitStack() as stack:
+        if use_cache:
+            cache = await stack.enter_async_context(VisionCache())
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+
+        try:
+            # Keyset pagination: each pending image is fetched exactly once, even
+            # though processed rows drop out of the query while we page
+            page_size = 100
+            last_media_id = None
+            while True:
+                if unavailable:
+                    raise unavailable[0]
+                media_to_process = await MediaDescriptionsRepository.get_media_for_processing_by_export_id(experiment_id, export_id, page_size, last_media_id, retry_failed)
+                if not media_to_process:
+                    break
+                for media_item in media_to_process:
+                    await queue.put(media_item)
+                if len(media_to_process) < page_size:
+                    break
+                last_media_id = media_to_process[-1].media_id
+
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+            if unavailable:
+                raise unavailable[0]
+        except Exception as e:
+            for task in workers:
+                task.cancel()
+            print(f"Warning: Image description job {job_id} failed: {e}")
+            if job_id:
+                await update_job_progress(job_id, {**progress_snapshot(), "error": str(e)})
+                await update_job_status(job_id, UpdateJobStatus(status=JobStatus.FAILED))
+            return
 
     # Update job status to completed if job_id is provided
     if job_id:
+        await update_job_progress(job_id, progress_snapshot())
         await update_job_status(job_id, UpdateJobStatus(status=JobStatus.COMPLETED))
 
     print(f"Finished background processing for export: {export_id}")
@@ -115,4 +264,6 @@ async def start_image_description_generation_by_export(
     job = await add_job(AddJob(status=JobStatus.PENDING, metadata=job_metadata))
 
     background_tasks.add_task(
-        background_process_by_export, payload.experiment_id, payload.tg_export_id, payload.model_name, job.id)
+        background_process_by_export, payload.experiment_id, payload.tg_export_id, payload.model_name, job.id,
+        payload.concurrency, payload.queue_size, payload.max_image_side, payload.jpeg_quality,
+        payload.analysis_mode, payload.retry_failed, payload.use_cache)
@@ -1,7 +1,7 @@
 from typing import List, Optional
 from datetime import datetime
 from uuid import UUID
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from src.pkg.telegram_schemas import Reactions
 
 
@@ -9,6 +9,19 @@ class StartParsing(BaseModel):
     apply_filters: bool
     tg_export_id: UUID
     experiment_id: UUID
+    bulk_insert: bool = Field(
+        True, description="Insert posts in batches over one connection instead of one transaction per post")
+    batch_size: int = Field(
+        1000, gt=0, description="Number of posts committed per transaction in bulk mode")
+    workers: int = Field(
+        1, gt=0, description="Number of worker processes validating messages in bulk mode")
+    chunk_size: int = Field(
+        500, gt=0, description="Number of raw messages sent to a worker at once")
+    resume: bool = Field(
+        False, description="Skip messages up to the last post_id committed by a previous run of this export. "
+                           "Meant for continuing an interrupted parse of the same file: edits to messages at or "
+                           "below that post_id in a newer export are not applied. Off by default because "
+                           "re-parsing is idempotent")
 
 
 class CreateMedia(BaseModel):
@@ -2,10 +2,11 @@ import json
 import os
 import aiosqlite
 from datetime import datetime
-from typing import Optional
-from uuid import UUID, uuid4
+from typing import Dict, List, Optional
+from uuid import UUID, uuid5
 
 from src.config import STORAGE_FOLDER
+from src.shared.db import sqlite
 from src.modules.parsers.schemas import PostModel
 from src.modules.parsers.dto import CreatePost
 
@@ -23,7 +24,7 @@ class ParsersRepository:
         """Create necessary tables in the experiment's SQLite database."""
         db_path = await cls.get_experiment_db_path(experiment_id)
 
-        async with aiosqlite.connect(db_path) as db:
+        async with sqlite.connect(db_path) as db:
             # Create posts table
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS posts (
@@ -64,83 +65,215 @@ class ParsersRepository:
                     description_time REAL,
                     tag_time REAL,
                     structured_description_time REAL,
+                    analysis_mode TEXT,
+                    error TEXT,
                     media_id TEXT,
                     created_at TEXT DEFAULT (datetime('now', 'utc')),
                     FOREIGN KEY (media_id) REFERENCES medias(id) ON DELETE SET NULL
                 )
             """)
 
+            # Columns added after the tables were first created
+            await cls._add_missing_columns(db, "media_datas", {
+                "analysis_mode": "TEXT",
+                "error": "TEXT",
+            })
+            await cls._requeue_legacy_errors(db)
+
+            await cls._create_unique_indexes(db)
+
+            # Last post_id committed per export, used to resume interrupted parses
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS parse_checkpoints (
+                    from_id TEXT PRIMARY KEY,
+                    last_post_id INTEGER NOT NULL,
+                    updated_at TEXT DEFAULT (datetime('now', 'utc'))
+                )
+            """)
+
             await db.commit()
 
     @classmethod
-    async def add_one_post_with_media(cls, experiment_id: UUID, tg_export_id: UUID, payload: CreatePost) -> Optional[PostModel]:
-        """Add a post with its media to the experiment's SQLite database."""
-        # Generate UUIDs for the new records
-        post_uuid = str(uuid4())
-        media_uuids = [str(uuid4())
-                       for _ in payload.media] if payload.media else []
-
-        # Prepare reactions JSON
-        reactions_json = (
-            json.dumps([r.model_dump() for r in payload.reactions])
-            if payload.reactions is not None
-            else None
-        )
-
-        # Prepare media data
-        media_data = []
-        if payload.media:
-            for i, media in enumerate(payload.media):
-                media_data.append({
-                    'id': media_uuids[i],
-                    'name': media.name,
-                    'mime_type': media.mime_type,
-                    'post_id': post_uuid
-                })
+    async def _add_missing_columns(cls, db: aiosqlite.Connection, table: str, columns: Dict[str, str]) -> None:
+        cursor = await db.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in await cursor.fetchall()}
+        for name, column_type in columns.items():
+            if name not in existing:
+                await db.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
 
-        db_path = await cls.get_experiment_db_path(experiment_id)
+    @classmethod
+    async def _requeue_legacy_errors(cls, db: aiosqlite.Connection) -> None:
+        """
+        Move failures stored as "Error: ..." text into the error column.
 
-        async with aiosqlite.connect(db_path) as db:
-            # Insert post
-            await db.execute("""
-                INSERT INTO posts (id, post_id, date, edited, post_text, reactions, has_media, from_id)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                post_uuid,
+        Older versions wrote the exception text in place of a description,
+        so the image counted as described. Clearing the description puts it
+        back in the work queue.
+        """
+        await db.execute("""
+            UPDATE media_datas
+            SET error = CASE
+                    WHEN description LIKE 'Error: %' THEN description
+                    WHEN tag LIKE 'Error: %' THEN tag
+                    ELSE structured_description
+                END,
+                description = NULL,
+                tag = CASE WHEN tag LIKE 'Error: %' THEN NULL ELSE tag END,
+                structured_description = CASE
+                    WHEN structured_description LIKE 'Error: %' THEN NULL ELSE structured_description
+                END
+            WHERE description LIKE 'Error: %' OR tag LIKE 'Error: %' OR structured_description LIKE 'Error: %'
+        """)
+
+    @classmethod
+    async def _create_unique_indexes(cls, db: aiosqlite.Connection) -> None:
+        """
+        Create the natural-key unique indexes used by the upserts.
+
+        Databases written before these indexes existed may contain duplicate
+        posts from repeated parses; the earliest copy of each post is kept and
+        the media rows of the other copies are removed before indexing.
+        """
+        cursor = await db.execute("""
+            SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'ux_posts_from_id_post_id'
+        """)
+        if await cursor.fetchone():
+            return
+
+        # GROUP BY puts all NULL keys in one group, but the unique indexes
+        # allow any number of NULLs: such rows are not duplicates
+        await db.execute("""
+            CREATE TEMP TABLE duplicate_posts AS
+            SELECT id FROM posts
+            WHERE from_id IS NOT NULL AND post_id IS NOT NULL
+                AND rowid NOT IN (SELECT MIN(rowid) FROM posts GROUP BY from_id, post_id)
+        """)
+        await db.execute("""
+            DELETE FROM media_datas WHERE media_id IN (
+                SELECT id FROM medias WHERE post_id IN (SELECT id FROM duplicate_posts)
+            )
+        """)
+        await db.execute("""
+            DELETE FROM medias WHERE post_id IN (SELECT id FROM duplicate_posts)
+        """)
+        await db.execute("""
+            DELETE FROM posts WHERE id IN (SELECT id FROM duplicate_posts)
+        """)
+        await db.execute("DROP TABLE duplicate_posts")
+        await db.execute("""
+            DELETE FROM media_datas
+            WHERE media_id IS NOT NULL
+                AND rowid NOT IN (SELECT MIN(rowid) FROM media_datas GROUP BY media_id)
+        """)
+
+        await db.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS ux_medias_post_id_name ON medias (post_id, name)
+        """)
+        await db.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS ux_media_datas_media_id ON media_datas (media_id)
+        """)
+        # Created last: its presence marks the migration as done
+        await db.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS ux_posts_from_id_post_id ON posts (from_id, post_id)
+        """)
+
+    @staticmethod
+    def post_uuid(tg_export_id: UUID, post_id: int) -> UUID:
+        """Deterministic id of a post, stable across re-parses of the same export."""
+        return uuid5(tg_export_id, f"post:{post_id}")
+
+    @staticmethod
+    def media_uuid(tg_export_id: UUID, post_id: int, media_name: str) -> UUID:
+        """Deterministic id of a post's media file."""
+        return uuid5(tg_export_id, f"media:{post_id}:{media_name}")
+
+    @classmethod
+    async def _upsert_posts_with_media(cls, db: aiosqlite.Connection, tg_export_id: UUID, payloads: List[CreatePost]) -> None:
+        """
+        Upsert posts keyed on (from_id, post_id) with their media rows.
+
+        Existing posts are rewritten only when their edited timestamp changed.
+        Media and empty media_datas rows are inserted once and never touched
+        again, so descriptions generated for them survive re-parses. Media rows
+        are attached to whatever id the stored post has, which keeps posts
+        written before ids became deterministic intact.
+        """
+        from_id = str(tg_export_id)
+        post_rows = []
+        media_rows = []
+        media_data_rows = []
+
+        for payload in payloads:
+            post_rows.append((
+                str(cls.post_uuid(tg_export_id, payload.post_id)),
                 payload.post_id,
                 payload.date.isoformat() if payload.date else None,
                 payload.edited.isoformat() if payload.edited else None,
                 payload.post_text,
-                reactions_json,
+                json.dumps([r.model_dump() for r in payload.reactions])
+                if payload.reactions is not None
+                else None,
                 payload.has_media,
-                str(tg_export_id)
+                from_id
             ))
 
-            # Insert media records
-            for media in media_data:
-                await db.execute("""
-                    INSERT INTO medias (id, name, mime_type, post_id)
-                    VALUES (?, ?, ?, ?)
-                """, (
-                    media['id'],
-                    media['name'],
-                    media['mime_type'],
-                    media['post_id']
+            for media in payload.media:
+                media_uuid = cls.media_uuid(
+                    tg_export_id, payload.post_id, media.name)
+                media_rows.append((
+                    str(media_uuid),
+                    media.name,
+                    media.mime_type,
+                    from_id,
+                    payload.post_id
                 ))
+                media_data_rows.append((
+                    str(uuid5(media_uuid, "media_data")),
+                    from_id,
+                    payload.post_id,
+                    media.name
+                ))
+
+        await db.executemany("""
+            INSERT INTO posts (id, post_id, date, edited, post_text, reactions, has_media, from_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (from_id, post_id) DO UPDATE
+            SET date = excluded.date,
+                edited = excluded.edited,
+                post_text = excluded.post_text,
+                reactions = excluded.reactions,
+                has_media = excluded.has_media
+            WHERE posts.edited IS NOT excluded.edited
+        """, post_rows)
+
+        await db.executemany("""
+            INSERT INTO medias (id, name, mime_type, post_id)
+            SELECT ?, ?, ?, p.id FROM posts p WHERE p.from_id = ? AND p.post_id = ?
+            ON CONFLICT (post_id, name) DO NOTHING
+        """, media_rows)
 
-                # Insert empty media_data record
-                media_data_uuid = str(uuid4())
-                await db.execute("""
-                    INSERT INTO media_datas (id, media_id)
-                    VALUES (?, ?)
-                """, (media_data_uuid, media['id']))
+        await db.executemany("""
+            INSERT INTO media_datas (id, media_id)
+            SELECT ?, m.id FROM medias m
+            JOIN posts p ON m.post_id = p.id
+            WHERE p.from_id = ? AND p.post_id = ? AND m.name = ?
+            ON CONFLICT (media_id) DO NOTHING
+        """, media_data_rows)
 
+    @classmethod
+    async def add_one_post_with_media(cls, experiment_id: UUID, tg_export_id: UUID, payload: CreatePost) -> Optional[PostModel]:
+        """Add or update a post with its media in the experiment's SQLite database."""
+        db_path = await cls.get_experiment_db_path(experiment_id)
+
+        async with sqlite.connect(db_path) as db:
+            await cls._upsert_posts_with_media(db, tg_export_id, [payload])
+            await cls._save_checkpoint(db, tg_export_id, payload.post_id)
             await db.commit()
 
-            # Fetch and return the created post
+            # Fetch and return the stored post
             cursor = await db.execute("""
-                SELECT * FROM posts WHERE id = ?
-            """, (post_uuid,))
+                SELECT * FROM posts WHERE from_id = ? AND post_id = ?
+            """, (str(tg_export_id), payload.post_id))
 
             row = await cursor.fetchone()
             if row:
@@ -157,3 +290,61 @@ class ParsersRepository:
                 )
 
         return None
+
+    @classmethod
+    async def connect(cls, experiment_id: UUID) -> aiosqlite.Connection:
+        """Open a long-lived connection to the experiment's SQLite database."""
+        db_path = await cls.get_experiment_db_path(experiment_id)
+        return sqlite.connect(db_path)
+
+    @classmethod
+    async def add_posts_with_media_bulk(cls, db: aiosqlite.Connection, tg_export_id: UUID, payloads: List[CreatePost]) -> int:
+        """
+        Upsert a batch of posts with their media in a single transaction.
+
+        Unlike add_one_post_with_media, the connection is owned by the caller
+        and the written rows are not read back.
+
+        Returns:
+            Number of rows actually inserted or updated across posts, medias
+            and media_datas; unchanged posts are not counted.
+        """
+        changes_before = db.total_changes
+        await cls._upsert_posts_with_media(db, tg_export_id, payloads)
+        rows_written = db.total_changes - changes_before
+
+        # Checkpoint in the same transaction so it never runs ahead of the data
+        if payloads:
+            await cls._save_checkpoint(db, tg_export_id, max(p.post_id for p in payloads))
+
+        await db.commit()
+        return rows_written
+
+    @classmethod
+    async def _save_checkpoint(cls, db: aiosqlite.Connection, tg_export_id: UUID, last_post_id: int) -> None:
+        await db.execute("""
+            INSERT INTO parse_checkpoints (from_id, last_post_id, updated_at)
+            VALUES (?, ?, datetime('now', 'utc'))
+            ON CONFLICT (from_id) DO UPDATE
+            SET last_post_id = excluded.last_post_id, updated_at = excluded.updated_at
+        """, (str(tg_export_id), last_post_id))
+
+    @classmethod
+    async def get_checkpoint(cls, experiment_id: UUID, tg_export_id: UUID) -> Optional[int]:
+        """Get the last post_id committed for an export, or None if nothing was parsed yet."""
+        database = await sqlite.get_database(await cls.get_experiment_db_path(experiment_id))
+
+        async with database.read() as db:
+            cursor = await db.execute("""
+                SELECT last_post_id FROM parse_checkpoints WHERE from_id = ?
+            """, (str(tg_export_id),))
+            row = await cursor.fetchone()
+            return row[0] if row else None
+
+    @classmethod
+    async def delete_checkpoint(cls, experiment_id: UUID, tg_export_id: UUID) -> None:
+        database = await sqlite.get_database(await cls.get_experiment_db_path(experiment_id))
+
+        await database.execute("""
+            DELETE FROM parse_checkpoints WHERE from_id = ?
+        """, (str(tg_export_id),))
@@ -1,8 +1,8 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Body
+from fastapi import APIRouter, Body, BackgroundTasks
 
-from src.modules.parsers.services import parse_raw_telegram_data
+from src.modules.parsers.services import start_telegram_data_parsing
 from src.modules.parsers.dto import StartParsing
 
 from src.schemas import PlainDataResponse, ApiResponse
@@ -14,10 +14,13 @@ router = APIRouter(
 )
 
 
-@router.post("/tg_data", description="Parses raw data from Telegram for a project and save it to SQLite database for the experiment")
-async def parse_telegram_data_handler(payload: Annotated[StartParsing, Body()]) -> ApiResponse[PlainDataResponse]:
+@router.post("/tg_data", description="Start background job that parses raw data from Telegram for a project and saves it to SQLite database for the experiment")
+async def parse_telegram_data_handler(
+    background_tasks: BackgroundTasks,
+    payload: Annotated[StartParsing, Body()],
+) -> ApiResponse[PlainDataResponse]:
     try:
-        await parse_raw_telegram_data(payload)
-        return ApiResponse(data=PlainDataResponse(message=f"Done"))
+        job = await start_telegram_data_parsing(payload, background_tasks)
+        return ApiResponse(data=PlainDataResponse(message=f"No errors at start, parsing started as job {job.id}."))
     except Exception as e:
         return ApiResponse(data=PlainDataResponse(error=str(e)))
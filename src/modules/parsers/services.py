@@ -1,32 +1,238 @@
-from typing import Generator
-from pydantic import ValidationError
+from typing import Awaitable, Callable, Deque, Dict, Generator, Iterator, List, Optional, Tuple
 
 from src.config import STORAGE_FOLDER
 
 import os
 import json
+import time
+import asyncio
+import itertools
+import multiprocessing
 import ijson
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from uuid import UUID
+from fastapi import BackgroundTasks
 
-from src.pkg.telegram_schemas import Message
+from src.pkg.garbage_filter import load_garbage_filter
+from src.utils.json_stream import stream_json_items_with_offset
 
-from src.modules.parsers.dto import StartParsing, CreatePost, CreateMedia
+from src.modules.parsers.dto import StartParsing, CreatePost
 from src.modules.parsers.repository import ParsersRepository
+from src.modules.parsers.utils import build_create_post, init_parser_worker, parse_messages_chunk
 
 from src.modules.tg_exports.repository import TgExportsRepository
 from src.modules.experiments.repository import ExperimentsRepository
+from src.modules.jobs.services import add_job, update_job_status, update_job_progress
+from src.modules.jobs.schemas import JobModel, JobStatus, AddJob, UpdateJobStatus
 
 
-def stream_raw_tg_data(filename: str) -> Generator[dict, None, None]:
+def stream_raw_tg_data(filename: str) -> Generator[Tuple[dict, int], None, None]:
+    """Stream export messages in one pass, yielding (message, bytes_read)."""
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            yield from ijson.items(f, 'messages.item')
+        yield from stream_json_items_with_offset(filename, 'messages.item')
     except FileNotFoundError:
         raise ValueError(f"File not found at {filename}")
-    except json.JSONDecodeError:
+    except (json.JSONDecodeError, ijson.JSONError):
         raise ValueError(f"Could not decode JSON from file {filename}")
 
 
-async def parse_raw_telegram_data(payload: StartParsing) -> None:
+def _read_chunk(raw_tg_data: Iterator[Tuple[dict, int]], size: int, resume_after: Optional[int]) -> Tuple[List[dict], int, int]:
+    """
+    Pull up to `size` raw messages from the stream. Runs in a thread.
+
+    Messages with an id at or below `resume_after` were committed by an
+    earlier run and are dropped here, before they reach the workers.
+
+    Returns:
+        Tuple of (messages to parse, messages consumed, bytes_read).
+    """
+    chunk = []
+    consumed = 0
+    bytes_read = 0
+    for item, bytes_read in itertools.islice(raw_tg_data, size):
+        consumed += 1
+        if resume_after is not None and item.get('id', 0) <= resume_after:
+            continue
+        chunk.append(item)
+    return chunk, consumed, bytes_read
+
+
+async def ingest_messages_parallel(
+    payload: StartParsing,
+    raw_data_file: str,
+    garbage_file: Optional[str],
+    resume_after: Optional[int],
+    counters: Dict[str, int],
+    on_batch_written: Callable[[], Awaitable[None]],
+) -> None:
+    """
+    Parse an export with a producer / worker pool / single writer pipeline.
+
+    The producer streams raw messages in chunks from a thread, a pool of
+    `payload.workers` processes validates them into CreatePost objects, and
+    this coroutine writes the results in batches over one SQLite connection.
+    Results are consumed in submission order, so posts are written in the
+    order of the export (ascending post_id) regardless of worker timing.
+    Messages up to `resume_after` are skipped.
+    """
+    loop = asyncio.get_running_loop()
+    raw_tg_data = stream_raw_tg_data(raw_data_file)
+    executor = ProcessPoolExecutor(
+        max_workers=payload.workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_parser_worker,
+        initargs=(garbage_file,),
+    )
+    # Keep every worker busy while bounding memory held by parsed chunks
+    max_in_flight = payload.workers * 2
+    pending: Deque[Tuple[asyncio.Future, int, int]] = deque()
+    batch: List[CreatePost] = []
+
+    async with await ParsersRepository.connect(payload.experiment_id) as db:
+        async def write_batch(posts: List[CreatePost]) -> None:
+            counters["rows_written"] += await ParsersRepository.add_posts_with_media_bulk(
+                db, payload.tg_export_id, posts)
+            counters["posts_written"] += len(posts)
+            counters["last_post_id"] = posts[-1].post_id
+            await on_batch_written()
+
+        async def drain_one() -> None:
+            nonlocal batch
+            future, chunk_len, bytes_read = pending.popleft()
+            batch.extend(await future)
+            counters["messages_processed"] += chunk_len
+            counters["bytes_read"] = bytes_read
+            while len(batch) >= payload.batch_size:
+                await write_batch(batch[:payload.batch_size])
+                batch = batch[payload.batch_size:]
+
+        try:
+            while True:
+                chunk, consumed, bytes_read = await asyncio.to_thread(
+                    _read_chunk, raw_tg_data, payload.chunk_size, resume_after)
+                if not consumed:
+                    break
+                if not chunk:
+                    # Everything in this chunk was committed by a previous run
+                    counters["messages_processed"] += consumed
+                    counters["bytes_read"] = bytes_read
+                    continue
+                future = loop.run_in_executor(
+                    executor, parse_messages_chunk, chunk)
+                pending.append((future, consumed, bytes_read))
+                if len(pending) >= max_in_flight:
+                    await drain_one()
+
+            while pending:
+                await drain_one()
+
+            if batch:
+                await write_batch(batch)
+        finally:
+            await asyncio.to_thread(executor.shutdown, True, cancel_futures=True)
+
+
+async def background_parse_by_export(
+    payload: StartParsing,
+    job_id: UUID,
+    raw_data_file: str,
+    garbage_file: Optional[str],
+):
+    await update_job_status(job_id, UpdateJobStatus(status=JobStatus.IN_PROGRESS))
+
+    try:
+        garbage_ids, garbage_matcher = load_garbage_filter(garbage_file)
+
+        resume_after = None
+        if payload.resume:
+            resume_after = await ParsersRepository.get_checkpoint(
+                payload.experiment_id, payload.tg_export_id)
+        else:
+            await ParsersRepository.delete_checkpoint(
+                payload.experiment_id, payload.tg_export_id)
+
+        try:
+            file_size = os.path.getsize(raw_data_file)
+        except OSError:
+            file_size = 0
+
+        counters = {
+            "messages_processed": 0,
+            "posts_written": 0,
+            "rows_written": 0,
+            "bytes_read": 0,
+            "last_post_id": resume_after,
+        }
+        start_time = time.perf_counter()
+
+        def progress_snapshot() -> dict:
+            elapsed = time.perf_counter() - start_time
+            return {
+                **counters,
+                "resumed_after_post_id": resume_after,
+                "mode": "bulk" if payload.bulk_insert else "per_row",
+                "batch_size": payload.batch_size if payload.bulk_insert else 1,
+                "workers": payload.workers if payload.bulk_insert else 0,
+                "file_size": file_size,
+                "percent": round(100 * counters["bytes_read"] / file_size, 2) if file_size else None,
+                "elapsed_seconds": round(elapsed, 3),
+                "rows_per_second": round(counters["rows_written"] / elapsed, 1) if elapsed > 0 else None,
+            }
+
+        async def report_progress() -> None:
+            await update_job_progress(job_id, progress_snapshot())
+
+        if payload.bulk_insert:
+            await ingest_messages_parallel(
+                payload, raw_data_file, garbage_file, resume_after, counters, report_progress)
+        else:
+            for item, bytes_read in stream_raw_tg_data(raw_data_file):
+                counters["messages_processed"] += 1
+                counters["bytes_read"] = bytes_read
+                if resume_after is not None and item.get('id', 0) <= resume_after:
+                    continue
+
+                create_post_payload = build_create_post(
+                    item, garbage_ids, garbage_matcher)
+                if not create_post_payload:
+                    continue
+
+                await ParsersRepository.add_one_post_with_media(
+                    payload.experiment_id,
+                    payload.tg_export_id,
+                    create_post_payload
+                )
+                counters["posts_written"] += 1
+                counters["last_post_id"] = create_post_payload.post_id
+                # Each media produces a medias and a media_datas row
+                counters["rows_written"] += 1 + \
+                    2 * len(create_post_payload.media)
+                if counters["posts_written"] % payload.batch_size == 0:
+                    await report_progress()
+
+        # An empty export is only detected once the stream is exhausted
+        if counters["messages_processed"] == 0:
+            raise ValueError("No messages found in the file.")
+
+        counters["bytes_read"] = file_size
+        await report_progress()
+
+    except Exception as e:
+        print(f"Warning: Parsing job {job_id} failed: {e}")
+        await update_job_progress(job_id, {"error": str(e)})
+        await update_job_status(job_id, UpdateJobStatus(status=JobStatus.FAILED))
+        return
+
+    await update_job_status(job_id, UpdateJobStatus(status=JobStatus.COMPLETED))
+
+    print(f"Finished parsing export: {payload.tg_export_id}")
+
+
+async def start_telegram_data_parsing(
+    payload: StartParsing,
+    background_tasks: BackgroundTasks
+) -> JobModel:
     tg_export = await TgExportsRepository.get_one_by_id(payload.tg_export_id)
 
     if not tg_export:
@@ -48,89 +254,23 @@ async def parse_raw_telegram_data(payload: StartParsing) -> None:
     RAW_DATA_FILE = os.path.join(PROJECT_DIR, 'raw_data.json')
     GARBAGE_FILE = os.path.join(PROJECT_DIR, 'garbage.json')
 
-    garbage_ids = []
-    garbage_list = []
+    if not os.path.exists(RAW_DATA_FILE):
+        raise ValueError(f"File not found at {RAW_DATA_FILE}")
 
-    if os.path.exists(GARBAGE_FILE) and payload.apply_filters:
-        with open(GARBAGE_FILE, 'r', encoding='utf-8') as f:
-            try:
-                garbage_data = json.load(f)
-                garbage_ids = garbage_data.get('garbage_ids', [])
-                garbage_list = garbage_data.get('garbage_list', [])
-            except json.JSONDecodeError:
-                raise ValueError(
-                    f"Could not decode garbage file at {GARBAGE_FILE}")
+    garbage_file = GARBAGE_FILE if payload.apply_filters else None
 
+    # Compile the garbage filter up front so a broken file fails fast
     try:
-        with open(RAW_DATA_FILE, 'r', encoding='utf-8') as f:
-            total_messages = sum(1 for _ in ijson.items(f, 'messages.item'))
-
-        if total_messages == 0:
-            raise ValueError("No messages found in the file.")
+        load_garbage_filter(garbage_file)
+    except json.JSONDecodeError:
+        raise ValueError(
+            f"Could not decode garbage file at {GARBAGE_FILE}")
 
-        raw_tg_data = stream_raw_tg_data(RAW_DATA_FILE)
-        result: list[CreatePost] = []
-        garbage_ids_set = set(garbage_ids)
+    # Create a job for tracking this background process
+    job_metadata = f"Parse export {payload.tg_export_id} into experiment {payload.experiment_id}"
+    job = await add_job(AddJob(status=JobStatus.PENDING, metadata=job_metadata))
 
-        for item in raw_tg_data:
-            if item.get('type') == 'message':
-                if item.get('id') in garbage_ids_set:
-                    continue
-                try:
-                    message = Message.model_validate(item)
-
-                    if message.text_entities or message.photo:
-                        text = ""
-                        if message.text_entities:
-                            text = "".join(
-                                entity.text for entity in message.text_entities)
-                            for garbage in garbage_list:
-                                text = text.replace(garbage, '')
-                            text = text.strip()
-
-                        media_list = []
-                        if message.photo:
-                            mime_type = message.mime_type
-                            if not mime_type:
-                                file_ext = os.path.splitext(
-                                    message.photo)[1].lower()
-                                mime_types = {
-                                    '.jpg': 'image/jpeg',
-                                    '.jpeg': 'image/jpeg',
-                                    '.png': 'image/png',
-                                    '.gif': 'image/gif',
-                                    '.webp': 'image/webp',
-                                    '.bmp': 'image/bmp',
-                                }
-                                mime_type = mime_types.get(file_ext)
-
-                            media = CreateMedia(
-                                name=message.photo,
-                                mime_type=mime_type
-                            )
-                            media_list.append(media)
-
-                        create_post_payload = CreatePost(
-                            post_id=message.id,
-                            date=message.date,
-                            edited=message.edited,
-                            post_text=text,
-                            reactions=message.reactions,
-                            media=media_list,
-                            has_media=len(media_list) > 0
-                        )
-
-                        if create_post_payload.post_text or create_post_payload.has_media:
-                            result.append(create_post_payload)
-                            await ParsersRepository.add_one_post_with_media(
-                                payload.experiment_id,
-                                payload.tg_export_id,
-                                create_post_payload
-                            )
-
-                except ValidationError as e:
-                    print(e)
-                    pass
+    background_tasks.add_task(
+        background_parse_by_export, payload, job.id, RAW_DATA_FILE, garbage_file)
 
-    except Exception as e:
-        raise ValueError(f"Stream processing error: {e}")
+    return job
@@ -0,0 +1,91 @@
+import os
+from typing import List, Optional, Set
+
+from pydantic import ValidationError
+
+from src.pkg.telegram_schemas import Message
+from src.pkg.garbage_filter import GarbagePhraseMatcher, load_garbage_filter
+from src.modules.parsers.dto import CreatePost, CreateMedia
+
+
+def build_create_post(item: dict, garbage_ids_set: Set[int], garbage_matcher: GarbagePhraseMatcher) -> Optional[CreatePost]:
+    """Convert a raw export message into a CreatePost, or None if it should be skipped."""
+    if item.get('type') != 'message':
+        return None
+    if item.get('id') in garbage_ids_set:
+        return None
+
+    try:
+        message = Message.model_validate(item)
+    except ValidationError as e:
+        print(e)
+        return None
+
+    if not (message.text_entities or message.photo):
+        return None
+
+    text = ""
+    if message.text_entities:
+        text = "".join(
+            entity.text for entity in message.text_entities)
+        text = garbage_matcher.remove(text).strip()
+
+    media_list = []
+    if message.photo:
+        mime_type = message.mime_type
+        if not mime_type:
+            file_ext = os.path.splitext(
+                message.photo)[1].lower()
+            mime_types = {
+                '.jpg': 'image/jpeg',
+                '.jpeg': 'image/jpeg',
+                '.png': 'image/png',
+                '.gif': 'image/gif',
+                '.webp': 'image/webp',
+                '.bmp': 'image/bmp',
+            }
+            mime_type = mime_types.get(file_ext)
+
+        media = CreateMedia(
+            name=message.photo,
+            mime_type=mime_type
+        )
+        media_list.append(media)
+
+    create_post_payload = CreatePost(
+        post_id=message.id,
+        date=message.date,
+        edited=message.edited,
+        post_text=text,
+        reactions=message.reactions,
+        media=media_list,
+        has_media=len(media_list) > 0
+    )
+
+    if create_post_payload.post_text or create_post_payload.has_media:
+        return create_post_payload
+    return None
+
+
+# State of a parser worker process, set once by init_parser_worker so that the
+# garbage filters are not pickled with every chunk.
+_worker_garbage_ids: Set[int] = set()
+_worker_garbage_matcher = GarbagePhraseMatcher([])
+
+
+def init_parser_worker(garbage_file: Optional[str]) -> None:
+    """ProcessPoolExecutor initializer for parser workers."""
+    global _worker_garbage_ids, _worker_garbage_matcher
+    _worker_garbage_ids, _worker_garbage_matcher = load_garbage_filter(
+        garbage_file)
+
+
+def parse_messages_chunk(items: List[dict]) -> List[CreatePost]:
+    """Validate a chunk of raw export messages inside a worker process, preserving their order."""
+    result: List[CreatePost] = []
+    for item in items:
+        create_post_payload = build_create_post(
+            item, _worker_garbage_ids, _worker_garbage_matcher)
+        if create_post_payload:
+            result.append(create_post_payload)
+    return result
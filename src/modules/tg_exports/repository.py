@@ -1,18 +1,11 @@
 from typing import Optional
 from uuid import UUID
 
-from src.config import (
-    DB_USER,
-    DB_PASSWORD,
-    DB_HOST,
-    DB_PORT,
-    DB_NAME
-)
-
-import psycopg
 from psycopg import sql
 from psycopg.rows import class_row
 
+from src.shared.db.postgres import get_connection
+
 from src.modules.tg_exports.schemas import TgExportModel
 from src.modules.tg_exports.dto import AddTgExport, UpdateTgExport
 
@@ -20,13 +13,7 @@ from src.modules.tg_exports.dto import AddTgExport, UpdateTgExport
 class TgExportsRepository:
     @classmethod
     async def get_all(cls) -> list[TgExportModel]:
-        async with await psycopg.AsyncConnection.connect(
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME,
-        ) as aconn:
+        async with get_connection() as aconn:
             async with aconn.cursor(row_factory=class_row(TgExportModel)) as acur:
                 await acur.execute(sql.SQL("""
                     SELECT * FROM tg_exports
@@ -36,13 +23,7 @@ class TgExportsRepository:
 
     @classmethod
     async def add_one(cls, payload: AddTgExport) -> Optional[TgExportModel]:
-        async with await psycopg.AsyncConnection.connect(
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME,
-        ) as aconn:
+        async with get_connection() as aconn:
             async with aconn.cursor(row_factory=class_row(TgExportModel)) as acur:
                 await acur.execute(sql.SQL("""
                       INSERT INTO tg_exports (channel_id, data_path, photos_path)
@@ -54,13 +35,7 @@ class TgExportsRepository:
 
     @classmethod
     async def delete(cls, tg_export_id: UUID) -> None:
-        async with await psycopg.AsyncConnection.connect(
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME,
-        ) as aconn:
+        async with get_connection() as aconn:
             async with aconn.cursor() as acur:
                 await acur.execute(sql.SQL("""
                       DELETE FROM tg_exports WHERE id = %s
@@ -68,13 +43,7 @@ class TgExportsRepository:
 
     @classmethod
     async def update(cls, tg_export_id: UUID, payload: UpdateTgExport) -> Optional[TgExportModel]:
-        async with await psycopg.AsyncConnection.connect(
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME,
-        ) as aconn:
+        async with get_connection() as aconn:
             async with aconn.cursor(row_factory=class_row(TgExportModel)) as acur:
                 await acur.execute(sql.SQL("""
                       UPDATE tg_exports
@@ -87,13 +56,7 @@ class TgExportsRepository:
 
     @classmethod
     async def get_one_by_id(cls, tg_export_id: UUID) -> Optional[TgExportModel]:
-        async with await psycopg.AsyncConnection.connect(
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME,
-        ) as aconn:
+        async with get_connection() as aconn:
             async with aconn.cursor(row_factory=class_row(TgExportModel)) as acur:
                 await acur.execute(sql.SQL("""
                     SELECT * FROM tg_exports
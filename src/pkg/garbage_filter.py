@@ -0,0 +1,124 @@
+import os
+import json
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class GarbagePhraseMatcher:
+    """
+    Aho–Corasick automaton that removes garbage phrases from text in one pass.
+
+    Overlapping matches are resolved leftmost-longest: the match that starts
+    first wins, and among matches starting at the same position the longest
+    one is removed. Removed matches never overlap: a phrase overlapping a
+    removed one stays in the text (['ABC', 'CDE'] turn 'ABCDE' into 'DE'),
+    while phrases starting after it are removed as usual. Text is scanned
+    once regardless of the number of phrases.
+    """
+
+    def __init__(self, phrases: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Length of the phrase ending in each state, 0 if none
+        self._out: List[int] = [0]
+        # Nearest state on the failure chain that ends a phrase (dictionary
+        # suffix link), 0 if none: shorter phrases ending at the same position
+        self._dict: List[int] = [0]
+
+        for phrase in phrases:
+            if phrase:
+                self._add(phrase)
+        self._build_failure_links()
+
+    def _add(self, phrase: str) -> None:
+        state = 0
+        for ch in phrase:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(0)
+                self._dict.append(0)
+                self._goto[state][ch] = next_state
+            state = next_state
+        self._out[state] = len(phrase)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                fail_state = self._goto[fallback].get(ch, 0)
+                self._fail[next_state] = fail_state
+                self._dict[next_state] = fail_state if self._out[fail_state] else self._dict[fail_state]
+
+    def __bool__(self) -> bool:
+        return len(self._goto) > 1
+
+    def remove(self, text: str) -> str:
+        """Return text with all garbage phrases removed."""
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        dict_link = self._dict
+
+        state = 0
+        matches: List[Tuple[int, int]] = []
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            # Every phrase ending here, longest first
+            match_state = state if out[state] else dict_link[state]
+            while match_state:
+                matches.append((i + 1 - out[match_state], i + 1))
+                match_state = dict_link[match_state]
+
+        if not matches:
+            return text
+
+        matches.sort(key=lambda match: (match[0], -match[1]))
+        pieces = []
+        position = 0
+        for start, end in matches:
+            if start >= position:
+                pieces.append(text[position:start])
+                position = end
+        pieces.append(text[position:])
+        return "".join(pieces)
+
+
+# Compiled filters keyed by garbage file path, invalidated by mtime
+_filter_cache: Dict[str, Tuple[float, Set[int], GarbagePhraseMatcher]] = {}
+
+
+def load_garbage_filter(garbage_file: Optional[str]) -> Tuple[Set[int], GarbagePhraseMatcher]:
+    """
+    Load garbage ids and a compiled phrase matcher from a garbage.json file.
+
+    The matcher is compiled once per file and reused until the file's mtime
+    changes. A missing file (or None) yields an empty filter.
+
+    Raises:
+        json.JSONDecodeError: If the garbage file is not valid JSON.
+    """
+    if not garbage_file or not os.path.exists(garbage_file):
+        return set(), GarbagePhraseMatcher([])
+
+    mtime = os.path.getmtime(garbage_file)
+    cached = _filter_cache.get(garbage_file)
+    if cached and cached[0] == mtime:
+        return cached[1], cached[2]
+
+    with open(garbage_file, 'r', encoding='utf-8') as f:
+        garbage_data = json.load(f)
+
+    garbage_ids = set(garbage_data.get('garbage_ids', []))
+    matcher = GarbagePhraseMatcher(garbage_data.get('garbage_list', []))
+    _filter_cache[garbage_file] = (mtime, garbage_ids, matcher)
+    return garbage_ids, matcher
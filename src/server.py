@@ -1,9 +1,13 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from src.router import router as api_router
 from src.utils.db_health import check_psql_connection, check_milvus_connection
+from src.shared.db.postgres import open_pools, close_pools
+from src.shared.db.milvus import open_milvus, close_milvus
+from src.shared.db.sqlite import close_databases
 
 
 @asynccontextmanager
@@ -12,6 +16,8 @@ async def lifespan(app: FastAPI):
     try:
         await check_psql_connection()
         await check_milvus_connection()
+        await open_pools()
+        await asyncio.to_thread(open_milvus)
         print("Database connections are healthy.")
     except Exception as e:
         print(f"Database connection check failed: {e}")
@@ -19,6 +25,9 @@ async def lifespan(app: FastAPI):
         raise
     yield
     print("Server is shutting down.")
+    await close_databases()
+    await close_pools()
+    await asyncio.to_thread(close_milvus)
 
 
 app = FastAPI(
@@ -0,0 +1,185 @@
+import asyncio
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from pymilvus import connections, db, utility, Collection, DataType
+
+from src.config import MILVUS_HOST, MILVUS_PORT, MILVUS_HEALTH_CHECK_INTERVAL
+
+
+# One long-lived gRPC channel for the process, registered under this alias.
+# Opened in the FastAPI lifespan; connected lazily on first use otherwise.
+# pymilvus is blocking: call these helpers through asyncio.to_thread.
+MILVUS_ALIAS = "milvus_ops"
+
+_lock = threading.Lock()
+_collections: Dict[str, Collection] = {}
+_last_check = 0.0
+
+
+def _open() -> None:
+    connections.connect(alias=MILVUS_ALIAS, host=MILVUS_HOST, port=MILVUS_PORT)
+    # Ensure we are using the default database
+    db.using_database("default", using=MILVUS_ALIAS)
+
+
+def _close() -> None:
+    _collections.clear()
+    connections.disconnect(alias=MILVUS_ALIAS)
+
+
+def get_alias() -> str:
+    """
+    Return the alias of a live connection.
+
+    The connection is probed at most every MILVUS_HEALTH_CHECK_INTERVAL
+    seconds and re-established if the probe fails.
+    """
+    global _last_check
+    with _lock:
+        if not connections.has_connection(MILVUS_ALIAS):
+            _open()
+            _last_check = time.monotonic()
+        elif time.monotonic() - _last_check > MILVUS_HEALTH_CHECK_INTERVAL:
+            try:
+                utility.get_server_version(using=MILVUS_ALIAS)
+            except Exception as e:
+                print(f"Warning: Milvus connection lost ({e}), reconnecting")
+                _close()
+                _open()
+            _last_check = time.monotonic()
+    return MILVUS_ALIAS
+
+
+def get_collection(collection_name: str) -> Collection:
+    """Cached Collection handle, so the schema is described once per process."""
+    alias = get_alias()
+    with _lock:
+        collection = _collections.get(collection_name)
+        if collection is None:
+            collection = Collection(name=collection_name, using=alias)
+            _collections[collection_name] = collection
+        return collection
+
+
+def forget_collection(collection_name: str) -> None:
+    """Drop a cached handle, e.g. after the collection was dropped or recreated."""
+    with _lock:
+        _collections.pop(collection_name, None)
+
+
+def open_milvus() -> None:
+    get_alias()
+
+
+def close_milvus() -> None:
+    with _lock:
+        _close()
+
+
+class BufferedMilvusWriter:
+    """
+    Accumulates (psql_id, vector) rows and inserts them in large batches.
+
+    Rows are inserted once `max_rows` or `max_bytes` of vectors are buffered
+    and the collection is flushed (segments sealed) only on exit, or every
+    `flush_interval` seconds if given. Frequent small flushes leave many
+    tiny segments behind, which slows compaction and search.
+
+    Use as an async context manager; buffered rows are written on exit even
+    if the block raised.
+    """
+
+    def __init__(self, collection_name: str, max_rows: int = 8192, max_bytes: int = 32 * 1024 * 1024, flush_interval: Optional[float] = None):
+        self.collection_name = collection_name
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.rows_inserted = 0
+        self.flushes = 0
+        self._ids: List[str] = []
+        self._vectors: List[np.ndarray] = []
+        self._scalars: Dict[str, list] = {}
+        self._buffered_bytes = 0
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    async def __aenter__(self) -> "BufferedMilvusWriter":
+        if self.flush_interval:
+            self._timer = asyncio.create_task(self._flush_periodically())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if self._timer:
+            # Not cancelled: a periodic flush in the middle of an insert
+            # finishes and updates the counters before the final flush
+            self._stopping.set()
+            await self._timer
+        try:
+            await self.flush()
+        except Exception as e:
+            if exc_type is None:
+                raise
+            print(f"Warning: Could not write buffered Milvus rows: {e}")
+
+    async def add(self, psql_ids: List[str], vectors: np.ndarray, **scalars: list) -> None:
+        """
+        Buffer rows. Scalar fields are passed as named columns, e.g.
+        date=[...]; columns missing from the collection schema are dropped.
+        """
+        async with self._lock:
+            self._ids.extend(psql_ids)
+            self._vectors.append(vectors)
+            for name, values in scalars.items():
+                self._scalars.setdefault(name, []).extend(values)
+            self._buffered_bytes += vectors.nbytes
+            if len(self._ids) >= self.max_rows or self._buffered_bytes >= self.max_bytes:
+                await self._insert()
+
+    async def flush(self) -> None:
+        """Insert buffered rows and seal the collection's growing segments."""
+        async with self._lock:
+            await self._insert()
+            await asyncio.to_thread(get_collection(self.collection_name).flush)
+            self.flushes += 1
+
+    async def _insert(self) -> None:
+        if not self._ids:
+            return
+        ids, vectors, scalars = self._ids, np.concatenate(self._vectors), self._scalars
+        self._ids, self._vectors, self._scalars, self._buffered_bytes = [], [], {}, 0
+        await asyncio.to_thread(self._insert_sync, ids, vectors, scalars)
+        self.rows_inserted += len(ids)
+
+    def _insert_sync(self, ids: List[str], vectors: np.ndarray, scalars: Dict[str, list]) -> None:
+        collection = get_collection(self.collection_name)
+        # Columns in schema order; collections created before a scalar
+        # field existed simply do not receive it
+        columns = []
+        for field in collection.schema.fields:
+            if field.auto_id:
+                continue
+            if field.name == "psql_id":
+                columns.append(ids)
+            elif field.dtype == DataType.FLOAT_VECTOR:
+                # One C-level conversion of the (n, dim) array; pymilvus packs
+                # plain lists several times faster than ndarray rows
+                columns.append(vectors.tolist())
+            else:
+                columns.append(scalars[field.name])
+        collection.insert(columns)
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Warning: Periodic Milvus flush failed: {e}")
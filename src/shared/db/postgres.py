@@ -0,0 +1,149 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import psycopg
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool
+
+from src.config import (
+    DB_USER,
+    DB_PASSWORD,
+    DB_HOST,
+    DB_PORT,
+    DB_NAME,
+    DB_POOL_MIN_SIZE,
+    DB_POOL_MAX_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_POOL_MAX_IDLE,
+    DB_POOL_MAX_LIFETIME,
+    DB_POOL_HEALTH_CHECK,
+)
+
+
+# Application database (DB_NAME) and the maintenance "postgres" database used
+# to list, create and drop databases. Opened in the FastAPI lifespan; opened
+# lazily on first use when repositories run outside the server.
+_pool: Optional[AsyncConnectionPool] = None
+_admin_pool: Optional[AsyncConnectionPool] = None
+_open_lock = asyncio.Lock()
+
+
+def _conninfo(dbname: str) -> str:
+    return make_conninfo(
+        user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT, dbname=dbname)
+
+
+async def _open(dbname: str, min_size: int, max_size: int, **kwargs) -> AsyncConnectionPool:
+    pool = AsyncConnectionPool(
+        _conninfo(dbname),
+        min_size=min_size,
+        max_size=max_size,
+        timeout=DB_POOL_TIMEOUT,
+        max_idle=DB_POOL_MAX_IDLE,
+        max_lifetime=DB_POOL_MAX_LIFETIME,
+        # Validate a connection before handing it out; dead ones are replaced
+        check=AsyncConnectionPool.check_connection if DB_POOL_HEALTH_CHECK else None,
+        name=dbname,
+        open=False,
+        **kwargs,
+    )
+    try:
+        await pool.open(wait=True, timeout=DB_POOL_TIMEOUT)
+    except Exception:
+        await pool.close()
+        raise
+    return pool
+
+
+async def open_pools() -> None:
+    """Open the shared pools. Fails if min_size connections cannot be made."""
+    global _pool, _admin_pool
+    async with _open_lock:
+        if _pool is None:
+            _pool = await _open(DB_NAME, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE)
+        if _admin_pool is None:
+            # CREATE / DROP DATABASE cannot run inside a transaction
+            _admin_pool = await _open("postgres", 0, 2, kwargs={"autocommit": True})
+
+
+async def close_pools() -> None:
+    global _pool, _admin_pool
+    pools, _pool, _admin_pool = (_pool, _admin_pool), None, None
+    for pool in pools:
+        if pool is not None:
+            await pool.close()
+
+
+async def close_app_pool() -> None:
+    """
+    Close the application pool so no session holds DB_NAME open.
+
+    Needed before dropping DB_NAME; the pool reopens on next use.
+    """
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        await pool.close()
+
+
+@asynccontextmanager
+async def get_connection() -> AsyncIterator[psycopg.AsyncConnection]:
+    """
+    Borrow a connection to the application database.
+
+    The transaction is committed when the block exits normally and rolled
+    back on exception, as with `async with AsyncConnection`.
+    """
+    if _pool is None:
+        await open_pools()
+    async with _pool.connection() as aconn:
+        yield aconn
+
+
+@asynccontextmanager
+async def get_admin_connection() -> AsyncIterator[psycopg.AsyncConnection]:
+    """Borrow an autocommit connection to the "postgres" maintenance database."""
+    if _admin_pool is None:
+        await open_pools()
+    async with _admin_pool.connection() as aconn:
+        yield aconn
+
+
+@asynccontextmanager
+async def get_database_connection(dbname: str) -> AsyncIterator[psycopg.AsyncConnection]:
+    """
+    Connection to any database on the server.
+
+    Pooled for DB_NAME; other databases are only touched by rare admin
+    operations and get a dedicated connection.
+    """
+    if dbname == DB_NAME:
+        async with get_connection() as aconn:
+            yield aconn
+    else:
+        async with await psycopg.AsyncConnection.connect(_conninfo(dbname)) as aconn:
+            yield aconn
+
+
+def _stats(pool: Optional[AsyncConnectionPool]) -> Optional[Dict[str, Any]]:
+    if pool is None:
+        return None
+    stats = pool.get_stats()
+    size = stats.get("pool_size", 0)
+    available = stats.get("pool_available", 0)
+    connections = stats.get("connections_num", 0)
+    return {
+        **stats,
+        "in_use": size - available,
+        "waiting": stats.get("requests_waiting", 0),
+        "avg_connect_ms": round(stats.get("connections_ms", 0) / connections, 2) if connections else None,
+    }
+
+
+def get_pool_stats() -> Dict[str, Optional[Dict[str, Any]]]:
+    """Counters of both pools; None for a pool that is not open."""
+    return {
+        "app": _stats(_pool),
+        "admin": _stats(_admin_pool),
+    }
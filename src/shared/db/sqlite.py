@@ -0,0 +1,297 @@
+import asyncio
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, List, Optional, Sequence, Tuple, Union
+
+import aiosqlite
+
+from src.config import (
+    SQLITE_MMAP_SIZE_MB,
+    SQLITE_CACHE_SIZE_MB,
+    SQLITE_IDLE_TTL,
+    SQLITE_MAX_OPEN_DATABASES,
+)
+
+
+def _connect_sync(path: str, read_only: bool, check_same_thread: bool = True) -> sqlite3.Connection:
+    if read_only:
+        # mode=ro fails on a missing file instead of creating an empty one
+        conn = sqlite3.connect(
+            f"{Path(path).resolve().as_uri()}?mode=ro", uri=True, check_same_thread=check_same_thread)
+    else:
+        conn = sqlite3.connect(path, check_same_thread=check_same_thread)
+        # Persistent for the file: readers do not block the writer
+        conn.execute("PRAGMA journal_mode=WAL")
+    # Wait for a competing writer instead of failing with "database is locked"
+    conn.execute("PRAGMA busy_timeout=5000")
+    # Durable at every checkpoint; a commit no longer waits for an fsync
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE_MB * 1024 * 1024}")
+    # Negative values are KiB rather than pages
+    conn.execute(f"PRAGMA cache_size={-SQLITE_CACHE_SIZE_MB * 1024}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+def connect(path: Union[str, Path], read_only: bool = False) -> aiosqlite.Connection:
+    """
+    aiosqlite connection with the project's performance settings.
+
+    Drop-in for aiosqlite.connect: use with `async with connect(path) as db`
+    or `await connect(path)`. The pragmas run in the connection's thread
+    before the first statement.
+    """
+    return aiosqlite.Connection(lambda: _connect_sync(str(path), read_only), iter_chunk_size=64)
+
+
+class SQLiteDatabase:
+    """
+    Long-lived connections to one database file.
+
+    Writes go through a single writer task: statements are queued, applied
+    in one transaction per batch and each caller is resumed once its
+    statement is committed. A batch is whatever queued up while the previous
+    commit ran, plus up to `commit_interval` seconds of new statements; the
+    default of 0 commits as soon as the writer is free, which already
+    coalesces concurrent writers without adding latency. Reads borrow one of
+    up to `read_pool_size` connections. Obtain instances with get_database
+    and use them right away: once evicted or reaped an instance is closed
+    for good and refuses further statements.
+    """
+
+    def __init__(self, path: str, read_pool_size: int = 2, commit_interval: float = 0.0, max_batch: int = 512):
+        self.path = path
+        self.commit_interval = commit_interval
+        self.max_batch = max_batch
+        self.last_used = time.monotonic()
+        self.transactions = 0
+        self.statements = 0
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._writer: Optional[sqlite3.Connection] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._read_slots = asyncio.Semaphore(read_pool_size)
+        self._idle_readers: List[aiosqlite.Connection] = []
+        self._busy = 0
+        self.closed = False
+
+    @property
+    def idle(self) -> bool:
+        return self._busy == 0 and self._queue.empty()
+
+    async def execute(self, query: str, params: Sequence[Any] = ()) -> int:
+        """Run a write statement; returns its rowcount once committed."""
+        return await self._submit(query, params)
+
+    def _check_open(self) -> None:
+        if self.closed:
+            raise sqlite3.ProgrammingError(
+                f"SQLite database {self.path} was closed; call get_database again")
+
+    async def _submit(self, query: str, params: Sequence[Any]) -> int:
+        self._check_open()
+        if self._writer_task is None:
+            self._writer_task = asyncio.create_task(self._write_loop())
+        future = asyncio.get_running_loop().create_future()
+        self._busy += 1
+        try:
+            await self._queue.put((query, params, future))
+            return await future
+        finally:
+            self._busy -= 1
+            self.last_used = time.monotonic()
+
+    @asynccontextmanager
+    async def read(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrow a read connection; statements outside a transaction see the latest commit."""
+        self._check_open()
+        self._busy += 1
+        try:
+            async with self._read_slots:
+                self._check_open()
+                db = self._idle_readers.pop() if self._idle_readers else await connect(self.path)
+                try:
+                    yield db
+                finally:
+                    if self.closed:
+                        # Closed while borrowed (close_database); not pooled again
+                        await db.close()
+                    else:
+                        self._idle_readers.append(db)
+        finally:
+            self._busy -= 1
+            self.last_used = time.monotonic()
+
+    async def _write_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            if batch[0] is None:
+                return
+            deadline = loop.time() + self.commit_interval
+            while len(batch) < self.max_batch:
+                try:
+                    if self._queue.empty():
+                        timeout = deadline - loop.time()
+                        if timeout <= 0:
+                            break
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    else:
+                        batch.append(self._queue.get_nowait())
+                except asyncio.TimeoutError:
+                    break
+                if batch[-1] is None:
+                    break
+
+            stop = batch[-1] is None
+            if stop:
+                batch.pop()
+            await self._apply(batch)
+            if stop:
+                return
+
+    async def _apply(self, batch: List[Tuple[str, Sequence[Any], asyncio.Future]]) -> None:
+        try:
+            results = await asyncio.to_thread(self._apply_sync, batch)
+        except Exception as e:
+            # The commit failed: nothing in the batch was written
+            results = [e] * len(batch)
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _apply_sync(self, batch: List[Tuple[str, Sequence[Any], asyncio.Future]]) -> List[Union[int, Exception]]:
+        """One transaction for the batch; a failing statement only fails its own caller."""
+        if self._writer is None:
+            self._writer = _connect_sync(self.path, read_only=False, check_same_thread=False)
+        results: List[Union[int, Exception]] = []
+        # Explicit, or releasing the first savepoint would commit on its own
+        if not self._writer.in_transaction:
+            self._writer.execute("BEGIN")
+        for query, params, _ in batch:
+            # A savepoint per statement: a failure undoes exactly what that
+            # statement changed, so its caller can retry it safely
+            self._writer.execute("SAVEPOINT statement")
+            try:
+                cursor = self._writer.execute(query, params)
+                results.append(cursor.rowcount)
+            except Exception as e:
+                self._writer.execute("ROLLBACK TO statement")
+                results.append(e)
+            self._writer.execute("RELEASE statement")
+        try:
+            self._writer.commit()
+        except Exception:
+            self._writer.rollback()
+            raise
+        self.transactions += 1
+        self.statements += len(batch)
+        return results
+
+    async def close(self) -> None:
+        """Commit queued writes, then close every connection."""
+        self.closed = True
+        if self._writer_task is not None:
+            await self._queue.put(None)
+            await self._writer_task
+            self._writer_task = None
+        if self._writer is not None:
+            await asyncio.to_thread(self._writer.close)
+            self._writer = None
+        readers, self._idle_readers = self._idle_readers, []
+        for db in readers:
+            await db.close()
+
+
+# Open databases by path, least recently used first
+_databases: "OrderedDict[str, SQLiteDatabase]" = OrderedDict()
+_reaper: Optional[asyncio.Task] = None
+
+
+async def get_database(path: Union[str, Path]) -> SQLiteDatabase:
+    """
+    Shared SQLiteDatabase for a file, opened on first use.
+
+    Beyond SQLITE_MAX_OPEN_DATABASES the least recently used idle databases
+    are closed (busy ones stay open, so the limit can be exceeded for a
+    while); databases idle for SQLITE_IDLE_TTL seconds are closed in the
+    background.
+    """
+    global _reaper
+    key = str(Path(path).resolve())
+    database = _databases.get(key)
+    if database is None:
+        # Make room first, so the new database cannot be evicted itself
+        await _evict_lru(reserve=1)
+        # Another caller may have opened it while eviction awaited
+        database = _databases.get(key)
+        if database is None:
+            database = _databases[key] = SQLiteDatabase(key)
+    _databases.move_to_end(key)
+    database.last_used = time.monotonic()
+    if _reaper is None or _reaper.done():
+        _reaper = asyncio.create_task(_close_idle_periodically())
+    return database
+
+
+async def _evict_lru(reserve: int = 0) -> None:
+    """Close idle databases, least recently used first, until `reserve` more fit under the limit."""
+    excess = len(_databases) + reserve - SQLITE_MAX_OPEN_DATABASES
+    for key, database in list(_databases.items()):
+        if excess <= 0:
+            break
+        if database.idle and _databases.get(key) is database:
+            del _databases[key]
+            await database.close()
+            excess -= 1
+
+
+async def _close_idle_periodically() -> None:
+    while True:
+        await asyncio.sleep(max(1.0, SQLITE_IDLE_TTL / 2))
+        cutoff = time.monotonic() - SQLITE_IDLE_TTL
+        for key, database in list(_databases.items()):
+            if database.idle and database.last_used < cutoff and _databases.get(key) is database:
+                del _databases[key]
+                try:
+                    await database.close()
+                except Exception as e:
+                    print(f"Warning: Could not close SQLite database {key}: {e}")
+
+
+async def close_database(path: Union[str, Path]) -> None:
+    """Close a database's connections, e.g. before its file is removed."""
+    database = _databases.pop(str(Path(path).resolve()), None)
+    if database is not None:
+        await database.close()
+
+
+async def close_databases() -> None:
+    global _reaper
+    if _reaper is not None:
+        _reaper.cancel()
+        _reaper = None
+    databases = list(_databases.values())
+    _databases.clear()
+    for database in databases:
+        await database.close()
+
+
+def get_database_stats() -> List[dict]:
+    now = time.monotonic()
+    return [
+        {
+            "path": key,
+            "idle_seconds": round(now - database.last_used, 1),
+            "queued_writes": database._queue.qsize(),
+            "transactions": database.transactions,
+            "statements": database.statements,
+        }
+        for key, database in _databases.items()
+    ]
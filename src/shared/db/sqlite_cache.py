@@ -0,0 +1,115 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import os
+import math
+import time
+import aiosqlite
+
+from src.shared.db import sqlite
+
+
+class SQLiteLRUCache:
+    """
+    Base for persistent caches in a SQLite file, bounded by size.
+
+    Subclasses name the `table`, its `columns` (name -> SQL type, keys
+    first), the `key_columns` and the `size_column` whose byte length
+    counts against `max_bytes`. A last_used column is added; when entries
+    exceed `max_bytes`, the least recently used ones are evicted down to
+    90% of the limit.
+
+    Use as an async context manager; one connection is held while open.
+    """
+
+    table: str
+    columns: Dict[str, str]
+    key_columns: Tuple[str, ...]
+    size_column: str
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._db: Optional[aiosqlite.Connection] = None
+        self._total_bytes = 0
+
+    async def __aenter__(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._db = await sqlite.connect(self.path)
+        definitions = ",\n".join(f"{name} {column_type}" for name, column_type in self.columns.items())
+        await self._db.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                {definitions},
+                last_used REAL NOT NULL,
+                PRIMARY KEY ({", ".join(self.key_columns)})
+            ) WITHOUT ROWID
+        """)
+        await self._db.execute(f"""
+            CREATE INDEX IF NOT EXISTS ix_{self.table}_last_used ON {self.table} (last_used)
+        """)
+        await self._db.commit()
+
+        self._total_bytes = await self._stored_bytes()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._db.close()
+        self._db = None
+
+    async def _stored_bytes(self) -> int:
+        cursor = await self._db.execute(
+            f"SELECT COALESCE(SUM(length(CAST({self.size_column} AS BLOB))), 0) FROM {self.table}")
+        return (await cursor.fetchone())[0]
+
+    async def _lookup(self, where: str, params: Sequence[Any]) -> List[tuple]:
+        """Rows (in `columns` order) matching `where`; marks them as used."""
+        cursor = await self._db.execute(
+            f"SELECT {', '.join(self.columns)} FROM {self.table} WHERE {where}", params)
+        rows = await cursor.fetchall()
+        if rows:
+            await self._db.execute(
+                f"UPDATE {self.table} SET last_used = ? WHERE {where}", (time.time(), *params))
+            await self._db.commit()
+        return rows
+
+    async def _store(self, rows: List[tuple]) -> None:
+        """Insert or replace rows given in `columns` order, then evict if over the limit."""
+        if not rows:
+            return
+
+        now = time.time()
+        names = list(self.columns)
+        updates = ", ".join(f"{name} = excluded.{name}" for name in names if name not in self.key_columns)
+        await self._db.executemany(
+            f"""
+            INSERT INTO {self.table} ({", ".join(names)}, last_used)
+            VALUES ({", ".join("?" * (len(names) + 1))})
+            ON CONFLICT ({", ".join(self.key_columns)}) DO UPDATE SET
+                {updates}, last_used = excluded.last_used
+            """,
+            [(*row, now) for row in rows],
+        )
+        size_index = names.index(self.size_column)
+        sizes = [_byte_length(row[size_index]) for row in rows]
+        # Overwrites are counted twice; the sum is re-read after each eviction
+        self._total_bytes += sum(sizes)
+        if self._total_bytes > self.max_bytes:
+            await self._evict(max(1, sum(sizes) // len(sizes)))
+        await self._db.commit()
+
+    async def _evict(self, entry_bytes: int) -> None:
+        excess = self._total_bytes - int(self.max_bytes * 0.9)
+        count = max(1, math.ceil(excess / entry_bytes))
+        keys = ", ".join(self.key_columns)
+        await self._db.execute(
+            f"""
+            DELETE FROM {self.table} WHERE ({keys}) IN (
+                SELECT {keys} FROM {self.table} ORDER BY last_used LIMIT ?
+            )
+            """,
+            (count,),
+        )
+        self._total_bytes = await self._stored_bytes()
+
+
+def _byte_length(value: Any) -> int:
+    return len(value.encode("utf-8")) if isinstance(value, str) else len(value)
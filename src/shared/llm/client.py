@@ -0,0 +1,188 @@
+from src.config import (
+    LLM_API_URL,
+    LLM_REQUEST_TIMEOUT,
+    LLM_MAX_RETRIES,
+    LLM_BREAKER_FAILURE_THRESHOLD,
+    LLM_BREAKER_RESET_TIMEOUT,
+    LLM_BREAKER_MAX_WAIT,
+)
+
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import asyncio
+import random
+import time
+from openai import AsyncOpenAI, APIConnectionError, APIStatusError, APITimeoutError
+
+
+T = TypeVar("T")
+
+
+class LLMUnavailableError(Exception):
+    """The LLM server kept failing and the circuit breaker did not close in time."""
+
+
+def is_transient(error: Exception) -> bool:
+    """Errors worth retrying: connection problems, timeouts, 429 and 5xx."""
+    if isinstance(error, (APIConnectionError, APITimeoutError, asyncio.TimeoutError)):
+        return True
+    return isinstance(error, APIStatusError) and (error.status_code == 429 or error.status_code >= 500)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class CircuitBreaker:
+    """
+    Pauses callers while the LLM server is failing.
+
+    After `failure_threshold` consecutive transient failures the breaker
+    opens: callers wait in `acquire()` instead of sending requests. Once
+    `reset_timeout` seconds have passed a single probe request goes
+    through; its success closes the breaker, its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURE_THRESHOLD, reset_timeout: float = LLM_BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_count = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._closed = asyncio.Event()
+        self._closed.set()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half_open" if self._probing else "open"
+
+    async def acquire(self, max_wait: float = LLM_BREAKER_MAX_WAIT) -> None:
+        """Wait until a request may be sent; raises LLMUnavailableError after max_wait seconds."""
+        deadline = time.monotonic() + max_wait
+        while self._opened_at is not None:
+            if not self._probing and time.monotonic() - self._opened_at >= self.reset_timeout:
+                # This caller is the probe
+                self._probing = True
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LLMUnavailableError(
+                    f"LLM server unavailable: circuit open after {self.failures} consecutive failures")
+            if self._probing:
+                # Re-check at least once per reset period in case the probe fails
+                wait = min(remaining, self.reset_timeout)
+            else:
+                wait = min(remaining, self.reset_timeout - (time.monotonic() - self._opened_at))
+            try:
+                await asyncio.wait_for(self._closed.wait(), timeout=max(0.0, wait))
+            except asyncio.TimeoutError:
+                pass
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._probing = False
+        if self._opened_at is not None:
+            print("LLM server recovered, circuit closed")
+            self._opened_at = None
+            self._closed.set()
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._probing or (self._opened_at is None and self.failures >= self.failure_threshold):
+            if self._opened_at is None:
+                self.opened_count += 1
+                print(f"Warning: LLM server failing ({self.failures} in a row), pausing requests for {self.reset_timeout}s")
+            self._probing = False
+            self._opened_at = time.monotonic()
+            self._closed.clear()
+
+    def release(self) -> None:
+        """End a probe that failed for a non-transient reason; the next caller probes again."""
+        self._probing = False
+
+
+# One breaker for the process: every client talks to the same LLM server
+_breaker: Optional[CircuitBreaker] = None
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    global _breaker
+    if _breaker is None:
+        _breaker = CircuitBreaker()
+    return _breaker
+
+
+class LLMClient:
+    """
+    AsyncOpenAI client with per-request timeout, retries with exponential
+    backoff and full jitter on transient errors, and the shared circuit
+    breaker. Non-transient errors (e.g. 400) are raised at once.
+    """
+
+    def __init__(
+        self,
+        timeout: float = LLM_REQUEST_TIMEOUT,
+        max_retries: int = LLM_MAX_RETRIES,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        max_breaker_wait: float = LLM_BREAKER_MAX_WAIT,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_breaker_wait = max_breaker_wait
+        self.breaker = breaker or get_circuit_breaker()
+        self.retries = 0
+        self.openai = AsyncOpenAI(
+            base_url=LLM_API_URL,
+            api_key="not-needed",  # required even if not used by the server
+            timeout=timeout,
+            # Retries are done here, where the breaker sees every failure
+            max_retries=0,
+        )
+
+    def backoff_delay(self, attempt: int, error: Optional[Exception] = None) -> float:
+        delay = retry_after(error) if error is not None else None
+        if delay is None:
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        # A server asking for an hour must not park the worker that long;
+        # if it is really down, the failed retries open the circuit breaker
+        return min(max(delay, 0.0), self.max_delay)
+
+    async def call(self, request: Callable[[AsyncOpenAI], Awaitable[T]], on_retry: Optional[Callable[[Exception], None]] = None) -> T:
+        """Run `request(openai_client)` with retries; `on_retry` is told about each transient failure."""
+        attempt = 0
+        while True:
+            await self.breaker.acquire(self.max_breaker_wait)
+            try:
+                result = await request(self.openai)
+            except Exception as e:
+                if not is_transient(e):
+                    if isinstance(e, APIStatusError):
+                        # The server answered, it is up
+                        self.breaker.record_success()
+                    else:
+                        self.breaker.release()
+                    raise
+                self.breaker.record_failure()
+                if attempt >= self.max_retries:
+                    raise
+                if on_retry:
+                    on_retry(e)
+                delay = self.backoff_delay(attempt, e)
+                attempt += 1
+                self.retries += 1
+                print(f"Warning: LLM request failed ({e}), retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
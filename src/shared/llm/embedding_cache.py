@@ -0,0 +1,64 @@
+from src.config import STORAGE_FOLDER, EMBEDDING_CACHE_MAX_MB, EMBEDDING_CACHE_DTYPE
+
+from typing import Dict, List, Optional
+
+import os
+import hashlib
+import unicodedata
+import numpy as np
+
+from src.shared.db.sqlite_cache import SQLiteLRUCache
+
+
+def text_hash(text: str) -> bytes:
+    """sha256 of the text after Unicode NFC and whitespace normalization."""
+    normalized = " ".join(unicodedata.normalize("NFC", text).split())
+    return hashlib.sha256(normalized.encode("utf-8")).digest()
+
+
+class EmbeddingCache(SQLiteLRUCache):
+    """
+    Persistent embedding cache keyed by (model, sha256 of normalized text).
+
+    Vectors are stored as raw float16 or float32 blobs in a SQLite file. When
+    the stored vectors exceed `max_bytes`, the least recently used entries
+    are evicted down to 90% of the limit.
+
+    Use as an async context manager; one connection is held while open.
+    """
+
+    table = "embeddings"
+    columns = {
+        "model": "TEXT NOT NULL",
+        "text_hash": "BLOB NOT NULL",
+        "dtype": "TEXT NOT NULL",
+        "vector": "BLOB NOT NULL",
+    }
+    key_columns = ("model", "text_hash")
+    size_column = "vector"
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None, dtype: Optional[str] = None):
+        super().__init__(
+            path or os.path.join(STORAGE_FOLDER, "embedding_cache.db"),
+            max_bytes if max_bytes is not None else EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+        )
+        self.dtype = np.dtype(dtype or EMBEDDING_CACHE_DTYPE)
+
+    async def get_many(self, model: str, hashes: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """Return float32 vectors for the hashes found in the cache."""
+        if not hashes:
+            return {}
+
+        unique = list(dict.fromkeys(hashes))
+        rows = await self._lookup(
+            f"model = ? AND text_hash IN ({', '.join('?' * len(unique))})", (model, *unique))
+        return {
+            text_hash: np.frombuffer(vector, dtype=dtype).astype(np.float32)
+            for _, text_hash, dtype, vector in rows
+        }
+
+    async def put_many(self, model: str, hashes: List[bytes], vectors: np.ndarray) -> None:
+        await self._store([
+            (model, h, self.dtype.name, np.asarray(vector, dtype=self.dtype).tobytes())
+            for h, vector in zip(hashes, vectors)
+        ])
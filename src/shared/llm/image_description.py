@@ -1,31 +1,132 @@
-from src.config import LLM_API_URL
-
-from typing import Tuple, Dict, Optional
+from typing import Any, Tuple, Dict, Optional
 
+import asyncio
 import base64
 import io
+import json
 import time
-from openai import OpenAI
 from PIL import Image
 
+from src.shared.llm.client import LLMClient
+from src.shared.llm.vision_cache import perceptual_hash
+
+
+# Part of the vision cache key: bump when a prompt or the response schema
+# changes, so results of the old prompts are no longer reused
+PROMPT_VERSION = "1"
+
+STRUCTURED_DESCRIPTION_KEYS = (
+    "main_subject",
+    "action",
+    "setting",
+    "secondary_objects",
+    "composition",
+)
+
+COMBINED_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "description": {"type": "string"},
+        "tag": {"type": "string"},
+        "structured_description": {
+            "type": "object",
+            "properties": {key: {"type": "string"} for key in STRUCTURED_DESCRIPTION_KEYS},
+            "required": list(STRUCTURED_DESCRIPTION_KEYS),
+        },
+    },
+    "required": ["description", "tag", "structured_description"],
+}
+
+
+def _merge_usage(first: Optional[Dict], second: Optional[Dict]) -> Optional[Dict]:
+    """Sum the numeric counters of two usage dicts."""
+    if not first or not second:
+        return first or second
+    merged = dict(first)
+    for key, value in second.items():
+        if isinstance(value, (int, float)) and isinstance(merged.get(key), (int, float)):
+            merged[key] += value
+        elif key not in merged:
+            merged[key] = value
+    return merged
+
+
+class EmptyResponseError(Exception):
+    """The model answered without any content."""
+
 
 class ImageDescription:
-    def __init__(self, model_name: str):
+    """
+    Vision prompts for one image.
+
+    Calls go through LLMClient (timeout, retries, circuit breaker). Errors are
+    raised to the caller rather than returned as text, so a failed image is
+    not mistaken for a described one.
+    """
+
+    def __init__(self, model_name: str, max_side: int = 896, jpeg_quality: int = 85, client: Optional[LLMClient] = None):
         self.model_name = model_name
-        self.client = OpenAI(
-            base_url=LLM_API_URL,
-            api_key="not-needed"  # required even if not used by the server
-        )
+        # Images are downscaled so their longest side fits the model's vision input
+        self.max_side = max_side
+        self.jpeg_quality = jpeg_quality
+        self.client = client or LLMClient()
 
-    def _image_to_base64(self, image: Image.Image) -> str:
-        buffered = io.BytesIO()
-        # Convert image to RGB to ensure compatibility
-        if image.mode in ("RGBA", "P"):
-            image = image.convert("RGB")
-        image.save(buffered, format="JPEG")
-        return base64.b64encode(buffered.getvalue()).decode('utf-8')
+    def prepare_image(self, image_path: str) -> str:
+        """
+        Decode, downscale and JPEG-encode an image once for all prompts.
+
+        JPEG sources are decoded directly at a reduced scale via Image.draft().
+        The result is a base64 payload reused by every prompt method. This is
+        CPU-bound and should be run in a thread.
+        """
+        return self.prepare_image_and_hash(image_path)[0]
+
+    def prepare_image_and_hash(self, image_path: str) -> Tuple[str, int]:
+        """prepare_image plus the perceptual hash of the downscaled image, for the vision cache."""
+        with Image.open(image_path) as image:
+            if image.format == "JPEG":
+                image.draft("RGB", (self.max_side, self.max_side))
+            # Convert image to RGB to ensure compatibility
+            if image.mode != "RGB":
+                image = image.convert("RGB")
+            image.thumbnail((self.max_side, self.max_side),
+                            Image.Resampling.LANCZOS)
+
+            phash = perceptual_hash(image)
+            buffered = io.BytesIO()
+            image.save(buffered, format="JPEG", quality=self.jpeg_quality)
+        return base64.b64encode(buffered.getvalue()).decode('utf-8'), phash
+
+    async def _complete(self, system_prompt: str, base64_image: str, **kwargs) -> Tuple[str, Optional[Dict], float]:
+        start_time = time.time()
+        response = await self.client.call(lambda openai: openai.chat.completions.create(
+            model=self.model_name,
+            messages=[
+                {
+                    "role": "system",
+                    "content": system_prompt,
+                },
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:image/jpeg;base64,{base64_image}"
+                            },
+                        },
+                    ],
+                },
+            ],
+            **kwargs,
+        ))
+        # Includes retries, which is what the image cost
+        duration = time.time() - start_time
+        if not (response.choices and response.choices[0].message.content):
+            raise EmptyResponseError("No response generated.")
+        return response.choices[0].message.content, response.usage.model_dump() if response.usage else None, duration
 
-    def get_description(self, image: Image.Image) -> Tuple[str, Optional[Dict], float]:
+    async def get_description(self, base64_image: str) -> Tuple[str, Optional[Dict], float]:
         system_prompt = '''
         Твоя задача — составить короткое и объективное описание изображения (1-2 предложения).
 
@@ -41,40 +142,9 @@ class ImageDescription:
         - Рыжая собака породы корги лежит на зеленой траве.
         - Два человека в камуфляже ведут перестрелку на городской улице.
         '''
-        base64_image = self._image_to_base64(image)
+        return await self._complete(system_prompt, base64_image, temperature=1)
 
-        try:
-            start_time = time.time()
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": system_prompt,
-                    },
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}"
-                                },
-                            },
-                        ],
-                    },
-                ],
-                temperature=1,
-            )
-            end_time = time.time()
-            duration = end_time - start_time
-            if response.choices and response.choices[0].message.content:
-                return response.choices[0].message.content, response.usage.model_dump() if response.usage else None, duration
-            return "Error: No response generated.", None, duration
-        except Exception as e:
-            return f"Error: An exception occurred: {e}", None, 0.0
-
-    def get_tag(self, image: Image.Image) -> Tuple[str, Optional[Dict], float]:
+    async def get_tag(self, base64_image: str) -> Tuple[str, Optional[Dict], float]:
         system_prompt = """
         Твоя задача — сгенерировать список тегов для изображения.
 
@@ -90,39 +160,9 @@ class ImageDescription:
         - город, ночь, огни, здания, улица
         - еда, тарелка, овощи, ужин
         """
-        base64_image = self._image_to_base64(image)
+        return await self._complete(system_prompt, base64_image)
 
-        try:
-            start_time = time.time()
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": system_prompt,
-                    },
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}"
-                                },
-                            },
-                        ],
-                    },
-                ],
-            )
-            end_time = time.time()
-            duration = end_time - start_time
-            if response.choices and response.choices[0].message.content:
-                return response.choices[0].message.content, response.usage.model_dump() if response.usage else None, duration
-            return "Error: No response generated.", None, duration
-        except Exception as e:
-            return f"Error: An exception occurred: {e}", None, 0.0
-
-    def get_structured_description(self, image: Image.Image) -> Tuple[str, Optional[Dict], float]:
+    async def get_structured_description(self, base64_image: str) -> Tuple[str, Optional[Dict], float]:
         system_prompt = '''
         Твоя задача — извлечь структурированную информацию из изображения и вернуть ее в формате JSON.
 
@@ -149,34 +189,138 @@ class ImageDescription:
           "composition": "крупный план"
         }
         '''
-        base64_image = self._image_to_base64(image)
+        return await self._complete(system_prompt, base64_image)
 
+    async def get_combined(self, base64_image: str) -> Tuple[Dict[str, Optional[str]], Optional[Dict], float]:
+        """
+        Ask for description, tags and structured description in one call.
+
+        The response is constrained by a JSON schema. Fields that are missing
+        or malformed in the response are returned as None.
+        """
+        system_prompt = '''
+        Твоя задача — проанализировать изображение и вернуть JSON с тремя полями: "description", "tag", "structured_description".
+
+        Правила:
+        1.  "description": короткое и объективное описание изображения (1-2 предложения). Только факты: кто/что изображено, что делает, где находится. Начинай сразу с описания, без фраз вроде "На этом фото...". Не анализируй настроение, эмоции или атмосферу.
+        2.  "tag": список тегов через запятую. Теги — существительные или короткие фразы, описывающие ключевые объекты, действия или концепции. Не используй предложения.
+        3.  "structured_description": объект с ключами "main_subject", "action", "setting", "secondary_objects", "composition".
+            - main_subject: Кто или что является главным объектом на изображении?
+            - action: Какое основное действие происходит? (Если нет действия, укажи "статика")
+            - setting: Где происходит действие (окружение, фон)?
+            - secondary_objects: Какие значимые второстепенные объекты присутствуют? (список строкой)
+            - composition: Краткое описание композиции (например: крупный план, панорама, портрет, вид сверху).
+        4.  Игнорируй любые логотипы и надписи, особенно "инстажелдор".
+        5.  Все значения должны быть строго на русском языке.
+        6.  Ответ должен быть строго в формате JSON, без пояснений до или после.
+        '''
+        content, usage, duration = await self._complete(
+            system_prompt,
+            base64_image,
+            response_format={
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "image_analysis",
+                    "schema": COMBINED_RESPONSE_SCHEMA,
+                },
+            },
+        )
+        return self._parse_combined(content), usage, duration
+
+    @staticmethod
+    def _parse_combined(content: str) -> Dict[str, Optional[str]]:
+        fields: Dict[str, Optional[str]] = {
+            "description": None,
+            "tag": None,
+            "structured_description": None,
+        }
         try:
-            start_time = time.time()
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": system_prompt,
-                    },
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}"
-                                },
-                            },
-                        ],
-                    },
-                ],
+            data = json.loads(content)
+        except (TypeError, json.JSONDecodeError):
+            return fields
+        if not isinstance(data, dict):
+            return fields
+
+        for key in ("description", "tag"):
+            value = data.get(key)
+            if isinstance(value, str) and value.strip():
+                fields[key] = value.strip()
+
+        structured = data.get("structured_description")
+        if isinstance(structured, dict) and all(
+                isinstance(structured.get(key), str) for key in STRUCTURED_DESCRIPTION_KEYS):
+            # Stored the same way as the single-prompt JSON answer
+            fields["structured_description"] = json.dumps(
+                {key: structured[key] for key in STRUCTURED_DESCRIPTION_KEYS}, ensure_ascii=False, indent=2)
+
+        return fields
+
+    async def analyze(self, base64_image: str, combined: bool = False) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """
+        Run all three analyses for an image.
+
+        In combined mode a single schema-constrained call is made and only the
+        fields that failed to parse are re-requested with their own prompts.
+        The usage and time of the combined call are stored in the description
+        slots (added to those of a description fallback, if any).
+
+        Returns:
+            Tuple of (fields named like MediaDataUpdate, duration per call type).
+        """
+        if not combined:
+            (description, desc_usage, desc_time), (tag, tag_usage, tag_time), (structured_description, struct_desc_usage, struct_desc_time) = await asyncio.gather(
+                self.get_description(base64_image),
+                self.get_tag(base64_image),
+                self.get_structured_description(base64_image),
             )
-            end_time = time.time()
-            duration = end_time - start_time
-            if response.choices and response.choices[0].message.content:
-                return response.choices[0].message.content, response.usage.model_dump() if response.usage else None, duration
-            return "Error: No response generated.", None, duration
-        except Exception as e:
-            return f"Error: An exception occurred: {e}", None, 0.0
+            return {
+                "description": description,
+                "tag": tag,
+                "structured_description": structured_description,
+                "desc_usage": desc_usage,
+                "tag_usage": tag_usage,
+                "struct_desc_usage": struct_desc_usage,
+                "desc_time": desc_time,
+                "tag_time": tag_time,
+                "struct_desc_time": struct_desc_time,
+                "analysis_mode": "separate",
+            }, {
+                "description": desc_time,
+                "tag": tag_time,
+                "structured_description": struct_desc_time,
+            }
+
+        parsed, usage, duration = await self.get_combined(base64_image)
+        result: Dict[str, Any] = {
+            "description": parsed["description"],
+            "tag": parsed["tag"],
+            "structured_description": parsed["structured_description"],
+            "desc_usage": usage,
+            "tag_usage": None,
+            "struct_desc_usage": None,
+            "desc_time": duration,
+            "tag_time": 0.0,
+            "struct_desc_time": 0.0,
+            "analysis_mode": "combined",
+        }
+        timings = {"combined": duration}
+
+        fallbacks = [
+            (field, usage_key, time_key, method)
+            for field, usage_key, time_key, method in (
+                ("description", "desc_usage", "desc_time", self.get_description),
+                ("tag", "tag_usage", "tag_time", self.get_tag),
+                ("structured_description", "struct_desc_usage",
+                 "struct_desc_time", self.get_structured_description),
+            )
+            if parsed[field] is None
+        ]
+        responses = await asyncio.gather(*(method(base64_image) for *_, method in fallbacks))
+
+        for (field, usage_key, time_key, _), (content, fallback_usage, fallback_time) in zip(fallbacks, responses):
+            result[field] = content
+            result[usage_key] = _merge_usage(result[usage_key], fallback_usage)
+            result[time_key] += fallback_time
+            timings[field] = fallback_time
+
+        return result, timings
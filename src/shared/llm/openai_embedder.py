@@ -1,36 +1,246 @@
-from src.config import LLM_API_URL
+from src.config import LLM_MAX_RETRIES, LLM_BREAKER_MAX_WAIT
 
-from typing import List
+from typing import AsyncIterator, Hashable, List, Optional, Set, Tuple
 
-from openai import OpenAI
-import torch
+import asyncio
+import base64
+import time
+import numpy as np
+from openai import APIStatusError
+
+from src.shared.llm.client import LLMClient, LLMUnavailableError, is_transient
+from src.shared.llm.embedding_cache import EmbeddingCache, text_hash
+
+
+class AdaptiveBatchSize:
+    """
+    Batch size controller driven by the observed time per item.
+
+    The size grows while full batches keep getting cheaper per item and holds
+    once they stop improving. It shrinks when time per item degrades or the
+    server pushes back, and never exceeds the token budget per request.
+    """
+
+    def __init__(self, initial: int = 32, minimum: int = 4, maximum: int = 256, max_tokens: Optional[int] = None):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.max_tokens = max_tokens
+        self.size = max(minimum, min(initial, maximum))
+        self._best_seconds_per_item: Optional[float] = None
+
+    def record(self, items: int, seconds: float, tokens: Optional[int] = None) -> None:
+        if self.max_tokens and tokens:
+            token_cap = int(self.max_tokens / (tokens / items))
+            self.size = max(self.minimum, min(self.size, token_cap))
+
+        # Partial batches (end of input) say nothing about the current size
+        if items < self.size or seconds <= 0:
+            return
+
+        per_item = seconds / items
+        best = self._best_seconds_per_item
+        if best is None or per_item < best * 0.9:
+            self._best_seconds_per_item = per_item
+            self.size = min(self.maximum, self.size + max(1, self.size // 2))
+        elif per_item > best * 1.5:
+            self.size = max(self.minimum, self.size * 3 // 4)
+
+    def back_off(self) -> None:
+        """Halve the batch size after a rate limit or server error."""
+        self.size = max(self.minimum, self.size // 2)
+        # Server conditions changed, re-learn the baseline
+        self._best_seconds_per_item = None
+
+
+def _decode_embeddings(data) -> np.ndarray:
+    """
+    Decode response items into one (n, dim) float32 array.
+
+    Each base64 payload is read in place with np.frombuffer and copied once
+    into its row. Servers that ignore encoding_format and send float lists
+    are handled too.
+    """
+    first = data[0].embedding
+    dim = len(base64.b64decode(first)) // 4 if isinstance(first, str) else len(first)
+    out = np.empty((len(data), dim), dtype=np.float32)
+    for row, item in zip(out, data):
+        if isinstance(item.embedding, str):
+            row[:] = np.frombuffer(base64.b64decode(item.embedding), dtype="<f4")
+        else:
+            row[:] = item.embedding
+    return out
+
+
+def _is_rejected_input(error: Exception) -> bool:
+    """A 4xx other than 429: the server is up but refused this input."""
+    return isinstance(error, APIStatusError) and not is_transient(error)
 
 
 class OpenAIEmbedder:
-    def __init__(self, model_name: str):
+    def __init__(
+        self,
+        model_name: str,
+        concurrency: int = 4,
+        batch_size: int = 32,
+        min_batch_size: int = 4,
+        max_batch_size: int = 256,
+        max_tokens_per_batch: Optional[int] = None,
+        max_retries: int = LLM_MAX_RETRIES,
+        cache: Optional[EmbeddingCache] = None,
+        max_breaker_wait: float = LLM_BREAKER_MAX_WAIT,
+    ):
         self.model_name = model_name
-        self.client = OpenAI(
-            base_url=LLM_API_URL,
-            api_key="not-needed"  # required even if not used by the server
-        )
+        self.cache = cache
+        self.cache_hits = 0
+        # Keys of items that could not be embedded, for a later re-run
+        self.failed_keys: List[Hashable] = []
+        self.concurrency = concurrency
+        self.batch_size = AdaptiveBatchSize(
+            batch_size, min_batch_size, max_batch_size, max_tokens_per_batch)
+        self.client = LLMClient(max_retries=max_retries, max_breaker_wait=max_breaker_wait)
 
-    def get_embedding(self, text: List[str]) -> torch.Tensor:
-        response = self.client.embeddings.create(
-            model=self.model_name,
-            input=text
+    async def _create(self, text: List[str]):
+        """One embeddings request; transient failures are retried and shrink the batch size."""
+        return await self.client.call(
+            lambda openai: openai.embeddings.create(
+                model=self.model_name,
+                input=text,
+                # Packed little-endian float32, decoded without Python floats
+                encoding_format="base64",
+            ),
+            on_retry=lambda e: self.batch_size.back_off(),
         )
 
-        embeddings = [item.embedding for item in response.data]
+    async def get_embedding(self, text: List[str]) -> np.ndarray:
+        start_time = time.perf_counter()
+        response = await self._create(text)
+        duration = time.perf_counter() - start_time
+
+        tokens = response.usage.total_tokens if response.usage else None
+        self.batch_size.record(len(text), duration, tokens)
 
         # The OpenAI API /v1/embeddings endpoint returns normalized embeddings by default.
-        return torch.tensor(embeddings)
+        embeddings = _decode_embeddings(response.data)
 
-    def get_query_embedding(self, text: str) -> torch.Tensor:
-        response = self.client.embeddings.create(
-            model=self.model_name,
-            input=[text]
-        )
+        if self.cache:
+            try:
+                await self.cache.put_many(
+                    self.model_name, [text_hash(t) for t in text], embeddings)
+            except Exception as e:
+                # A cache failure must not lose embeddings we already paid for
+                print(f"Warning: Could not write embedding cache: {e}")
+
+        return embeddings
+
+    async def get_query_embedding(self, text: str) -> np.ndarray:
+        response = await self._create([text])
+
+        # Shape [1, dim]
+        return _decode_embeddings(response.data)
+
+    async def _embed_batch(self, keys: List[Hashable], texts: List[str]) -> Tuple[List[Hashable], Optional[np.ndarray]]:
+        """
+        Embed one batch. Keys that fail are added to failed_keys and left out
+        of the result; LLMUnavailableError is raised to stop the caller.
+        """
+        try:
+            return keys, await self.get_embedding(texts)
+        except LLMUnavailableError:
+            raise
+        except Exception as e:
+            # Retries are exhausted; only an input the server rejected (4xx)
+            # is worth isolating, anything else would fail item by item too
+            if len(texts) == 1 or not _is_rejected_input(e):
+                print(f"Warning: Error embedding batch of {len(texts)} items: {e}")
+                self.failed_keys.extend(keys)
+                return [], None
+            print(f"Warning: Batch of {len(texts)} items rejected, embedding one by one: {e}")
+
+        # Embed one by one so a single bad input does not drop the batch
+        embedded_keys, embeddings = [], []
+        for key, text in zip(keys, texts):
+            try:
+                embeddings.append(await self.get_embedding([text]))
+                embedded_keys.append(key)
+            except LLMUnavailableError:
+                raise
+            except Exception as e:
+                print(f"Warning: Error embedding item {key}: {e}")
+                self.failed_keys.append(key)
+        return embedded_keys, np.concatenate(embeddings) if embeddings else None
+
+    async def _take_cached(self, batch: List[Tuple[Hashable, str]]) -> Tuple[List[Hashable], List[np.ndarray], List[Tuple[Hashable, str]]]:
+        """Split a batch into cached (keys, vectors) and the items still to embed."""
+        hashes = [text_hash(text) for _, text in batch]
+        found = await self.cache.get_many(self.model_name, hashes)
+
+        keys, vectors, missing = [], [], []
+        for item, h in zip(batch, hashes):
+            if h in found:
+                keys.append(item[0])
+                vectors.append(found[h])
+            else:
+                missing.append(item)
+        self.cache_hits += len(keys)
+        return keys, vectors, missing
+
+    async def embed_iter(
+        self, items: AsyncIterator[Tuple[Hashable, str]]
+    ) -> AsyncIterator[Tuple[List[Hashable], np.ndarray]]:
+        """
+        Embed (key, text) pairs with up to `concurrency` requests in flight.
+
+        Batches are cut at the current adaptive batch size. Results are
+        yielded as (keys, embeddings) in completion order; items that fail
+        are logged, left out and collected in failed_keys. With a cache,
+        texts embedded before are yielded from it without a request.
+
+        Raises LLMUnavailableError once the server stays down; batches that
+        completed before are yielded first.
+        """
+        pending: Set[asyncio.Task] = set()
+        buffer: List[Tuple[Hashable, str]] = []
+        source = aiter(items)
+        exhausted = False
+
+        try:
+            while not exhausted or buffer or pending:
+                # Fill free request slots
+                while len(pending) < self.concurrency and (buffer or not exhausted):
+                    while not exhausted and len(buffer) < self.batch_size.size:
+                        incoming = []
+                        while len(buffer) + len(incoming) < self.batch_size.size:
+                            try:
+                                incoming.append(await anext(source))
+                            except StopAsyncIteration:
+                                exhausted = True
+                                break
+                        if self.cache and incoming:
+                            cached_keys, cached_vectors, incoming = await self._take_cached(incoming)
+                            if cached_keys:
+                                yield cached_keys, np.stack(cached_vectors)
+                        buffer.extend(incoming)
+                    if not buffer:
+                        break
+                    batch, buffer = buffer[:self.batch_size.size], buffer[self.batch_size.size:]
+                    keys = [key for key, _ in batch]
+                    texts = [text for _, text in batch]
+                    pending.add(asyncio.create_task(self._embed_batch(keys, texts)))
+
+                if not pending:
+                    continue
 
-        embedding = response.data[0].embedding
-        # Return as a 2D tensor [1, dim]
-        return torch.tensor(embedding).unsqueeze(0)
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                error = None
+                for task in done:
+                    if task.exception():
+                        error = error or task.exception()
+                        continue
+                    keys, embeddings = task.result()
+                    if keys:
+                        yield keys, embeddings
+                if error:
+                    raise error
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,90 @@
+from src.config import STORAGE_FOLDER, VISION_CACHE_MAX_MB
+
+from typing import Any, Dict, Optional
+
+import os
+import json
+import numpy as np
+from PIL import Image
+
+from src.shared.db.sqlite_cache import SQLiteLRUCache
+
+
+# Fields of an analysis that are reused on a hit; usage, timings and mode are not
+CACHED_FIELDS = ("description", "tag", "structured_description")
+
+_HASH_SIZE = 8
+_DCT_SIZE = 32
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    matrix = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n))
+    matrix[0] /= np.sqrt(2)
+    return matrix * np.sqrt(2 / n)
+
+
+_DCT = _dct_matrix(_DCT_SIZE)
+
+
+def perceptual_hash(image: Image.Image) -> int:
+    """
+    64-bit pHash: grayscale 32x32, 2D DCT, then the 8x8 lowest frequencies
+    compared against their median. Re-encoded, resized or lightly
+    watermarked copies of an image usually get the same hash.
+    """
+    small = image.convert("L").resize((_DCT_SIZE, _DCT_SIZE), Image.Resampling.LANCZOS)
+    pixels = np.asarray(small, dtype=np.float64)
+    low = (_DCT @ pixels @ _DCT.T)[:_HASH_SIZE, :_HASH_SIZE]
+    bits = (low > np.median(low)).flatten()
+    # Stored as a signed 64-bit SQLite integer
+    return int.from_bytes(np.packbits(bits).tobytes(), "big", signed=True)
+
+
+class VisionCache(SQLiteLRUCache):
+    """
+    Persistent cache of image analyses keyed by (model, prompt version,
+    perceptual hash of the downscaled image).
+
+    Entries are JSON in a SQLite file under STORAGE_FOLDER. When they exceed
+    `max_bytes`, the least recently used entries are evicted down to 90% of
+    the limit. Use as an async context manager; one connection is held
+    while open.
+    """
+
+    table = "analyses"
+    columns = {
+        "model": "TEXT NOT NULL",
+        "prompt_version": "TEXT NOT NULL",
+        "phash": "INTEGER NOT NULL",
+        "analysis": "TEXT NOT NULL",
+    }
+    key_columns = ("model", "prompt_version", "phash")
+    size_column = "analysis"
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None):
+        super().__init__(
+            path or os.path.join(STORAGE_FOLDER, "vision_cache.db"),
+            max_bytes if max_bytes is not None else VISION_CACHE_MAX_MB * 1024 * 1024,
+        )
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        lookups = self.hits + self.misses
+        return round(self.hits / lookups, 4) if lookups else None
+
+    async def get(self, model: str, prompt_version: str, phash: int) -> Optional[Dict[str, Any]]:
+        rows = await self._lookup(
+            "model = ? AND prompt_version = ? AND phash = ?", (model, prompt_version, phash))
+        if not rows:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return json.loads(rows[0][3])
+
+    async def put(self, model: str, prompt_version: str, phash: int, analysis: Dict[str, Any]) -> None:
+        value = json.dumps({key: analysis.get(key) for key in CACHED_FIELDS}, ensure_ascii=False)
+        await self._store([(model, prompt_version, phash, value)])
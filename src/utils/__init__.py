@@ -1 +1,4 @@
 from .count_json_items import count_json_items
+from .json_stream import stream_json_items_with_offset, ijson_backend
+from .latency import LatencyRecorder
+from .lru import LRUCache
@@ -1,10 +1,12 @@
 import json
 import ijson
 
+from src.utils.json_stream import ijson_backend
+
 
 def count_json_items(filename: str, path: str) -> int:
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            return sum(1 for _ in ijson.items(f, path))
-    except (FileNotFoundError, json.JSONDecodeError):
+        with open(filename, 'rb') as f:
+            return sum(1 for _ in ijson_backend.items(f, path))
+    except (FileNotFoundError, json.JSONDecodeError, ijson.JSONError):
         return 0
@@ -0,0 +1,30 @@
+from typing import Any, Generator, Tuple
+
+import ijson
+
+# Prefer the yajl2 C backend explicitly; fall back to whatever ijson
+# can load (pure Python in the worst case) when it is not compiled in.
+try:
+    ijson_backend = ijson.get_backend('yajl2_c')
+except ImportError:
+    ijson_backend = ijson
+
+
+def stream_json_items_with_offset(filename: str, path: str) -> Generator[Tuple[Any, int], None, None]:
+    """
+    Stream items from a JSON file in a single pass, together with the file offset.
+
+    The offset is the number of bytes consumed by the parser so far. ijson reads
+    the file in fixed-size chunks, so the offset advances per chunk rather than
+    per item, which is precise enough for progress reporting.
+
+    Args:
+        filename: Path to the JSON file.
+        path: ijson prefix of the items to yield (e.g. 'messages.item').
+
+    Yields:
+        Tuples of (item, bytes_read).
+    """
+    with open(filename, 'rb') as f:
+        for item in ijson_backend.items(f, path):
+            yield item, f.tell()
@@ -0,0 +1,41 @@
+import math
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+
+class LatencyRecorder:
+    """
+    Collects durations per named operation and summarizes them as percentiles.
+
+    With `max_samples`, only the most recent samples of each operation are
+    kept, for recorders that live as long as the process.
+    """
+
+    def __init__(self, max_samples: Optional[int] = None):
+        self.max_samples = max_samples
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        if name not in self._samples:
+            self._samples[name] = deque(maxlen=self.max_samples)
+        self._samples[name].append(seconds)
+
+    @staticmethod
+    def _percentile(sorted_samples: List[float], q: float) -> float:
+        # Nearest-rank percentile; samples are already sorted
+        index = max(0, math.ceil(q * len(sorted_samples)) - 1)
+        return sorted_samples[index]
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Return count, p50 and p95 (in seconds) for every recorded operation."""
+        result = {}
+        for name, samples in self._samples.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            result[name] = {
+                "count": len(ordered),
+                "p50": round(self._percentile(ordered, 0.50), 4),
+                "p95": round(self._percentile(ordered, 0.95), 4),
+            }
+        return result
@@ -0,0 +1,33 @@
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, TypeVar
+
+
+ValueT = TypeVar("ValueT")
+
+
+class LRUCache(Generic[ValueT]):
+    """Small in-memory LRU map for values computed by coroutines (functools.lru_cache cannot await)."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, ValueT]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[ValueT]:
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: ValueT) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)